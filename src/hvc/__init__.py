@@ -17,7 +17,7 @@ from .utils.features import load_feature_file
 
 from .extract import extract
 from .predict import predict
-from .select import select
+from .select import select, finalize_select
 from .parseconfig import parse_config
 
 from . import metrics
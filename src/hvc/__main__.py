@@ -0,0 +1,105 @@
+"""
+command-line interface for hvc, e.g.
+$ hvc serve knn.meta --port 8000
+$ hvc watch knn.meta /path/to/recordings
+"""
+import argparse
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="hvc", description="hybrid-vocal-classifier command-line interface"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="load models once and predict labels for audio sent over "
+        "localhost HTTP or a Unix domain socket",
+    )
+    serve_parser.add_argument(
+        "model_meta_files", nargs="+", help=".meta files of models to serve"
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="host for HTTP server"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=8000, help="port for HTTP server"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        dest="socket_path",
+        default=None,
+        help="path to Unix domain socket; if specified, serve on socket "
+        "instead of HTTP",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="watch directories for new audio files, and save predicted labels "
+        "for each as a .not.mat file",
+    )
+    watch_parser.add_argument(
+        "model_meta_file", help=".meta file of model used to predict labels"
+    )
+    watch_parser.add_argument("data_dirs", nargs="+", help="directories to watch")
+    watch_parser.add_argument(
+        "--file-format",
+        default="cbin",
+        choices=["cbin", "wav"],
+        help="format of audio files",
+    )
+    watch_parser.add_argument(
+        "--output-dir",
+        default=None,
+        help="alternate directory for .not.mat files that already exist "
+        "next to audio files",
+    )
+    watch_parser.add_argument(
+        "--poll-interval", type=float, default=5.0, help="seconds between polls"
+    )
+    watch_parser.add_argument(
+        "--settle-time",
+        type=float,
+        default=2.0,
+        help="seconds a file must go unchanged before it is processed",
+    )
+    watch_parser.add_argument(
+        "--record-file",
+        default=None,
+        help="JSON file with record of processed files, so a restarted "
+        "watcher does not process them again",
+    )
+    return parser
+
+
+def main(args=None):
+    parser = get_parser()
+    args = parser.parse_args(args)
+    if args.command == "serve":
+        from .serve import serve
+
+        serve(
+            args.model_meta_files,
+            host=args.host,
+            port=args.port,
+            socket_path=args.socket_path,
+        )
+    elif args.command == "watch":
+        from .watch import FolderWatcher
+
+        watcher = FolderWatcher(
+            args.model_meta_file,
+            args.data_dirs,
+            file_format=args.file_format,
+            output_dir=args.output_dir,
+            poll_interval=args.poll_interval,
+            settle_time=args.settle_time,
+            record_file=args.record_file,
+        )
+        watcher.run()
+
+
+if __name__ == "__main__":
+    main()
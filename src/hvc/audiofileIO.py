@@ -1,8 +1,10 @@
+import os
 import warnings
 
 import evfuncs
 import numpy as np
 import scipy.signal
+from scipy.io import wavfile
 from matplotlib.mlab import specgram
 
 from .parse.ref_spect_params import refs_dict
@@ -16,6 +18,55 @@ class SegmentParametersMismatchError(Exception):
     pass
 
 
+def load_audio(filename, mmap=True, channel=0):
+    """loads audio from a .cbin or .wav file
+
+    Parameters
+    ----------
+    filename : str
+        path to audio file, must end with .cbin or .wav
+    mmap : bool
+        if True, return samples as a memory-mapped view of the file,
+        so only the parts of the file that are accessed are read into memory,
+        e.g. just the segments used to make spectrograms of syllables.
+        If False, read the whole file into memory.
+        Default is True.
+    channel : int
+        channel to load from .cbin files. Default is 0.
+
+    Returns
+    -------
+    raw_audio : numpy.ndarray
+        1-d vector of samples. For .cbin files this is big-endian 16-bit signed
+        int, the same as returned by evfuncs.load_cbin.
+        For .wav files, data is returned as by scipy.io.wavfile.read.
+    samp_freq : int
+        sampling frequency in Hz
+
+    Notes
+    -----
+    The file must not be changed or deleted while the memory-mapped
+    array is still in use.
+    """
+    if filename.endswith(".cbin"):
+        if mmap is False or os.path.getsize(filename) == 0:
+            return evfuncs.load_cbin(filename, channel=channel)
+        rec_dict = evfuncs.readrecf(os.path.splitext(filename)[0] + ".rec")
+        # .cbin files are big endian, 16 bit signed int, as in evfuncs.load_cbin
+        data = np.memmap(filename, dtype=">i2", mode="r")
+        # step by number of channels; a strided view, so still memory-mapped
+        raw_audio = data[channel :: rec_dict["num_channels"]]
+        return raw_audio, rec_dict["sample_freq"]
+    elif filename.endswith(".wav"):
+        samp_freq, raw_audio = wavfile.read(filename, mmap=mmap)
+        return raw_audio, samp_freq
+    else:
+        raise ValueError(
+            "could not determine format of audio file {}, "
+            "extension should be .cbin or .wav".format(filename)
+        )
+
+
 def butter_bandpass(freq_cutoffs, samp_freq, order=8):
     """returns filter coefficients for Butterworth bandpass filter
 
@@ -582,6 +633,14 @@ class Syllable:
         index of this syllable in song.syls.labels
     label: int
         label of this syllable from song.syls.labels
+
+    Methods
+    -------
+    intermediate(name, func, *args)
+        returns an intermediate value used to compute features, e.g. a cepstrum,
+        that is computed only once per syllable and then reused
+    release_intermediate(name)
+        removes an intermediate value from the cache
     """
 
     def __init__(
@@ -607,6 +666,106 @@ class Syllable:
         self.timeBins = time_bins
         self.index = index
         self.label = label
+        self._intermediates = {}
+
+    def intermediate(self, name, func, *args):
+        """returns an intermediate value used to compute features from this
+        syllable. The first time it is requested, computes it by calling
+        func(*args) and caches it; after that returns cached value.
+
+        Parameters
+        ----------
+        name : str or tuple
+            key for intermediate value, e.g. 'spectral centroid'.
+            Features that depend on intermediate values list these keys
+            in hvc.features.feature_dicts.single_syl_features_intermediates.
+        func : callable
+            function that computes intermediate value
+        *args
+            arguments passed to func
+
+        Returns
+        -------
+        value
+            returned by func(*args)
+        """
+        if name not in self._intermediates:
+            self._intermediates[name] = func(*args)
+        return self._intermediates[name]
+
+    def release_intermediate(self, name):
+        """remove cached intermediate value, to free memory once
+        it is no longer needed to compute features"""
+        self._intermediates.pop(name, None)
+
+
+def _syl_spect_columns(onset, offset, num_cols, nperseg, noverlap):
+    """find columns of a spectrogram made from an entire file that correspond
+    to one segment, i.e. the columns whose FFT windows lie entirely within
+    the segment
+
+    Parameters
+    ----------
+    onset : int
+        onset of segment in samples
+    offset : int
+        offset of segment in samples
+    num_cols : int
+        number of columns (time bins) in spectrogram of entire file
+    nperseg : int
+        number of samples per segment for FFT
+    noverlap : int
+        number of overlapping samples in each segment
+
+    Returns
+    -------
+    start, stop : int
+        so that spect[:, start:stop] is the spectrogram of the segment.
+        If no window fits entirely within the segment, returns the single
+        column whose window is centered closest to the center of the segment.
+    """
+    step = nperseg - noverlap
+    # column j of the spectrogram is computed from samples [j*step, j*step+nperseg)
+    start = int(np.ceil(onset / step))
+    stop = int(np.floor((offset - nperseg) / step)) + 1
+    stop = min(stop, num_cols)
+    if stop <= start:
+        center = (onset + offset) / 2
+        start = int(round((center - nperseg / 2) / step))
+        start = min(max(start, 0), num_cols - 1)
+        stop = start + 1
+    return start, stop
+
+
+def segment_spect_columns(onsets_Hz, offsets_Hz, num_cols, nperseg, noverlap):
+    """find columns of a spectrogram made from an entire file that correspond
+    to each segment, as used by make_syls when whole_file_spect is True
+
+    Parameters
+    ----------
+    onsets_Hz : ndarray
+        onsets of segments in samples
+    offsets_Hz : ndarray
+        offsets of segments in samples
+    num_cols : int
+        number of columns (time bins) in spectrogram of entire file
+    nperseg : int
+        number of samples per segment for FFT
+    noverlap : int
+        number of overlapping samples in each segment
+
+    Returns
+    -------
+    starts, stops : ndarray
+        so that spect[:, starts[i]:stops[i]] is the spectrogram of segment i
+    """
+    starts = np.zeros(len(onsets_Hz), dtype=int)
+    stops = np.zeros(len(onsets_Hz), dtype=int)
+    for ind, (onset, offset) in enumerate(zip(onsets_Hz, offsets_Hz)):
+        starts[ind], stops[ind] = _syl_spect_columns(
+            onset, offset, num_cols, nperseg, noverlap
+        )
+    return starts, stops
 
 
 def make_syls(
@@ -619,6 +778,8 @@ def make_syls(
     labels_to_use="all",
     syl_spect_width=-1,
     return_as_stack=False,
+    whole_file_spect=False,
+    precomputed_spect=None,
 ):
     """Make spectrograms from syllables.
     This method isolates making spectrograms from selecting syllables
@@ -646,6 +807,41 @@ def make_syls(
         If a different value is given, then the duration of each spectrogram
         will be that value. Note that if any individual syllable has a duration
         greater than syl_spect_duration, the function raises an error.
+    return_as_stack : bool
+        if True, return spectrograms of all syllables as a 3-d array with
+        dimensions (samples, height, width). Default is False.
+    whole_file_spect : bool
+        if True, filter raw_audio and compute its spectrogram just once,
+        then make the spectrogram of each syllable a view of the columns
+        between its onset and offset. Default is False, in which case a
+        separate spectrogram is computed from the audio of each syllable.
+    precomputed_spect : tuple
+        of (spect, freq_bins, time_bins), as returned by spect_maker.make(raw_audio,
+        samp_freq). Used when whole_file_spect is True, so a spectrogram that was
+        already made from raw_audio is not computed again. Default is None.
+
+    Returns
+    -------
+    all_syls : list
+        of Syllable objects, or 3-d array if return_as_stack is True
+
+    Notes
+    -----
+    Spectrograms made with whole_file_spect=True are not identical to those
+    made from each syllable separately. Each column is the same FFT of a
+    window of nperseg samples, but columns are aligned to the start of the
+    file instead of the onset of the syllable. Hence:
+        - time bins can be shifted by less than one step, i.e.,
+          nperseg - noverlap samples, relative to the onset
+        - the number of columns can differ by at most one
+        - filters are applied to the whole file, so there are no transients
+          at the edges of each syllable from filtering a short segment
+        - syllables shorter than nperseg get the one column whose window
+          is centered closest to the center of the syllable, instead of a
+          spectrogram from a zero-padded or shortened window
+    If the audio is not filtered (filter_func is None and freq_cutoffs is
+    None) and onsets are multiples of the step, the two modes give the
+    same spectrograms.
     """
     if syl_spect_width > 0:
         if syl_spect_width > 1:
@@ -700,6 +896,27 @@ def make_syls(
             "array, not type {}".format(type(labels_to_use))
         )
 
+    if whole_file_spect and precomputed_spect is not None:
+        file_spect, freq_bins, file_time_bins = precomputed_spect
+    elif whole_file_spect:
+        try:
+            file_spect, freq_bins, file_time_bins = spect_maker.make(
+                raw_audio, samp_freq
+            )
+        except WindowError:
+            warnings.warn(
+                "Audio file not long enough for window function"
+                " set with current spect_params.\n"
+                "spect for all segments will be set to nan."
+            )
+            file_spect = np.nan
+    if whole_file_spect:
+        step = spect_maker.nperseg - spect_maker.noverlap
+        if "syl_spect_width_Hz" in locals() and file_spect is not np.nan:
+            # use the same number of columns for every syllable
+            width_cols = (syl_spect_width_Hz - spect_maker.nperseg) // step + 1
+            width_cols = min(max(width_cols, 1), file_spect.shape[-1])
+
     all_syls = []
 
     for ind, (label, onset, offset) in enumerate(zip(labels, onsets_Hz, offsets_Hz)):
@@ -721,25 +938,48 @@ def make_syls(
             right_width = width_diff - left_width
             if left_width > onset:  # if duration before onset is less than left_width
                 # (could happen with first onset)
-                syl_audio = raw_audio[0:syl_spect_width_Hz]
+                syl_start = 0
             elif offset + right_width > raw_audio.shape[-1]:
                 # if right width greater than length of file
-                syl_audio = raw_audio[-syl_spect_width_Hz:]
+                syl_start = raw_audio.shape[-1] - syl_spect_width_Hz
             else:
-                syl_audio = raw_audio[onset - left_width : offset + right_width]
+                syl_start = onset - left_width
+            syl_audio = raw_audio[syl_start : syl_start + syl_spect_width_Hz]
         else:
+            syl_start = onset
             syl_audio = raw_audio[onset:offset]
 
-        try:
-            spect, freq_bins, time_bins = spect_maker.make(syl_audio, samp_freq)
-        except WindowError as err:
-            warnings.warn(
-                "Segment {0} with label {1} "
-                "not long enough for window function"
-                " set with current spect_params.\n"
-                "spect will be set to nan.".format(ind, label)
-            )
-            spect, freq_bins, time_bins = (np.nan, np.nan, np.nan)
+        if whole_file_spect:
+            if file_spect is np.nan:
+                spect, freq_bins, time_bins = (np.nan, np.nan, np.nan)
+            else:
+                if "width_cols" in locals():
+                    start = int(round(syl_start / step))
+                    start = min(max(start, 0), file_spect.shape[-1] - width_cols)
+                    stop = start + width_cols
+                else:
+                    start, stop = _syl_spect_columns(
+                        onset,
+                        offset,
+                        file_spect.shape[-1],
+                        spect_maker.nperseg,
+                        spect_maker.noverlap,
+                    )
+                spect = file_spect[:, start:stop]
+                # keep time bins relative to start of segment, as they would be
+                # if spectrogram were made from just the segment
+                time_bins = file_time_bins[start:stop] - (syl_start / samp_freq)
+        else:
+            try:
+                spect, freq_bins, time_bins = spect_maker.make(syl_audio, samp_freq)
+            except WindowError as err:
+                warnings.warn(
+                    "Segment {0} with label {1} "
+                    "not long enough for window function"
+                    " set with current spect_params.\n"
+                    "spect will be set to nan.".format(ind, label)
+                )
+                spect, freq_bins, time_bins = (np.nan, np.nan, np.nan)
 
         curr_syl = Syllable(
             syl_audio=syl_audio,
@@ -21,6 +21,13 @@ def extract(
     save_features=None,
     save_prefix=None,
     return_features=None,
+    whole_file_spect=False,
+    n_jobs=1,
+    spect_cache_dir=None,
+    spect_cache_max_size=None,
+    prefetch_depth=0,
+    shard_dir=None,
+    shard_size=1,
 ):
     """high-level function for feature extraction.
     Accepts either a config file or a set of parameters and
@@ -69,6 +76,39 @@ def extract(
     return_features : bool
         if True, returns features and labels.
         If a config file is used, defaults to False. Otherwise, default is True.
+    whole_file_spect : bool
+        if True, compute one spectrogram per audio file and take the spectrogram
+        of each syllable from it, instead of computing one spectrogram per syllable.
+        Faster, but results differ slightly; see hvc.audiofileIO.make_syls.
+        If a config file is used, this is set by the 'whole_file_spect' key of each
+        item in the todo_list. Default is False.
+    n_jobs : int
+        number of worker processes used to extract features from audio files.
+        -1 means use all CPUs. If a config file is used, this is set by the
+        'n_jobs' key of each item in the todo_list. Default is 1.
+    spect_cache_dir : str
+        directory in which to cache spectrograms of audio files, so they are reused
+        by later calls to extract with the same spect_params. Only used when
+        whole_file_spect is True. If a config file is used, this is set by the
+        'spect_cache_dir' key of each item in the todo_list. Default is None.
+    spect_cache_max_size : int
+        maximum size of spectrogram cache in bytes. If a config file is used, this is
+        set by the 'spect_cache_max_size' key of each item in the todo_list.
+        Default is None, i.e. no limit.
+    prefetch_depth : int
+        number of audio files to read ahead on background threads while features
+        are extracted from the current file. Only used when n_jobs is 1.
+        If a config file is used, this is set by the 'prefetch_depth' key of each
+        item in the todo_list. Default is 0, i.e. no prefetching.
+    shard_dir : str
+        directory in which to save features as shards while they are extracted,
+        so that an interrupted extraction can be resumed by running it again
+        with the same shard_dir. See hvc.features.extract.FeatureExtractor.extract.
+        If a config file is used, this is set by the 'shard_dir' key of each item
+        in the todo_list. Default is None.
+    shard_size : int
+        number of audio files in each shard. If a config file is used, this is set
+        by the 'shard_size' key of each item in the todo_list. Default is 1.
     """
     if config_file and (
         data_dirs
@@ -131,6 +171,10 @@ def extract(
             else:
                 extract_init_params["spect_params"] = extract_config["spect_params"]
 
+            for key in ("whole_file_spect", "spect_cache_dir", "spect_cache_max_size"):
+                if key in todo:
+                    extract_init_params[key] = todo[key]
+
             fe = features.extract.FeatureExtractor(**extract_init_params)
 
             extract_params = {
@@ -145,6 +189,18 @@ def extract(
                 else:
                     extract_params["return_features"] = return_features
 
+            if "n_jobs" in todo:
+                extract_params["n_jobs"] = todo["n_jobs"]
+
+            if "prefetch_depth" in todo:
+                extract_params["prefetch_depth"] = todo["prefetch_depth"]
+
+            if "shard_dir" in todo:
+                extract_params["shard_dir"] = todo["shard_dir"]
+
+            if "shard_size" in todo:
+                extract_params["shard_size"] = todo["shard_size"]
+
             if "data_dirs" in todo:
                 extract_params["data_dirs"] = todo["data_dirs"]
                 extract_params["data_dirs_validated"] = True
@@ -214,6 +270,9 @@ def extract(
                 extract_init_params["feature_list_group_ID"] = feature_list_group_ID
                 extract_init_params["feature_group_ID_dict"] = feature_group_ID_dict
             extract_init_params["feature_list"] = feature_list
+        extract_init_params["whole_file_spect"] = whole_file_spect
+        extract_init_params["spect_cache_dir"] = spect_cache_dir
+        extract_init_params["spect_cache_max_size"] = spect_cache_max_size
 
         fe = features.extract.FeatureExtractor(**extract_init_params)
 
@@ -224,6 +283,10 @@ def extract(
             "save_features": save_features,
             "save_prefix": save_prefix,
             "return_features": return_features,
+            "n_jobs": n_jobs,
+            "prefetch_depth": prefetch_depth,
+            "shard_dir": shard_dir,
+            "shard_size": shard_size,
         }
         if data_dirs:
             extract_params["data_dirs"] = data_dirs
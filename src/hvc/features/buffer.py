@@ -0,0 +1,130 @@
+"""
+preallocated buffers for features, used by FeatureExtractor
+so that feature arrays are not grown by repeated calls to np.concatenate
+"""
+import numpy as np
+
+from .feature_dicts import single_syl_features_switch_case_dict
+from .feature_dicts import multiple_syl_features_switch_case_dict
+from .feature_dicts import spectrum_width_features
+
+
+def num_freq_bins(spectrogram_maker, samp_freq):
+    """number of frequency bins (rows) in spectrograms
+    returned by Spectrogram.make for a given sampling frequency
+
+    Parameters
+    ----------
+    spectrogram_maker : hvc.audiofileIO.Spectrogram
+        instance used to make spectrograms
+    samp_freq : int
+        sampling frequency in Hz
+
+    Returns
+    -------
+    num_freq_bins : int
+    """
+    freq_bins = np.fft.rfftfreq(spectrogram_maker.nperseg, 1 / samp_freq)
+    if spectrogram_maker.remove_dc:
+        freq_bins = freq_bins[1:]
+    if spectrogram_maker.freqCutoffs is not None:
+        freq_bins = freq_bins[
+            (freq_bins >= spectrogram_maker.freqCutoffs[0])
+            & (freq_bins <= spectrogram_maker.freqCutoffs[1])
+        ]
+    return freq_bins.shape[0]
+
+
+def feature_column_widths(feature_list, spectrogram_maker, samp_freq):
+    """number of columns that each feature in feature_list occupies in a
+    features array
+
+    Parameters
+    ----------
+    feature_list : list
+        of str, names of features
+    spectrogram_maker : hvc.audiofileIO.Spectrogram
+        instance used to make spectrograms
+    samp_freq : int
+        sampling frequency in Hz
+
+    Returns
+    -------
+    widths : numpy.ndarray
+        of ints, same length as feature_list. Features that are not
+        put in the features array (i.e., neural network inputs) have width 0.
+    """
+    widths = np.zeros(len(feature_list), dtype=int)
+    for ftr_ind, feature in enumerate(feature_list):
+        if feature in spectrum_width_features:
+            # these features drop the first frequency bin, see tachibana._spectrum
+            widths[ftr_ind] = num_freq_bins(spectrogram_maker, samp_freq) - 1
+        elif (
+            feature in single_syl_features_switch_case_dict
+            or feature in multiple_syl_features_switch_case_dict
+        ):
+            widths[ftr_ind] = 1
+    return widths
+
+
+class FeatureBuffer:
+    """preallocated 2-d array that rows of features are written into.
+    When full, capacity is doubled, so that adding m rows costs O(m)
+    copies instead of the O(m^2) from growing an array with np.concatenate.
+
+    Attributes
+    ----------
+    num_rows : int
+        number of rows written to the buffer so far
+    num_columns : int
+        number of columns, i.e. total width of all features
+    """
+
+    def __init__(self, num_columns, initial_num_rows=1024, dtype=np.float64):
+        """__init__ for FeatureBuffer
+
+        Parameters
+        ----------
+        num_columns : int
+            number of columns, i.e. total width of all features
+        initial_num_rows : int
+            number of rows to preallocate. If the total number of rows is known
+            in advance, no reallocation is needed. Default is 1024.
+        dtype : numpy dtype
+            Default is np.float64.
+        """
+        self.num_columns = num_columns
+        self.num_rows = 0
+        self._arr = np.empty((max(initial_num_rows, 1), num_columns), dtype=dtype)
+
+    def append(self, rows):
+        """add rows to buffer
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            2-d array with num_columns columns
+        """
+        if rows.ndim != 2 or rows.shape[1] != self.num_columns:
+            raise ValueError(
+                "rows appended to FeatureBuffer must have shape (n, {}), "
+                "but shape was {}".format(self.num_columns, rows.shape)
+            )
+        new_num_rows = self.num_rows + rows.shape[0]
+        if new_num_rows > self._arr.shape[0]:
+            capacity = self._arr.shape[0]
+            while capacity < new_num_rows:
+                capacity *= 2
+            new_arr = np.empty((capacity, self.num_columns), dtype=self._arr.dtype)
+            new_arr[: self.num_rows] = self._arr[: self.num_rows]
+            self._arr = new_arr
+        self._arr[self.num_rows : new_num_rows] = rows
+        self.num_rows = new_num_rows
+
+    def to_array(self):
+        """returns array of all rows written to buffer"""
+        if self.num_rows == self._arr.shape[0]:
+            return self._arr
+        else:
+            # copy so unused capacity is released
+            return self._arr[: self.num_rows].copy()
@@ -1,18 +1,27 @@
+import functools
+import itertools
+import json
 import os
 import warnings
 from glob import glob
 
-import evfuncs
 import numpy as np
-from scipy.io import wavfile
 import joblib
 
 import hvc.utils
+from hvc.__about__ import __version__
 import hvc.utils.annotation
 import hvc.audiofileIO
+from hvc.utils.spect_cache import SpectrogramCache
+from hvc.utils.prefetch import Prefetcher
+from hvc.utils.shards import ShardStore
+from hvc.utils.features import save_feature_file
 from .feature_dicts import single_syl_features_switch_case_dict
 from .feature_dicts import multiple_syl_features_switch_case_dict
 from .feature_dicts import neural_net_features_switch_case_dict
+from .feature_dicts import single_syl_features_intermediates
+from .buffer import feature_column_widths, FeatureBuffer
+from .fused import fused_features, fused_features_list
 
 
 class FeatureExtractor:
@@ -34,6 +43,19 @@ class FeatureExtractor:
         e.g. {0: 'knn', 1: 'svm'}
     segment_params : dict
         parameters used to segment audio file into syllables
+    whole_file_spect : bool
+        if True, compute one spectrogram per audio file and take the
+        spectrogram of each syllable from its columns, instead of computing
+        a separate spectrogram for every syllable.
+        See hvc.audiofileIO.make_syls for how results differ.
+    spect_cache : hvc.utils.spect_cache.SpectrogramCache
+        cache where spectrograms of whole files are saved and then reused
+        by later extractions with the same spect_params.
+        Only used when whole_file_spect is True. None if no cache is used.
+    io_stats : dict
+        counters of time spent waiting for audio files to be read during the
+        last call to extract with n_jobs=1, as returned by
+        hvc.utils.prefetch.Prefetcher.io_stats. None before extract is called.
 
     Methods
     -------
@@ -47,6 +69,12 @@ class FeatureExtractor:
         helper function, extracts features from a single file
     """
 
+    # class attribute so that instances pickled before this option existed
+    # still have a value for it when loaded
+    whole_file_spect = False
+    spect_cache = None
+    io_stats = None
+
     def __init__(
         self,
         spect_params,
@@ -54,6 +82,9 @@ class FeatureExtractor:
         feature_list_group_ID=None,
         feature_group_ID_dict=None,
         segment_params=None,
+        whole_file_spect=False,
+        spect_cache_dir=None,
+        spect_cache_max_size=None,
     ):
         """__init__ for FeatureExtractor
 
@@ -78,6 +109,19 @@ class FeatureExtractor:
             as defined for hvc.audiofileIO.segment_song.
             Not required if user supplies segments (i.e. syllable onsets/offsets).
             Default is None.
+        whole_file_spect : bool
+            if True, compute one spectrogram per audio file and take the
+            spectrogram of each syllable from its columns.
+            Default is False.
+        spect_cache_dir : str
+            directory in which to cache spectrograms of whole files, so they are not
+            computed again when extracting features from the same files with the
+            same spect_params. Only used when whole_file_spect is True.
+            Default is None, in which case spectrograms are not cached.
+        spect_cache_max_size : int
+            maximum size of cache in bytes. Least recently used spectrograms
+            are removed when the cache becomes larger.
+            Default is None, i.e. no limit.
         """
         self.spect_params = spect_params
         self.spectrogram_maker = hvc.audiofileIO.Spectrogram(**self.spect_params)
@@ -90,6 +134,73 @@ class FeatureExtractor:
         if feature_list_group_ID:
             self.feature_list_group_ID = feature_list_group_ID
             self.feature_group_ID_dict = feature_group_ID_dict
+        self.whole_file_spect = whole_file_spect
+        if spect_cache_dir:
+            self.spect_cache = SpectrogramCache(
+                spect_cache_dir, max_size=spect_cache_max_size
+            )
+
+    def save_manifest(self, filename):
+        """save parameters needed to re-create this FeatureExtractor
+        in a small JSON file, an "extractor manifest".
+
+        Used e.g. by hvc.select, so that hvc.predict can make a FeatureExtractor
+        without loading the feature file used to train a model.
+
+        Parameters
+        ----------
+        filename : str
+            name of JSON file
+        """
+        manifest = {
+            "hvc_version": __version__,
+            "spect_params": self.spect_params,
+            "segment_params": self.segment_params,
+            "feature_list": self.feature_list,
+            "whole_file_spect": self.whole_file_spect,
+        }
+        if hasattr(self, "feature_list_group_ID"):
+            manifest["feature_list_group_ID"] = self.feature_list_group_ID
+            manifest["feature_group_ID_dict"] = self.feature_group_ID_dict
+
+        def _to_json(obj):
+            if isinstance(obj, np.generic):
+                return obj.item()
+            elif isinstance(obj, np.ndarray):
+                return obj.tolist()
+            raise TypeError(
+                "Object of type {} is not JSON serializable".format(type(obj).__name__)
+            )
+
+        with open(filename, "w") as fp:
+            json.dump(manifest, fp, indent=2, default=_to_json)
+
+    @classmethod
+    def from_manifest(cls, filename):
+        """make a FeatureExtractor from an extractor manifest
+        saved by FeatureExtractor.save_manifest
+
+        Parameters
+        ----------
+        filename : str
+            name of JSON file
+
+        Returns
+        -------
+        feature_extractor : FeatureExtractor
+        """
+        with open(filename) as fp:
+            manifest = json.load(fp)
+        init_params = {
+            "spect_params": manifest["spect_params"],
+            "feature_list": manifest["feature_list"],
+            "segment_params": manifest["segment_params"],
+            "whole_file_spect": manifest["whole_file_spect"],
+        }
+        if "feature_list_group_ID" in manifest:
+            init_params["feature_list_group_ID"] = manifest["feature_list_group_ID"]
+            init_params["feature_group_ID_dict"] = manifest["feature_group_ID_dict"]
+        return cls(**init_params)
 
     def extract(
         self,
@@ -104,6 +215,10 @@ class FeatureExtractor:
         save_features=True,
         save_prefix="features_created_",
         return_features=True,
+        n_jobs=1,
+        prefetch_depth=0,
+        shard_dir=None,
+        shard_size=1,
     ):
         """extract features and save feature files
 
@@ -149,6 +264,32 @@ class FeatureExtractor:
         return_features : bool
             if True, return dict that contains all extracted features.
             Default is True.
+        n_jobs : int
+            number of worker processes used to segment audio files and
+            extract features from them, as for joblib.Parallel.
+            -1 means use all CPUs. Results are collected in the same order
+            as the audio files, so output is identical to n_jobs=1.
+            Default is 1, i.e. files are processed serially.
+        prefetch_depth : int
+            number of audio files to read ahead on background threads,
+            while features are extracted from the current file.
+            Only used when n_jobs is 1. Default is 0, i.e. each file is
+            read (memory-mapped) only when features are extracted from it.
+            After extracting with n_jobs=1, counters of time spent waiting for
+            audio files to be read are in the io_stats attribute, a dict
+            as returned by hvc.utils.prefetch.Prefetcher.io_stats.
+        shard_dir : str
+            directory in which to save features as shards while they are extracted,
+            along with a manifest of the audio files in each shard. If extraction is
+            interrupted, calling extract again with the same shard_dir only extracts
+            features from files that are not already in a shard, e.g. files that
+            were added to data_dirs. Once all files are in shards, they are merged
+            into one feature file. Default is None, i.e. features are only saved
+            once they have been extracted from all files.
+        shard_size : int
+            number of audio files in each shard. When n_jobs is greater than 1,
+            files in one shard are processed in parallel, so shard_size should be at
+            least n_jobs. Only used if shard_dir is specified. Default is 1.
         """
         if data_dirs and annotation_file:
             raise ValueError(
@@ -181,140 +322,14 @@ class FeatureExtractor:
                 os.makedirs(output_dir_with_path)
             output_dir = output_dir_with_path
 
-        if data_dirs:
-            if data_dirs_validated is False:
-                validated_data_dirs = []
-                for data_dir in data_dirs:
-                    cwd = os.getcwd()
-                    if not os.path.isdir(data_dir):
-                        # if item is not absolute path to dir
-                        # try adding item to absolute path to config_file
-                        # i.e. assume it is written relative to config file
-                        data_dir = os.path.join(
-                            os.path.dirname(cwd), os.path.normpath(data_dir)
-                        )
-                        if not os.path.isdir(data_dir):
-                            raise ValueError(
-                                "directory {} in data_dirs is not a valid "
-                                "directory.".format(data_dir)
-                            )
-                    validated_data_dirs.append(data_dir)
-                data_dirs = validated_data_dirs
-
-            # try to auto-discover file format
-            if file_format is None:
-                os.chdir(data_dirs[0])
-                cbins = glob("*.cbin")
-                wavs = glob("*.wav")
-                if cbins and wavs:
-                    raise ValueError(
-                        "Could not determine file format for feature extract"
-                        " automatically,found more than one valid format "
-                        "in {}.".format(data_dirs[0])
-                    )
-                elif cbins and wavs == []:
-                    print(
-                        "found .cbin files in {}, will use .cbin as file format".format(
-                            data_dirs[0]
-                        )
-                    )
-                    file_format = "cbin"
-                elif wavs and cbins == []:
-                    file_format = "wav"
-                    print(
-                        "found .wav files in {}, will use .wav as file format".format(
-                            data_dirs[0]
-                        )
-                    )
-
-            if segment:
-                annotation_list = []
-                if file_format == "cbin":
-                    search_str = "*.cbin"
-                elif file_format == "wav":
-                    search_str = "*.wav"
-                audio_files = []
-                for data_dir in data_dirs:
-                    audio_files.extend(glob(os.path.join(data_dir, search_str)))
-                for audio_file in audio_files:
-                    if file_format == "cbin":
-                        raw_audio, samp_freq = evfuncs.load_cbin(audio_file)
-                    elif file_format == "wav":
-                        samp_freq, raw_audio = wavfile.read(audio_file)
-                        search_str = "*.wav"
-                    segment_dict = self.segmenter.segment(
-                        raw_audio, method="evsonganaly", samp_freq=samp_freq
-                    )
-                    fake_labels = np.full((segment_dict["onsets_s"].shape), "-")
-                    annotation_dict = {
-                        "filename": audio_file,
-                        "labels": fake_labels,
-                        "onsets_s": segment_dict["onsets_s"],
-                        "offsets_s": segment_dict["offsets_s"],
-                    }
-                    if "onsets_Hz" in segment_dict:
-                        # onsets_Hz will always be in segment_dict unless someone uses
-                        # 'amp' version of segment, but that would make everything else
-                        # crash. Neglecting that issue at the moment
-                        annotation_dict["onsets_Hz"] = segment_dict["onsets_Hz"]
-                        annotation_dict["offsets_Hz"] = segment_dict["offsets_Hz"]
-                    annotation_list.append(annotation_dict)
-
-            elif segment is False:
-                # if we are not segmenting songs (e.g. for prediction of unlabeled song)
-                # but user passed data_dir instead of annotation_file,
-                # look for annotation files (for now just .not.mat files or Annotation.xml files)
-                notmats = []
-                annot_xmls = []
-                for data_dir in data_dirs:
-                    notmat_search_str = os.path.join(data_dir, "*.not.mat")
-                    notmats_this_dir = glob(notmat_search_str)
-                    if notmats_this_dir:
-                        notmats.extend(notmats_this_dir)
-                    else:
-                        if file_format == "cbin":
-                            # if audio files are .cbin, we expect .not.mat files, so raise error
-                            raise ValueError(
-                                "Identified file format as .cbin but did not find "
-                                "files with annotations in data_dir {}.".format(
-                                    data_dir
-                                )
-                            )
-                        elif file_format == "wav":
-                            # if audio files are .wav, annotation could be xml files (from Koumura dataset),
-                            # try looking in parent directory
-                            annot_xml = glob(
-                                os.path.join(data_dir, "..", "Annotation.xml")
-                            )
-                            if annot_xml:
-                                annot_xmls.extend(annot_xml)
-                            else:
-                                raise ValueError(
-                                    "Identified file format as .wav but did not find "
-                                    "files with annotations in data_dir {}.".format(
-                                        data_dir
-                                    )
-                                )
-
-                annotation_list = []  # list of annotation_dicts
-                if notmats:
-                    for notmat in notmats:
-                        annotation_dict = hvc.utils.annotation.notmat_to_annot_dict(
-                            notmat
-                        )
-                        annotation_list.append(annotation_dict)
-
-                if annot_xmls:
-                    for annot_xml in annot_xmls:
-                        annotation_list.extend(
-                            hvc.utils.annotation.xml_to_annot_list(annot_xml)
-                        )
-
-        # if user passed argument for annotation_file, not data_dirs
-        elif annotation_file:
-            # load annotation file
-            # then convert to annotation_list
-            annotation_list = hvc.utils.annotation.csv_to_annot_list(annotation_file)
+        annotation_list, file_format = self._annotation_list(
+            data_dirs,
+            data_dirs_validated,
+            file_format,
+            annotation_file,
+            segment,
+            n_jobs,
+        )
 
         num_songfiles = len(annotation_list)
         all_labels = []
@@ -324,18 +339,71 @@ class FeatureExtractor:
         songfiles = []
         songfile_IDs = []
         songfile_ID_counter = 0
-        for file_num, annotation_dict in enumerate(annotation_list):
-            print("Processing audio file {} of {}.".format(file_num + 1, num_songfiles))
-            # segment_params defined for todo_list item takes precedence over any default
-            # defined for `extract` config
-            extract_dict = self._from_file(
-                annotation_dict["filename"],
-                annotation_dict["labels"],
-                annotation_dict["onsets_Hz"],
-                annotation_dict["offsets_Hz"],
-                labels_to_use=labels_to_use,
+        # count syllables that features will be extracted from,
+        # so array of features from all files only has to be allocated once
+        num_syls_all_files = 0
+        for annotation_dict in annotation_list:
+            if labels_to_use == "all":
+                num_syls_all_files += len(annotation_dict["labels"])
+            else:
+                num_syls_all_files += sum(
+                    [label in labels_to_use for label in annotation_dict["labels"]]
+                )
+
+        if shard_dir is not None:
+            shard_store = ShardStore(
+                shard_dir,
+                settings={
+                    "feature_list": self.feature_list,
+                    "spect_params": self.spect_params,
+                    "labels_to_use": labels_to_use,
+                    "whole_file_spect": self.whole_file_spect,
+                },
+            )
+            to_extract = [
+                annotation_dict
+                for annotation_dict in annotation_list
+                if not shard_store.has(annotation_dict)
+            ]
+            print(
+                "Found features from {} of {} audio files in shards in {}.".format(
+                    num_songfiles - len(to_extract), num_songfiles, shard_dir
+                )
             )
+            batch_size = shard_size
+        else:
+            to_extract = annotation_list
+            batch_size = None
 
+        if n_jobs == 1:
+            # when prefetching, read whole files into memory on background threads,
+            # instead of memory-mapping them and reading during feature extraction
+            prefetcher = Prefetcher(
+                functools.partial(hvc.audiofileIO.load_audio, mmap=prefetch_depth == 0),
+                [annotation_dict["filename"] for annotation_dict in to_extract],
+                depth=prefetch_depth,
+            )
+            extract_dicts = self._from_files_serial(
+                to_extract, labels_to_use, prefetcher
+            )
+        else:
+            extract_dicts = self._from_files_parallel(
+                to_extract, labels_to_use, n_jobs, batch_size
+            )
+
+        if shard_dir is not None:
+            # save a shard every shard_size files, so that if extraction is
+            # interrupted, it resumes from the last shard saved
+            for shard_start in range(0, len(to_extract), shard_size):
+                shard_annotations = to_extract[shard_start : shard_start + shard_size]
+                shard_store.add(
+                    shard_annotations,
+                    list(itertools.islice(extract_dicts, len(shard_annotations))),
+                )
+            # then merge all shards, in the same order as annotation_list
+            extract_dicts = shard_store.extract_dicts(annotation_list)
+
+        for annotation_dict, extract_dict in zip(annotation_list, extract_dicts):
             if extract_dict is None:
                 # because no labels from labels_to_use were found in songfile
                 continue
@@ -360,12 +428,12 @@ class FeatureExtractor:
             songfile_ID_counter += 1
 
             if "features_arr" in extract_dict:
-                if "features_from_all_files" in locals():
-                    features_from_all_files = np.concatenate(
-                        (features_from_all_files, extract_dict["features_arr"]), axis=0
+                if "features_buffer" not in locals():
+                    features_buffer = FeatureBuffer(
+                        extract_dict["features_arr"].shape[-1],
+                        initial_num_rows=num_syls_all_files,
                     )
-                else:
-                    features_from_all_files = extract_dict["features_arr"]
+                features_buffer.append(extract_dict["features_arr"])
 
             if "neuralnet_inputs_dict" in extract_dict:
                 if "neuralnet_inputs_all_files" in locals():
@@ -385,6 +453,21 @@ class FeatureExtractor:
                             input_arr
                         ]  # make list so we can append
 
+        if "features_buffer" in locals():
+            features_from_all_files = features_buffer.to_array()
+
+        if n_jobs == 1:
+            self.io_stats = prefetcher.io_stats()
+            print(
+                "Waited {:.3f} s for {} of {} audio files to be read "
+                "(prefetch depth {}).".format(
+                    self.io_stats["wait_time"],
+                    self.io_stats["num_waits"],
+                    self.io_stats["num_items"],
+                    self.io_stats["depth"],
+                )
+            )
+
         if save_features:
             feature_file = os.path.join(output_dir, save_prefix + hvc.utils.timestamp())
             feature_file_dict = {
@@ -455,7 +538,7 @@ class FeatureExtractor:
                         "more than one key in dictionary."
                     )
 
-            joblib.dump(feature_file_dict, feature_file)
+            save_feature_file(feature_file_dict, feature_file)
 
         if return_features:
             extract_dict = {"labels": all_labels}
@@ -465,6 +548,308 @@ class FeatureExtractor:
                 extract_dict["neuralnet_inputs"] = neuralnet_inputs_all_files
             return extract_dict
 
+    def iter_extract(
+        self,
+        labels_to_use="all",
+        data_dirs=None,
+        data_dirs_validated=False,
+        file_format=None,
+        annotation_file=None,
+        segment=False,
+        n_jobs=1,
+        prefetch_depth=0,
+    ):
+        """generator that extracts features from one audio file at a time,
+        and yields them without saving or concatenating them, e.g. so they can be
+        passed directly to a classifier. Parameters are as for extract.
+
+        Yields
+        ------
+        annotation_dict : dict
+            with keys filename, labels, onsets_Hz, offsets_Hz
+        extract_dict : dict
+            as returned by _from_file, with keys labels, onsets_Hz, offsets_Hz,
+            samp_freq, and features_arr and/or neuralnet_inputs_dict.
+            Files where no features were extracted, i.e. because no segments
+            had labels in labels_to_use, are skipped.
+        """
+        if data_dirs and annotation_file:
+            raise ValueError(
+                "received values for both data_dirs and "
+                "annotation_file arguments, unclear which to use. "
+                "Please only specify one or the other."
+            )
+
+        if segment:
+            if not hasattr(self, "segment_params"):
+                raise ValueError(
+                    "FeatureExtractor.iter_extract was called with segment=True, "
+                    "but FeatureExtractor does not have segmenting "
+                    "parameters set."
+                )
+
+        annotation_list, file_format = self._annotation_list(
+            data_dirs,
+            data_dirs_validated,
+            file_format,
+            annotation_file,
+            segment,
+            n_jobs,
+        )
+
+        if n_jobs == 1:
+            prefetcher = Prefetcher(
+                functools.partial(hvc.audiofileIO.load_audio, mmap=prefetch_depth == 0),
+                [annotation_dict["filename"] for annotation_dict in annotation_list],
+                depth=prefetch_depth,
+            )
+            extract_dicts = self._from_files_serial(
+                annotation_list, labels_to_use, prefetcher
+            )
+        else:
+            # batches of n_jobs files, so the first results are yielded
+            # without waiting for all files to be processed
+            extract_dicts = self._from_files_parallel(
+                annotation_list, labels_to_use, n_jobs, batch_size=n_jobs
+            )
+
+        for annotation_dict, extract_dict in zip(annotation_list, extract_dicts):
+            if extract_dict is None:
+                continue
+            yield annotation_dict, extract_dict
+
+        if n_jobs == 1:
+            self.io_stats = prefetcher.io_stats()
+
+    def _annotation_list(
+        self,
+        data_dirs,
+        data_dirs_validated,
+        file_format,
+        annotation_file,
+        segment,
+        n_jobs,
+    ):
+        """helper function that makes list of annotation dicts, one for each audio
+        file that features will be extracted from, by segmenting audio files
+        in data_dirs, by loading annotation files in data_dirs, or by loading
+        annotation_file. Parameters are as for FeatureExtractor.extract.
+
+        Returns
+        -------
+        annotation_list : list
+            of annotation dicts
+        file_format : str
+            format of audio files, determined automatically if file_format was None
+        """
+        if data_dirs:
+            if data_dirs_validated is False:
+                validated_data_dirs = []
+                for data_dir in data_dirs:
+                    cwd = os.getcwd()
+                    if not os.path.isdir(data_dir):
+                        # if item is not absolute path to dir
+                        # try adding item to absolute path to config_file
+                        # i.e. assume it is written relative to config file
+                        data_dir = os.path.join(
+                            os.path.dirname(cwd), os.path.normpath(data_dir)
+                        )
+                        if not os.path.isdir(data_dir):
+                            raise ValueError(
+                                "directory {} in data_dirs is not a valid "
+                                "directory.".format(data_dir)
+                            )
+                    validated_data_dirs.append(data_dir)
+                data_dirs = validated_data_dirs
+
+            # try to auto-discover file format
+            if file_format is None:
+                os.chdir(data_dirs[0])
+                cbins = glob("*.cbin")
+                wavs = glob("*.wav")
+                if cbins and wavs:
+                    raise ValueError(
+                        "Could not determine file format for feature extract"
+                        " automatically,found more than one valid format "
+                        "in {}.".format(data_dirs[0])
+                    )
+                elif cbins and wavs == []:
+                    print(
+                        "found .cbin files in {}, will use .cbin as file format".format(
+                            data_dirs[0]
+                        )
+                    )
+                    file_format = "cbin"
+                elif wavs and cbins == []:
+                    file_format = "wav"
+                    print(
+                        "found .wav files in {}, will use .wav as file format".format(
+                            data_dirs[0]
+                        )
+                    )
+
+            if segment:
+                annotation_list = []
+                if file_format == "cbin":
+                    search_str = "*.cbin"
+                elif file_format == "wav":
+                    search_str = "*.wav"
+                audio_files = []
+                for data_dir in data_dirs:
+                    audio_files.extend(glob(os.path.join(data_dir, search_str)))
+                if n_jobs == 1:
+                    for audio_file in audio_files:
+                        annotation_list.append(
+                            self._segment_file(audio_file, file_format)
+                        )
+                else:
+                    annotation_list = joblib.Parallel(n_jobs=n_jobs)(
+                        joblib.delayed(self._segment_file)(audio_file, file_format)
+                        for audio_file in audio_files
+                    )
+
+            elif segment is False:
+                # if we are not segmenting songs (e.g. for prediction of unlabeled song)
+                # but user passed data_dir instead of annotation_file,
+                # look for annotation files (for now just .not.mat files or Annotation.xml files)
+                notmats = []
+                annot_xmls = []
+                for data_dir in data_dirs:
+                    notmat_search_str = os.path.join(data_dir, "*.not.mat")
+                    notmats_this_dir = glob(notmat_search_str)
+                    if notmats_this_dir:
+                        notmats.extend(notmats_this_dir)
+                    else:
+                        if file_format == "cbin":
+                            # if audio files are .cbin, we expect .not.mat files, so raise error
+                            raise ValueError(
+                                "Identified file format as .cbin but did not find "
+                                "files with annotations in data_dir {}.".format(
+                                    data_dir
+                                )
+                            )
+                        elif file_format == "wav":
+                            # if audio files are .wav, annotation could be xml files (from Koumura dataset),
+                            # try looking in parent directory
+                            annot_xml = glob(
+                                os.path.join(data_dir, "..", "Annotation.xml")
+                            )
+                            if annot_xml:
+                                annot_xmls.extend(annot_xml)
+                            else:
+                                raise ValueError(
+                                    "Identified file format as .wav but did not find "
+                                    "files with annotations in data_dir {}.".format(
+                                        data_dir
+                                    )
+                                )
+
+                annotation_list = []  # list of annotation_dicts
+                if notmats:
+                    for notmat in notmats:
+                        annotation_dict = hvc.utils.annotation.notmat_to_annot_dict(
+                            notmat
+                        )
+                        annotation_list.append(annotation_dict)
+
+                if annot_xmls:
+                    for annot_xml in annot_xmls:
+                        annotation_list.extend(
+                            hvc.utils.annotation.xml_to_annot_list(annot_xml)
+                        )
+
+        # if user passed argument for annotation_file, not data_dirs
+        elif annotation_file:
+            # load annotation file
+            # then convert to annotation_list
+            annotation_list = hvc.utils.annotation.csv_to_annot_list(annotation_file)
+
+        return annotation_list, file_format
+
+    def _segment_file(self, audio_file, file_format):
+        """helper function that segments a single audio file
+        and returns an annotation_dict with placeholder labels
+
+        Parameters
+        ----------
+        audio_file : str
+            full path to audio file
+        file_format : str
+            {'cbin','wav'}
+            format of audio file
+
+        Returns
+        -------
+        annotation_dict : dict
+            with keys filename, labels, onsets_s, offsets_s, onsets_Hz, offsets_Hz
+        """
+        raw_audio, samp_freq = hvc.audiofileIO.load_audio(audio_file)
+        segment_dict = self.segmenter.segment(
+            raw_audio, method="evsonganaly", samp_freq=samp_freq
+        )
+        fake_labels = np.full((segment_dict["onsets_s"].shape), "-")
+        annotation_dict = {
+            "filename": audio_file,
+            "labels": fake_labels,
+            "onsets_s": segment_dict["onsets_s"],
+            "offsets_s": segment_dict["offsets_s"],
+        }
+        if "onsets_Hz" in segment_dict:
+            # onsets_Hz will always be in segment_dict unless someone uses
+            # 'amp' version of segment, but that would make everything else
+            # crash. Neglecting that issue at the moment
+            annotation_dict["onsets_Hz"] = segment_dict["onsets_Hz"]
+            annotation_dict["offsets_Hz"] = segment_dict["offsets_Hz"]
+        return annotation_dict
+
+    def _from_files_serial(self, annotation_list, labels_to_use, prefetcher):
+        """generator that extracts features from each file in annotation_list,
+        one after the other, and yields the extract_dict returned by _from_file.
+        Audio files are loaded by prefetcher, an instance of
+        hvc.utils.prefetch.Prefetcher"""
+        num_songfiles = len(annotation_list)
+        for file_num, (annotation_dict, (_, (raw_audio, samp_freq))) in enumerate(
+            zip(annotation_list, prefetcher)
+        ):
+            print("Processing audio file {} of {}.".format(file_num + 1, num_songfiles))
+            yield self._from_file(
+                annotation_dict["filename"],
+                annotation_dict["labels"],
+                annotation_dict["onsets_Hz"],
+                annotation_dict["offsets_Hz"],
+                labels_to_use=labels_to_use,
+                raw_audio=raw_audio,
+                samp_freq=samp_freq,
+            )
+
+    def _from_files_parallel(self, annotation_list, labels_to_use, n_jobs, batch_size):
+        """generator that extracts features from files in annotation_list with
+        joblib.Parallel, batch_size files at a time, and yields the extract_dict
+        returned by _from_file for each file. If batch_size is None, all files
+        are processed in one batch."""
+        if batch_size is None:
+            batch_size = max(len(annotation_list), 1)
+        print(
+            "Processing {} audio files with n_jobs={}.".format(
+                len(annotation_list), n_jobs
+            )
+        )
+        for batch_start in range(0, len(annotation_list), batch_size):
+            # joblib.Parallel returns results in the same order as the inputs
+            # so songfile_IDs etc. are the same as when files are processed serially
+            yield from joblib.Parallel(n_jobs=n_jobs)(
+                joblib.delayed(self._from_file)(
+                    annotation_dict["filename"],
+                    annotation_dict["labels"],
+                    annotation_dict["onsets_Hz"],
+                    annotation_dict["offsets_Hz"],
+                    labels_to_use=labels_to_use,
+                )
+                for annotation_dict in annotation_list[
+                    batch_start : batch_start + batch_size
+                ]
+            )
+
     def _from_file(
         self,
         filename,
@@ -473,6 +858,8 @@ class FeatureExtractor:
         offsets_Hz,
         labels_to_use,
         file_format=None,
+        raw_audio=None,
+        samp_freq=None,
     ):
         """helper function that extracts features from a single audio file
         containing birdsong.
@@ -499,6 +886,11 @@ class FeatureExtractor:
         file_format : str
             {'cbin','wav'}
             format of audio file
+        raw_audio : numpy.ndarray
+            audio loaded from filename, e.g. by a Prefetcher.
+            Default is None, in which case audio is loaded from filename.
+        samp_freq : int
+            sampling frequency of raw_audio. Required if raw_audio is not None.
 
         Returns
         -------
@@ -529,10 +921,9 @@ class FeatureExtractor:
                     dict where keys are names of a neuralnet model and value is corresponding
                     input for each model, e.g., 2-d array containing spectrogram
         """
-        if filename.endswith(".cbin"):
-            raw_audio, samp_freq = evfuncs.load_cbin(filename)
-        elif filename.endswith(".wav"):
-            samp_freq, raw_audio = wavfile.read(filename)
+        if raw_audio is None:
+            # memory-mapped, so only audio from segments is read into memory
+            raw_audio, samp_freq = hvc.audiofileIO.load_audio(filename)
 
         if labels_to_use == "all":
             use_these_labels_bool = np.ones((labels.shape)).astype(bool)
@@ -550,22 +941,93 @@ class FeatureExtractor:
             )
             return None
 
-        # initialize indexing array for features
-        # used to split back up into feature groups
-        feature_inds = []
+        # preallocate array for features,
+        # using number of columns that each feature occupies
+        # and number of syllables we will extract features from
+        num_syls = np.count_nonzero(use_these_labels_bool)
+        feature_widths = feature_column_widths(
+            self.feature_list, self.spectrogram_maker, samp_freq
+        )
+        # indexing array used to split back up into feature groups
+        feature_inds = np.repeat(np.arange(len(self.feature_list)), feature_widths)
+        column_stops = np.cumsum(feature_widths)
+        column_starts = column_stops - feature_widths
+        if feature_inds.shape[0] > 0:
+            # Initialize as nan so that if there are syllables from which feature could
+            # not be extracted, the value for that feature stays as nan
+            # (e.g. because segment was too short to make spectrogram
+            # with given spectrogram values)
+            features_arr = np.full((num_syls, feature_inds.shape[0]), np.nan)
+
+        # find last feature in list that needs each intermediate value (e.g. the
+        # cepstrum), so intermediates are computed only once for each syllable and
+        # then released from memory once no other features need them
+        release_after = {}
+        for ftr_ind, current_feature in enumerate(self.feature_list):
+            if current_feature in single_syl_features_intermediates:
+                for name in single_syl_features_intermediates[current_feature]:
+                    release_after[name] = ftr_ind
+
+        # when taking syllable spectrograms from a spectrogram of the whole file,
+        # make that spectrogram (or load it from the cache), then
+        # compute column-wise Tachibana features for all syllables at once
+        file_spect = None
+        if self.whole_file_spect and any(
+            [
+                feature in single_syl_features_switch_case_dict
+                for feature in self.feature_list
+            ]
+        ):
+            try:
+                if self.spect_cache is not None:
+                    file_spect = self.spect_cache.get_or_make(
+                        filename,
+                        self.spect_params,
+                        self.spectrogram_maker,
+                        raw_audio,
+                        samp_freq,
+                    )
+                else:
+                    file_spect = self.spectrogram_maker.make(raw_audio, samp_freq)
+            except hvc.audiofileIO.WindowError:
+                # make_syls will warn and set spects to nan
+                file_spect = None
+            if file_spect is not None and any(
+                [feature in fused_features_list for feature in self.feature_list]
+            ):
+                starts, stops = hvc.audiofileIO.segment_spect_columns(
+                    onsets_Hz[use_these_labels_bool],
+                    offsets_Hz[use_these_labels_bool],
+                    file_spect[0].shape[-1],
+                    self.spectrogram_maker.nperseg,
+                    self.spectrogram_maker.noverlap,
+                )
+                fused_ftrs = fused_features(
+                    self.feature_list,
+                    file_spect[0],
+                    file_spect[1],
+                    self.spectrogram_maker.nperseg,
+                    starts,
+                    stops,
+                )
 
         # loop through features first instead of syls because
         # some features do not require making spectrogram
         ########################################################################
-        # so how this loop works is, make an array of length syllables, and for#
-        # each syllable calculate the feature and then insert the values in    #
-        # the corresponding index. After looping through all syllables,        #
-        # concatenate w/growing features array.                                #
+        # so how this loop works is, for each feature, calculate the feature   #
+        # for each syllable and write the values into the columns of the      #
+        # preallocated features array that belong to that feature             #
         ########################################################################
         for ftr_ind, current_feature in enumerate(self.feature_list):
+            col_start, col_stop = column_starts[ftr_ind], column_stops[ftr_ind]
             # if this is a feature extracted from a single syllable, i.e.,
             # if this feature requires a spectrogram
-            if current_feature in single_syl_features_switch_case_dict:
+            if "fused_ftrs" in locals() and current_feature in fused_ftrs:
+                features_arr[:, col_start:col_stop] = fused_ftrs[
+                    current_feature
+                ].reshape(num_syls, col_stop - col_start)
+
+            elif current_feature in single_syl_features_switch_case_dict:
                 if "syls" not in locals():
                     syls = hvc.audiofileIO.make_syls(
                         raw_audio,
@@ -574,9 +1036,9 @@ class FeatureExtractor:
                         labels[use_these_labels_bool],
                         onsets_Hz[use_these_labels_bool],
                         offsets_Hz[use_these_labels_bool],
+                        whole_file_spect=self.whole_file_spect,
+                        precomputed_spect=file_spect,
                     )
-                if "curr_feature_arr" in locals():
-                    del curr_feature_arr
 
                 for ind, syl in enumerate(syls):
                     # extract current feature from every syllable
@@ -584,73 +1046,30 @@ class FeatureExtractor:
                         # can't extract feature so leave as nan
                         continue
                     ftr = single_syl_features_switch_case_dict[current_feature](syl)
-
-                    if "curr_feature_arr" in locals():
-                        if np.isscalar(ftr):
-                            curr_feature_arr[ind] = ftr
-                        else:
-                            # note have to add dimension with newaxis because np.concat requires
-                            # same number of dimensions, but extract_features returns 1d.
-                            # Decided to keep it explicit that we go to 2d here.
-                            curr_feature_arr[ind, :] = ftr[np.newaxis, :]
-                    else:  # if curr_feature_arr doesn't exist yet
-                        # initialize vector, if feature is a scalar, or matrix, if feature is a vector
-                        # where each element (scalar feature) or row (vector feature) is feature from
-                        # one syllable.
-                        # Initialize as nan so that if there are syllables from which feature could
-                        # not be extracted, the value for that feature stays as nan
-                        # (e.g. because segment was too short to make spectrogram
-                        # with given spectrogram values)
-                        if np.isscalar(ftr):
-                            curr_feature_arr = np.full((len(syls)), np.nan)
-                            # may not be on first syllable if first spectrogram was nan
-                            # so need to index into initialized array
-                            curr_feature_arr[ind] = ftr
-                        else:
-                            curr_feature_arr = np.full(
-                                (len(syls), ftr.shape[-1]), np.nan
+                    if np.size(ftr) != col_stop - col_start:
+                        raise ValueError(
+                            "feature '{}' from syllable {} in {} had {} values, "
+                            "but expected {}".format(
+                                current_feature,
+                                ind,
+                                filename,
+                                np.size(ftr),
+                                col_stop - col_start,
                             )
-                            # may not be on first syllable if first spectrogram was nan
-                            # so need to index into initialized array
-                            curr_feature_arr[ind, :] = ftr[
-                                np.newaxis, :
-                            ]  # make 2-d for concatenate
-
-                # after looping through all syllables:
-                if "features_arr" in locals():
-                    if np.isscalar(ftr):
-                        # if feature is scalar,
-                        # then `ftr` from all syllables will be a (row) vector
-                        # so transpose to column vector then add to growing end of 2d matrix
-                        feature_inds.extend([ftr_ind])
-                        features_arr = np.concatenate(
-                            (features_arr, curr_feature_arr[np.newaxis, :].T), axis=1
-                        )
-                    else:
-                        # if feature is not scalar,
-                        # `ftr` will be 2-d, so don't transpose before you concatenate
-                        feature_inds.extend([ftr_ind] * ftr.shape[-1])
-                        features_arr = np.concatenate(
-                            (features_arr, curr_feature_arr), axis=1
                         )
-                else:  # if 'features_arr' doesn't exist yet
-                    if np.isscalar(ftr):
-                        feature_inds.extend([ftr_ind])
-                    else:
-                        feature_inds.extend([ftr_ind] * ftr.shape[-1])
-                    features_arr = curr_feature_arr
+                    features_arr[ind, col_start:col_stop] = ftr
+
+                for name, last_ftr_ind in release_after.items():
+                    if last_ftr_ind == ftr_ind:
+                        for syl in syls:
+                            syl.release_intermediate(name)
 
             elif current_feature in multiple_syl_features_switch_case_dict:
                 curr_feature_arr = multiple_syl_features_switch_case_dict[
                     current_feature
                 ](onsets_Hz, offsets_Hz, use_these_labels_bool)
-                feature_inds.extend([ftr_ind])
-                if "features_arr" in locals():
-                    features_arr = np.concatenate(
-                        (features_arr, curr_feature_arr[:, np.newaxis]), axis=1
-                    )
-                else:
-                    features_arr = curr_feature_arr[:, np.newaxis]
+                features_arr[:, col_start] = curr_feature_arr
+
             elif current_feature in neural_net_features_switch_case_dict:
                 curr_neuralnet_input = neural_net_features_switch_case_dict[
                     current_feature
@@ -661,6 +1080,7 @@ class FeatureExtractor:
                     labels[use_these_labels_bool],
                     onsets_Hz[use_these_labels_bool],
                     offsets_Hz[use_these_labels_bool],
+                    whole_file_spect=self.whole_file_spect,
                 )
                 if "neuralnet_inputs_dict" in locals():
                     if current_feature in neuralnet_inputs_dict:
@@ -683,7 +1103,7 @@ class FeatureExtractor:
         extract_dict["offsets_Hz"] = offsets_Hz[use_these_labels_bool]
         if "features_arr" in locals():
             extract_dict["features_arr"] = features_arr
-            extract_dict["feature_inds"] = np.asarray(feature_inds)
+            extract_dict["feature_inds"] = feature_inds
         if "neuralnet_inputs_dict" in locals():
             extract_dict["neuralnet_inputs_dict"] = neuralnet_inputs_dict
         extract_dict["samp_freq"] = samp_freq
@@ -36,6 +36,44 @@ single_syl_features_switch_case_dict = {
     "delta hi lo ratio": knn.delta_hi_lo_ratio,
 }
 
+# intermediate values that each single-syllable feature needs, as cached by
+# hvc.audiofileIO.Syllable.intermediate. FeatureExtractor uses these to compute each
+# intermediate only once per syllable and release it after the last feature needing it
+_moments = ["spect probability", "spectral centroid", "spectral variance"]
+single_syl_features_intermediates = {
+    "mean spectrum": ["spectrum"],
+    "mean delta spectrum": ["spectrum"],
+    "mean cepstrum": ["cepstrum for mean"],
+    "mean delta cepstrum": ["cepstrum for mean"],
+    "duration": [],
+    "mean spectral centroid": _moments[:2],
+    "mean spectral spread": _moments + ["spectral spread"],
+    "mean spectral skewness": _moments + ["spectral skewness"],
+    "mean spectral kurtosis": _moments + ["spectral kurtosis"],
+    "mean spectral flatness": ["spectral flatness"],
+    "mean spectral slope": ["spectral slope"],
+    "mean pitch": [("cepstrum for pitch", 500, 6000)],
+    "mean pitch goodness": [("cepstrum for pitch", 500, 6000)],
+    "mean delta spectral centroid": _moments[:2],
+    "mean delta spectral spread": _moments + ["spectral spread"],
+    "mean delta spectral skewness": _moments + ["spectral skewness"],
+    "mean delta spectral kurtosis": _moments + ["spectral kurtosis"],
+    "mean delta spectral flatness": ["spectral flatness"],
+    "mean delta spectral slope": ["spectral slope"],
+    "mean delta pitch": [("cepstrum for pitch", 500, 6000)],
+    "mean delta pitch goodness": [("cepstrum for pitch", 500, 6000)],
+    "zero crossings": [],
+    "mean amplitude": ["amplitude"],
+    "mean delta amplitude": ["amplitude"],
+    "mean smoothed rectified amplitude": ["smoothed rectified amplitude"],
+    "mean RMS amplitude": ["smoothed rectified amplitude"],
+    "mean spectral entropy": ["psd", "spectral entropy"],
+    "mean hi lo ratio": ["psd", ("hi lo ratio", 5000)],
+    "delta smoothed rectified amplitude": ["smoothed rectified amplitude"],
+    "delta spectral entropy": ["psd", "spectral entropy"],
+    "delta hi lo ratio": ["psd", ("hi lo ratio", 5000)],
+}
+
 multiple_syl_features_switch_case_dict = {
     "duration group": knn.duration,
     "preceding syllable duration": knn.pre_duration,
@@ -47,3 +85,12 @@ multiple_syl_features_switch_case_dict = {
 neural_net_features_switch_case_dict = {
     "flatwindow": neuralnet.flatwindow,
 }
+
+# single-syllable features that return a vector with one element for every
+# frequency bin of the spectrogram except the first; all others return a scalar
+spectrum_width_features = {
+    "mean spectrum",
+    "mean delta spectrum",
+    "mean cepstrum",
+    "mean delta cepstrum",
+}
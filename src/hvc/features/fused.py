@@ -0,0 +1,201 @@
+"""
+Tachibana features computed for all syllables in a file at once.
+
+Most "mean X" and "mean delta X" features from Tachibana et al. 2014 are a
+statistic computed from each column of a syllable's spectrogram, then averaged
+across the columns of the syllable. When spectrograms of syllables are columns
+of a single spectrogram made from the whole file (i.e., FeatureExtractor with
+whole_file_spect=True), the per-column statistic can be computed for the entire
+file in one vectorized operation, and then averaged for each syllable with a
+segment reduction, np.add.reduceat, over the columns from onset to offset.
+
+Sums are accumulated in float64, so for float32 spectrograms results can differ
+from the per-syllable functions in tachibana by float32 rounding error.
+
+Pitch and pitch goodness are not included, because _cepstrum_for_pitch takes
+the FFT across time bins, so its value in one column depends on the others.
+"""
+import numpy as np
+
+from . import tachibana
+
+# features that are computed column-wise, and so can be computed by this module
+fused_features_list = [
+    "mean spectrum",
+    "mean delta spectrum",
+    "mean cepstrum",
+    "mean delta cepstrum",
+    "mean spectral centroid",
+    "mean spectral spread",
+    "mean spectral skewness",
+    "mean spectral kurtosis",
+    "mean spectral flatness",
+    "mean spectral slope",
+    "mean amplitude",
+    "mean delta spectral centroid",
+    "mean delta spectral spread",
+    "mean delta spectral skewness",
+    "mean delta spectral kurtosis",
+    "mean delta spectral flatness",
+    "mean delta spectral slope",
+    "mean delta amplitude",
+]
+
+
+def _segment_mean(x, starts, stops):
+    """mean of x across columns in each segment [starts[i], stops[i])
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        1-d vector or 2-d matrix where last axis is time
+    starts, stops : numpy.ndarray
+        of ints, first and one-past-last column of each segment
+
+    Returns
+    -------
+    means : numpy.ndarray
+        1-d vector with one mean per segment, if x is 1-d,
+        or 2-d matrix with one row per segment, if x is 2-d.
+        Segments with no columns have a mean of zero, following
+        _five_point_delta, which returns zeros when there are too few
+        columns to compute the delta.
+    """
+    x_2d = np.atleast_2d(x)
+    # pad with one column so that `stops` equal to number of columns are valid indices
+    padded = np.concatenate((x_2d, np.zeros((x_2d.shape[0], 1))), axis=1)
+    inds = np.clip(np.stack((starts, stops), axis=1).ravel(), 0, x_2d.shape[1])
+    # reduceat sums over [inds[i], inds[i + 1]), so every other sum is one segment
+    sums = np.add.reduceat(padded, inds, axis=1)[:, ::2]
+    counts = stops - starts
+    means = np.zeros(sums.shape)
+    has_cols = counts > 0
+    means[:, has_cols] = sums[:, has_cols] / counts[has_cols]
+    if x.ndim == 1:
+        return means[0]
+    else:
+        return means.T
+
+
+def _five_point_delta(x):
+    """five-point delta across all columns, as computed by
+    tachibana._five_point_delta for a single syllable"""
+    if x.ndim == 2:
+        return -2 * x[:, :-4] - 1 * x[:, 1:-3] + 1 * x[:, 3:-1] + 2 * x[:, 4:]
+    else:
+        return -2 * x[:-4] - 1 * x[1:-3] + 1 * x[3:-1] + 2 * x[4:]
+
+
+def _spectral_slope(spect, freq_bins):
+    """spectral slope for every column at once,
+    same linear regression as in tachibana.spectral_slope"""
+    amplitude_spectrum = np.abs(spect)
+    num_rows = amplitude_spectrum.shape[0]
+    mat2 = np.stack((freq_bins, np.ones((num_rows,))), axis=-1)
+    beta = np.linalg.solve(np.dot(mat2.T, mat2), np.dot(mat2.T, amplitude_spectrum))
+    return beta[0, :]
+
+
+def fused_features(feature_list, spect, freq_bins, nfft, starts, stops):
+    """compute Tachibana features for all syllables in a file at once
+
+    Parameters
+    ----------
+    feature_list : list
+        of str, names of features. Features not in fused_features_list are ignored.
+    spect : numpy.ndarray
+        2-d array, spectrogram of entire audio file
+    freq_bins : numpy.ndarray
+        1-d array, frequency bins of spect
+    nfft : int
+        number of samples used for each FFT
+    starts, stops : numpy.ndarray
+        first and one-past-last column of spect for each syllable,
+        as returned by hvc.audiofileIO.segment_spect_columns
+
+    Returns
+    -------
+    features : dict
+        where each key is a feature name and value is a 1-d array
+        with one value per syllable, or a 2-d array with one row per syllable
+    """
+    starts = np.asarray(starts)
+    stops = np.asarray(stops)
+    # only compute values for columns that belong to a syllable (not silent gaps),
+    # by gathering each syllable's columns so they are contiguous
+    lengths = stops - starts
+    cols = np.concatenate(
+        [np.arange(start, stop) for start, stop in zip(starts, stops)]
+        + [np.zeros((0,), dtype=int)]
+    )
+    spect = spect[:, cols]
+    stops = np.cumsum(lengths)
+    starts = stops - lengths
+    # five-point delta for a syllable uses columns [start, stop - 4)
+    delta_stops = stops - 4
+
+    # per-column values, computed only if a feature needs them
+    column_values = {}
+
+    def values(name):
+        if name in column_values:
+            return column_values[name]
+
+        if name == "spectrum":
+            val = tachibana._spectrum(spect)
+        elif name == "cepstrum":
+            val = tachibana._cepstrum_for_mean(spect, freq_bins.shape[0])
+        elif name == "probability":
+            val = tachibana._convert_spect_to_probability(spect, freq_bins)[:3]
+        elif name == "spectral centroid":
+            prob, freqs_mat = values("probability")[:2]
+            val = tachibana.spectral_centroid(prob, freqs_mat)
+        elif name == "deviation":
+            # same as np.tile used by tachibana._variance, but broadcast
+            # instead of making a copy of spectral centroid for every row
+            freqs_mat = values("probability")[1]
+            val = freqs_mat - values("spectral centroid")[np.newaxis, :]
+        elif name == "spectral variance":
+            prob = values("probability")[0]
+            val = np.sum(np.power(values("deviation"), 2) * prob, 0)
+        elif name == "spectral spread":
+            val = np.power(values("spectral variance"), 1 / 2)
+        elif name == "spectral skewness":
+            prob = values("probability")[0]
+            skewness = np.sum(np.power(values("deviation"), 3) * prob, 0)
+            val = skewness / np.power(values("spectral variance"), 3 / 2)
+        elif name == "spectral kurtosis":
+            prob = values("probability")[0]
+            kurtosis = np.sum(np.power(values("deviation"), 4) * prob, 0)
+            val = kurtosis / np.power(values("spectral variance"), 2)
+        elif name == "spectral flatness":
+            val = tachibana.spectral_flatness(spect)
+        elif name == "spectral slope":
+            val = _spectral_slope(spect, freq_bins)
+        elif name == "amplitude":
+            val = 20 * np.log10(np.sum(np.abs(spect), 0) / nfft)
+
+        column_values[name] = val
+        return val
+
+    features = {}
+    for feature in feature_list:
+        if feature not in fused_features_list:
+            continue
+
+        if feature in ("mean spectrum", "mean cepstrum"):
+            name = feature.replace("mean ", "")
+            features[feature] = _segment_mean(values(name), starts, stops)
+        elif feature in ("mean delta spectrum", "mean delta cepstrum"):
+            name = feature.replace("mean delta ", "")
+            abs_delta = np.abs(_five_point_delta(values(name)))
+            features[feature] = _segment_mean(abs_delta, starts, delta_stops)
+        elif feature.startswith("mean delta "):
+            name = feature.replace("mean delta ", "")
+            delta = _five_point_delta(values(name))
+            features[feature] = _segment_mean(delta, starts, delta_stops)
+        else:
+            name = feature.replace("mean ", "")
+            features[feature] = _segment_mean(values(name), starts, stops)
+
+    return features
@@ -136,8 +136,12 @@ def _smooth_rect_amp(syllable):
         after bandpass filtering, squaring, and
         and smoothing with evfuncs.smooth_data
     """
-    return evfuncs.smooth_data(
-        syllable.sylAudio, syllable.sampFreq, syllable.freqCutoffs
+    return syllable.intermediate(
+        "smoothed rectified amplitude",
+        evfuncs.smooth_data,
+        syllable.sylAudio,
+        syllable.sampFreq,
+        syllable.freqCutoffs,
     )
 
 
@@ -173,6 +177,14 @@ def mn_amp_rms(syllable):
     return np.sqrt(mn_amp_smooth_rect(syllable))
 
 
+def _psd(syllable):
+    """helper function that returns power spectral density of syllable
+    spectrogram, cached so it is computed only once per syllable"""
+    return syllable.intermediate(
+        "psd", lambda spect: np.power(np.abs(spect), 2), syllable.spect
+    )
+
+
 def _spect_entropy(syllable):
     """helper function that calculates spectral entropy for syllable spectrogram
 
@@ -186,7 +198,7 @@ def _spect_entropy(syllable):
         spectral entropy for each time bin in syllable spectrogram
         array will have length = number of columns in syllable.spect
     """
-    psd = np.power(np.abs(syllable.spect), 2)
+    psd = _psd(syllable)
     psd_pdf = psd / np.sum(psd, axis=0)
     return -np.sum(psd_pdf * np.log(psd_pdf), axis=0)
 
@@ -203,7 +215,7 @@ def mean_spect_entropy(syllable):
     mean(_spect_entropy(syllable))
     """
 
-    return np.mean(_spect_entropy(syllable))
+    return np.mean(syllable.intermediate("spectral entropy", _spect_entropy, syllable))
 
 
 def _hi_lo_ratio(syllable, middle=5000):
@@ -226,7 +238,7 @@ def _hi_lo_ratio(syllable, middle=5000):
         array will have length = number of columns in syllable.spect
     """
 
-    psd = np.power(np.abs(syllable.spect), 2)
+    psd = _psd(syllable)
     hi_ids = syllable.freqBins > middle
     lo_ids = syllable.freqBins < middle
     return np.log10(np.sum(psd[hi_ids, :], axis=0) / np.sum(psd[lo_ids, :], axis=0))
@@ -243,7 +255,9 @@ def mean_hi_lo_ratio(syllable):
     -------
     np.mean(_hi_lo_ratio(syllable))
     """
-    return np.mean(_hi_lo_ratio(syllable))
+    return np.mean(
+        syllable.intermediate(("hi lo ratio", 5000), _hi_lo_ratio, syllable, 5000)
+    )
 
 
 def _delta_inds(syllable, delta_times):
@@ -314,7 +328,7 @@ def delta_entropy(syllable, delta_times=[0.2, 0.8]):
     """
 
     inds = _delta_inds(syllable, delta_times)
-    entropy = _spect_entropy(syllable)
+    entropy = syllable.intermediate("spectral entropy", _spect_entropy, syllable)
     return _delta(entropy, inds)
 
 
@@ -334,5 +348,5 @@ def delta_hi_lo_ratio(syllable, delta_times=[0.2, 0.8]):
         _delta(_hi_lo_ratio(syllable))
     """
     inds = _delta_inds(syllable, delta_times)
-    hi_lo = _hi_lo_ratio(syllable)
+    hi_lo = syllable.intermediate(("hi lo ratio", 5000), _hi_lo_ratio, syllable, 5000)
     return _delta(hi_lo, inds)
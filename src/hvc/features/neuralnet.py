@@ -13,6 +13,7 @@ def flatwindow(
     onsets_Hz,
     offsets_Hz,
     spect_width=0.3,
+    whole_file_spect=False,
 ):
     """returns input for flatwindow neuralnet model.
     input is stack of spectrograms, all of the same width and height
@@ -29,6 +30,9 @@ def flatwindow(
     spect_width : float
         width of spectrogram in ms
         default is 0.3, i.e. 300 ms
+    whole_file_spect : bool
+        if True, compute one spectrogram from the whole file and take
+        windows from it. Default is False.
 
     Returns
     -------
@@ -45,4 +49,5 @@ def flatwindow(
         offsets_Hz,
         syl_spect_width=spect_width,
         return_as_stack=True,
+        whole_file_spect=whole_file_spect,
     )
@@ -68,7 +68,7 @@ def mean_spectrum(syllable):
         mean of power spectrum across time
     """
 
-    spect = _spectrum(syllable.spect)
+    spect = syllable.intermediate("spectrum", _spectrum, syllable.spect)
     return np.mean(spect, axis=1)
 
 
@@ -96,6 +96,16 @@ def _cepstrum_for_mean(spect, freq_bin_ID):
     return real_cepstrum[1:freq_bin_ID, :]
 
 
+def _syl_cepstrum_for_mean(syllable):
+    """cepstrum of syllable, cached so it is computed only once"""
+    return syllable.intermediate(
+        "cepstrum for mean",
+        _cepstrum_for_mean,
+        syllable.spect,
+        syllable.freqBins.shape[0],
+    )
+
+
 def mean_cepstrum(syllable):
     """
     mean cepstrum, as calculated in [1]_
@@ -111,7 +121,7 @@ def mean_cepstrum(syllable):
         1-dimensional, mean of cepstrum (i.e. take mean across columns of spectrogram)
     """
 
-    cepst = _cepstrum_for_mean(syllable.spect, syllable.freqBins.shape[0])
+    cepst = _syl_cepstrum_for_mean(syllable)
     return np.mean(cepst, axis=1)
 
 
@@ -176,7 +186,7 @@ def mean_delta_spectrum(syllable):
         # of FFT.
         return np.zeros((syllable.spect.shape[0] - 1,))
     else:
-        spect = _spectrum(syllable.spect)
+        spect = syllable.intermediate("spectrum", _spectrum, syllable.spect)
         delta_spectrum = _five_point_delta(spect)
         return np.mean(np.abs(delta_spectrum), axis=1)
 
@@ -203,7 +213,7 @@ def mean_delta_cepstrum(syllable):
         # of FFT.
         return np.zeros((syllable.spect.shape[0] - 1,))
     else:
-        cepst = _cepstrum_for_mean(syllable.spect, syllable.freqBins.shape[0])
+        cepst = _syl_cepstrum_for_mean(syllable)
         delta_cepstrum = _five_point_delta(cepst)
         return np.mean(np.abs(delta_cepstrum), axis=1)
 
@@ -287,6 +297,39 @@ def _variance(freqs_mat, spect_centroid, num_rows, prob):
     )
 
 
+def _syl_spect_probability(syllable):
+    """spectrogram of syllable converted to probability, cached so it is
+    computed only once. Returns same tuple as _convert_spect_to_probability"""
+    return syllable.intermediate(
+        "spect probability",
+        _convert_spect_to_probability,
+        syllable.spect,
+        syllable.freqBins,
+    )
+
+
+def _syl_spectral_centroid(syllable):
+    """spectral centroid of syllable, cached so it is computed only once"""
+    prob, freqs_mat = _syl_spect_probability(syllable)[:2]
+    return syllable.intermediate(
+        "spectral centroid", spectral_centroid, prob, freqs_mat
+    )
+
+
+def _syl_spectral_variance(syllable):
+    """variance of normalized amplitude spectrum of syllable,
+    cached so it is computed only once"""
+    prob, freqs_mat, num_rows = _syl_spect_probability(syllable)[:3]
+    return syllable.intermediate(
+        "spectral variance",
+        _variance,
+        freqs_mat,
+        _syl_spectral_centroid(syllable),
+        num_rows,
+        prob,
+    )
+
+
 def mean_spectral_centroid(syllable):
     """
     Mean of spectral centroid across syllable,
@@ -302,10 +345,7 @@ def mean_spectral_centroid(syllable):
     mean_spectral_centroid : float
         scalar, mean of spectral centroid across syllable
     """
-    prob, freqs_mat = _convert_spect_to_probability(syllable.spect, syllable.freqBins)[
-        :2
-    ]
-    spect_centroid = spectral_centroid(prob, freqs_mat)
+    spect_centroid = _syl_spectral_centroid(syllable)
     return np.mean(spect_centroid)
 
 
@@ -323,10 +363,7 @@ def mean_delta_spectral_centroid(syllable):
     mean_delta_spectral_centroid : scalar
     """
 
-    prob, freqs_mat = _convert_spect_to_probability(syllable.spect, syllable.freqBins)[
-        :2
-    ]
-    spect_centroid = spectral_centroid(prob, freqs_mat)
+    spect_centroid = _syl_spectral_centroid(syllable)
     delta_spect_centroid = _five_point_delta(spect_centroid)
     return np.mean(delta_spect_centroid)
 
@@ -350,6 +387,13 @@ def spectral_spread(spect, freqBins):
     return np.power(variance, 1 / 2)
 
 
+def _syl_spectral_spread(syllable):
+    """spectral spread of syllable, cached so it is computed only once"""
+    return syllable.intermediate(
+        "spectral spread", np.power, _syl_spectral_variance(syllable), 1 / 2
+    )
+
+
 def mean_spectral_spread(syllable):
     """
     mean of spectral spread across syllable,
@@ -365,7 +409,7 @@ def mean_spectral_spread(syllable):
     mean_spectral_spread : float
         scalar, mean of spectral spread across syllable
     """
-    return np.mean(spectral_spread(syllable.spect, syllable.freqBins))
+    return np.mean(_syl_spectral_spread(syllable))
 
 
 def mean_delta_spectral_spread(syllable):
@@ -382,9 +426,7 @@ def mean_delta_spectral_spread(syllable):
     mean_delta_spectral_spread : scalar
     """
 
-    return np.mean(
-        _five_point_delta(spectral_spread(syllable.spect, syllable.freqBins))
-    )
+    return np.mean(_five_point_delta(_syl_spectral_spread(syllable)))
 
 
 def spectral_skewness(spect, freqBins):
@@ -404,6 +446,11 @@ def spectral_skewness(spect, freqBins):
     prob, freqs_mat, num_rows = _convert_spect_to_probability(spect, freqBins)[:3]
     spect_centroid = spectral_centroid(prob, freqs_mat)
     variance = _variance(freqs_mat, spect_centroid, num_rows, prob)
+    return _skewness(freqs_mat, spect_centroid, variance, num_rows, prob)
+
+
+def _skewness(freqs_mat, spect_centroid, variance, num_rows, prob):
+    """helper function to compute skewness, given spectral centroid and variance"""
     skewness = np.sum(
         (np.power(freqs_mat - np.tile(spect_centroid, (num_rows, 1)), 3)) * prob,
         0,
@@ -411,6 +458,20 @@ def spectral_skewness(spect, freqBins):
     return skewness / np.power(variance, 3 / 2)
 
 
+def _syl_spectral_skewness(syllable):
+    """spectral skewness of syllable, cached so it is computed only once"""
+    prob, freqs_mat, num_rows = _syl_spect_probability(syllable)[:3]
+    return syllable.intermediate(
+        "spectral skewness",
+        _skewness,
+        freqs_mat,
+        _syl_spectral_centroid(syllable),
+        _syl_spectral_variance(syllable),
+        num_rows,
+        prob,
+    )
+
+
 def mean_spectral_skewness(syllable):
     """
     mean of spectral skewness across syllable,
@@ -427,7 +488,7 @@ def mean_spectral_skewness(syllable):
         scalar, mean of spectral skewness across syllable
     """
 
-    return np.mean(spectral_skewness(syllable.spect, syllable.freqBins))
+    return np.mean(_syl_spectral_skewness(syllable))
 
 
 def mean_delta_spectral_skewness(syllable):
@@ -445,9 +506,7 @@ def mean_delta_spectral_skewness(syllable):
         scalar value
     """
 
-    return np.mean(
-        _five_point_delta(spectral_skewness(syllable.spect, syllable.freqBins))
-    )
+    return np.mean(_five_point_delta(_syl_spectral_skewness(syllable)))
 
 
 def spectral_kurtosis(spect, freqBins):
@@ -466,6 +525,11 @@ def spectral_kurtosis(spect, freqBins):
     prob, freqs_mat, num_rows = _convert_spect_to_probability(spect, freqBins)[:3]
     spect_centroid = spectral_centroid(prob, freqs_mat)
     variance = _variance(freqs_mat, spect_centroid, num_rows, prob)
+    return _kurtosis(freqs_mat, spect_centroid, variance, num_rows, prob)
+
+
+def _kurtosis(freqs_mat, spect_centroid, variance, num_rows, prob):
+    """helper function to compute kurtosis, given spectral centroid and variance"""
     kurtosis = np.sum(
         (np.power(freqs_mat - np.tile(spect_centroid, (num_rows, 1)), 4)) * prob,
         0,
@@ -473,6 +537,20 @@ def spectral_kurtosis(spect, freqBins):
     return kurtosis / np.power(variance, 2)
 
 
+def _syl_spectral_kurtosis(syllable):
+    """spectral kurtosis of syllable, cached so it is computed only once"""
+    prob, freqs_mat, num_rows = _syl_spect_probability(syllable)[:3]
+    return syllable.intermediate(
+        "spectral kurtosis",
+        _kurtosis,
+        freqs_mat,
+        _syl_spectral_centroid(syllable),
+        _syl_spectral_variance(syllable),
+        num_rows,
+        prob,
+    )
+
+
 def mean_spectral_kurtosis(syllable):
     """
     mean of spectral kurtosis across syllable,
@@ -488,7 +566,7 @@ def mean_spectral_kurtosis(syllable):
     mean_spectral_kurtosis
     """
 
-    return np.mean(spectral_kurtosis(syllable.spect, syllable.freqBins))
+    return np.mean(_syl_spectral_kurtosis(syllable))
 
 
 def mean_delta_spectral_kurtosis(syllable):
@@ -505,9 +583,7 @@ def mean_delta_spectral_kurtosis(syllable):
     mean_delta_spectral_kurtosis
     """
 
-    return np.mean(
-        _five_point_delta(spectral_kurtosis(syllable.spect, syllable.freqBins))
-    )
+    return np.mean(_five_point_delta(_syl_spectral_kurtosis(syllable)))
 
 
 def spectral_flatness(spect):
@@ -543,7 +619,9 @@ def mean_spectral_flatness(syllable):
     mean_spectral_skewness : float
         mean of spectral_flatness across spect
     """
-    return np.mean(spectral_flatness(syllable.spect))
+    return np.mean(
+        syllable.intermediate("spectral flatness", spectral_flatness, syllable.spect)
+    )
 
 
 def mean_delta_spectral_flatness(syllable):
@@ -559,7 +637,13 @@ def mean_delta_spectral_flatness(syllable):
     -------
     mean delta spectral flatness : float
     """
-    return np.mean(_five_point_delta(spectral_flatness(syllable.spect)))
+    return np.mean(
+        _five_point_delta(
+            syllable.intermediate(
+                "spectral flatness", spectral_flatness, syllable.spect
+            )
+        )
+    )
 
 
 def spectral_slope(spect, freq_bins):
@@ -604,7 +688,11 @@ def mean_spectral_slope(syllable):
     mean_spectral_slope : scalar
     """
 
-    return np.mean(spectral_slope(syllable.spect, syllable.freqBins))
+    return np.mean(
+        syllable.intermediate(
+            "spectral slope", spectral_slope, syllable.spect, syllable.freqBins
+        )
+    )
 
 
 def mean_delta_spectral_slope(syllable):
@@ -621,7 +709,13 @@ def mean_delta_spectral_slope(syllable):
     mean_delta_spectral_slope : scalar
     """
 
-    return np.mean(_five_point_delta(spectral_slope(syllable.spect, syllable.freqBins)))
+    return np.mean(
+        _five_point_delta(
+            syllable.intermediate(
+                "spectral slope", spectral_slope, syllable.spect, syllable.freqBins
+            )
+        )
+    )
 
 
 def _cepstrum_for_pitch(spect, nfft, samp_freq, min_freq, max_freq):
@@ -662,6 +756,20 @@ def _cepstrum_for_pitch(spect, nfft, samp_freq, min_freq, max_freq):
     return max_val, max_id, min_quef
 
 
+def _syl_cepstrum_for_pitch(syllable, min_freq, max_freq):
+    """cepstrum for pitch of syllable, cached so it is computed only once
+    for pitch and pitch goodness"""
+    return syllable.intermediate(
+        ("cepstrum for pitch", min_freq, max_freq),
+        _cepstrum_for_pitch,
+        syllable.spect,
+        syllable.nfft,
+        syllable.sampFreq,
+        min_freq,
+        max_freq,
+    )
+
+
 def pitch(syllable, min_freq=500, max_freq=6000):
     """
     pitch, as calculated in Tachibana et al. 2014.
@@ -679,9 +787,7 @@ def pitch(syllable, min_freq=500, max_freq=6000):
     pitch : scalar
     """
 
-    max_val, max_id, min_quef = _cepstrum_for_pitch(
-        syllable.spect, syllable.nfft, syllable.sampFreq, min_freq, max_freq
-    )
+    max_val, max_id, min_quef = _syl_cepstrum_for_pitch(syllable, min_freq, max_freq)
     return syllable.sampFreq / (max_id + min_quef - 1)
 
 
@@ -739,9 +845,7 @@ def pitch_goodness(syllable, min_freq=500, max_freq=6000):
     affect results.
     """
 
-    return _cepstrum_for_pitch(
-        syllable.spect, syllable.nfft, syllable.sampFreq, min_freq, max_freq
-    )[0]
+    return _syl_cepstrum_for_pitch(syllable, min_freq, max_freq)[0]
 
 
 def mean_pitch_goodness(syllable):
@@ -808,7 +912,7 @@ def mean_amplitude(syllable):
     mean_amplitude : scalar
     """
 
-    return np.mean(amplitude(syllable))
+    return np.mean(syllable.intermediate("amplitude", amplitude, syllable))
 
 
 def mean_delta_amplitude(syllable):
@@ -825,7 +929,9 @@ def mean_delta_amplitude(syllable):
     mean_delta_amplitude
     """
 
-    return np.mean(_five_point_delta(amplitude(syllable)))
+    return np.mean(
+        _five_point_delta(syllable.intermediate("amplitude", amplitude, syllable))
+    )
 
 
 def zero_crossings(syllable):
@@ -468,6 +468,13 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
                     ord(label) for label in list(val)
                 ]
 
+        elif key == "n_jobs":
+            if type(val) != int:
+                raise ValueError(
+                    "Value {} for key 'n_jobs' is type {} but it"
+                    " should be an int".format(val, type(val))
+                )
+
         elif key == "output_dir":
             if type(val) != str:
                 raise ValueError(
@@ -480,6 +487,13 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
             if "save_features" not in todo_list_dict:
                 validated_todo_list_dict["save_features"] = True
 
+        elif key == "prefetch_depth":
+            if type(val) != int or val < 0:
+                raise ValueError(
+                    "Value {} for key 'prefetch_depth' is type {} but it"
+                    " should be a non-negative int".format(val, type(val))
+                )
+
         elif key == "save_features":
             if (
                 "output_dir" in todo_list_dict
@@ -492,9 +506,44 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
         elif key == "segment_params":
             validate_segment_params(val)
 
+        elif key == "shard_dir":
+            if type(val) != str:
+                raise ValueError(
+                    "Value {} for key 'shard_dir' is type {} but it"
+                    " should be a str".format(val, type(val))
+                )
+
+        elif key == "shard_size":
+            if type(val) != int or val < 1:
+                raise ValueError(
+                    "Value {} for key 'shard_size' is type {} but it"
+                    " should be a positive int".format(val, type(val))
+                )
+
+        elif key == "spect_cache_dir":
+            if type(val) != str:
+                raise ValueError(
+                    "Value {} for key 'spect_cache_dir' is type {} but it"
+                    " should be a string".format(val, type(val))
+                )
+
+        elif key == "spect_cache_max_size":
+            if type(val) != int:
+                raise ValueError(
+                    "Value {} for key 'spect_cache_max_size' is type {} but it"
+                    " should be an int".format(val, type(val))
+                )
+
         elif key == "spect_params":
             validate_spect_params(val)
 
+        elif key == "whole_file_spect":
+            if type(val) != bool:
+                raise ValueError(
+                    "Value {} for key 'whole_file_spect' is type {} but it"
+                    " should be a bool".format(val, type(val))
+                )
+
     return validated_todo_list_dict
 
 
@@ -177,6 +177,12 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
                     )
                 )
 
+        elif key == "stream":
+            if type(val) != bool:
+                raise ValueError(
+                    "stream should be a Boolean but it parsed as {}".format(type(val))
+                )
+
         else:  # if key is not found in list
             raise KeyError(
                 "key {} found in todo_list_dict but not validated".format(key)
@@ -6,9 +6,9 @@ import copy
 
 import yaml
 import numpy as np
-import joblib
 
 from ..features.extract import neural_net_features_switch_case_dict
+from ..utils.features import load_feature_file
 
 path = os.path.abspath(__file__)  # get the path of this file
 dir_path = os.path.dirname(path)  # but then just take the dir
@@ -332,6 +332,158 @@ def _validate_models(models, ftr_grp_ID_dict=None, ftr_list_group_ID=None):
     return validated_models
 
 
+VALID_SEARCH_KEYS = {
+    "model_name",
+    "feature_group",
+    "feature_list_indices",
+    "C_range",
+    "gamma_range",
+    "factor",
+    "min_samples",
+    "n_splits",
+    "predict_proba",
+}
+
+
+def _validate_search(search):
+    """
+    validates 'search' dictionary that can appear in 'todo_list',
+    that specifies a hyperparameter search for a model
+
+    Parameters
+    ----------
+    search : dict
+        with keys:
+            'model_name' : str
+                model for which to search for hyperparameters. Currently only 'svm'.
+            'feature_group' or 'feature_list_indices'
+                features to use, as for a dict in 'models'
+            'C_range', 'gamma_range' : list
+                optional, values over which to search
+            'factor', 'min_samples', 'n_splits' : int
+                optional, passed to hvc.utils.successive_halving_svm_rbf
+            'predict_proba' : bool
+                optional, as for a dict in 'models'
+
+    Returns
+    -------
+    validated_search : dict
+        after validation
+    """
+    if type(search) != dict:
+        raise TypeError("'search' should be a dict not a {}".format(type(search)))
+
+    search_keys = set(search.keys())
+    if not search_keys <= VALID_SEARCH_KEYS:
+        raise KeyError(
+            "invalid keys in 'search': {}".format(search_keys - VALID_SEARCH_KEYS)
+        )
+
+    if "model_name" not in search:
+        raise KeyError("no model_name declared in 'search'")
+    if search["model_name"] != "svm":
+        raise ValueError(
+            "can only search for hyperparameters of 'svm' model, not {}".format(
+                search["model_name"]
+            )
+        )
+
+    if ("feature_group" in search) == ("feature_list_indices" in search):
+        raise KeyError(
+            "'search' must specify one of 'feature_group' or 'feature_list_indices'"
+        )
+
+    validated_search = copy.deepcopy(search)
+    for key in ("C_range", "gamma_range"):
+        if key in search:
+            if type(search[key]) != list or not all(
+                [type(val) in (int, float) for val in search[key]]
+            ):
+                raise ValueError(
+                    "{} in 'search' should be a list of numbers".format(key)
+                )
+
+    for key in ("factor", "min_samples", "n_splits"):
+        if key in search:
+            if type(search[key]) != int:
+                raise ValueError("{} in 'search' should be an int".format(key))
+
+    if "predict_proba" in search:
+        if type(search["predict_proba"]) is not bool:
+            raise TypeError("predict_proba in 'search' must be either True or False")
+    else:
+        validated_search["predict_proba"] = False
+
+    return validated_search
+
+
+DEFAULT_EARLY_STOPPING = {
+    "tol": 0.005,
+    "patience": 1,
+    "max_std": 0.02,
+    "max_replicates": None,
+}
+
+
+def _validate_early_stopping(early_stopping):
+    """
+    validates 'early_stopping' dictionary that can appear in 'todo_list',
+    that specifies when to stop fitting models with more training samples
+
+    Parameters
+    ----------
+    early_stopping : dict
+        with optional keys:
+            'tol' : float
+                stop when mean accuracy across replicates increases by less than
+                tol from one number of training samples to the next. Default is 0.005.
+            'patience' : int
+                number of times in a row accuracy must increase by less than tol
+                before stopping. Default is 1.
+            'max_std' : float
+                add replicates when standard deviation of accuracy across
+                replicates is more than max_std. Default is 0.02.
+            'max_replicates' : int
+                max. number of replicates, including added ones. Default is None,
+                in which case it is twice num_replicates.
+
+    Returns
+    -------
+    validated_early_stopping : dict
+        after validation, with default values for keys that were not specified
+    """
+    if type(early_stopping) != dict:
+        raise TypeError(
+            "'early_stopping' should be a dict not a {}".format(type(early_stopping))
+        )
+
+    early_stopping_keys = set(early_stopping.keys())
+    if not early_stopping_keys <= set(DEFAULT_EARLY_STOPPING.keys()):
+        raise KeyError(
+            "invalid keys in 'early_stopping': {}".format(
+                early_stopping_keys - set(DEFAULT_EARLY_STOPPING.keys())
+            )
+        )
+
+    for key in ("tol", "max_std"):
+        if key in early_stopping:
+            if type(early_stopping[key]) not in (int, float) or early_stopping[key] < 0:
+                raise ValueError(
+                    "{} in 'early_stopping' should be a non-negative number".format(key)
+                )
+
+    for key in ("patience", "max_replicates"):
+        if key in early_stopping and early_stopping[key] is not None:
+            if type(early_stopping[key]) != int or early_stopping[key] < 1:
+                raise ValueError(
+                    "{} in 'early_stopping' should be a positive int".format(key)
+                )
+
+    validated_early_stopping = copy.deepcopy(DEFAULT_EARLY_STOPPING)
+    validated_early_stopping.update(early_stopping)
+    return validated_early_stopping
+
+
 VALID_NUM_SAMPLES_KEYS = {"start", "stop", "step"}
 REQUIRED_TODO_KEYS = {"feature_file", "output_dir"}
 OPTIONAL_TODO_KEYS = {
@@ -339,6 +491,12 @@ OPTIONAL_TODO_KEYS = {
     "num_train_samples",
     "num_replicates",
     "models",
+    "n_jobs",
+    "seed",
+    "kernel_cache_size",
+    "search",
+    "early_stopping",
+    "resume_dir",
 }
 
 
@@ -381,15 +539,15 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
             " should be a string".format(feature_file, type(feature_file))
         )
     feature_file = os.path.normpath(feature_file)
-    if not os.path.isfile(feature_file):
+    if not os.path.exists(feature_file):
         # if val is not absolute path to meta_file
         # try adding item to absolute path to config_file
         # i.e. assume path to file is written relative to config file
         feature_file = os.path.join(os.path.dirname(config_path), feature_file)
-        if not os.path.isfile(feature_file):
+        if not os.path.exists(feature_file):
             raise FileNotFoundError("{} is not found as a file".format(feature_file))
     try:
-        ftr_file = joblib.load(feature_file)
+        ftr_file = load_feature_file(feature_file)
         feature_file_keys = ftr_file.keys()
         if "feature_group_ID_dict" in feature_file_keys:
             ftr_list_group_ID = ftr_file["feature_list_group_ID"]
@@ -413,7 +571,17 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
     for key, val in todo_list_dict.items():
         # valid todo_list_dict keys in alphabetical order
 
-        if key == "models":
+        if key == "early_stopping":
+            validated_todo_list_dict["early_stopping"] = _validate_early_stopping(val)
+
+        elif key == "kernel_cache_size":
+            if type(val) not in (int, float):
+                raise ValueError(
+                    "Value {} for key 'kernel_cache_size' is type {} but it"
+                    " should be an int or float".format(val, type(val))
+                )
+
+        elif key == "models":
             if "ftr_list_group_ID" in locals() and "ftr_grp_ID_dict" in locals():
                 validated_todo_list_dict["models"] = _validate_models(
                     val, ftr_grp_ID_dict, ftr_list_group_ID
@@ -421,6 +589,13 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
             else:
                 validated_todo_list_dict["models"] = _validate_models(val)
 
+        elif key == "n_jobs":
+            if type(val) != int:
+                raise ValueError(
+                    "Value {} for key 'n_jobs' is type {} but it"
+                    " should be an int".format(val, type(val))
+                )
+
         elif key == "num_replicates":
             if type(val) != int:
                 raise ValueError(
@@ -468,6 +643,23 @@ def _validate_todo_list_dict(todo_list_dict, index, config_path):
                     )
                 )
 
+        elif key == "resume_dir":
+            if type(val) != str:
+                raise ValueError(
+                    "Value {} for key 'resume_dir' is type {} but it"
+                    " should be a string".format(val, type(val))
+                )
+
+        elif key == "search":
+            validated_todo_list_dict["search"] = _validate_search(val)
+
+        elif key == "seed":
+            if type(val) != int:
+                raise ValueError(
+                    "Value {} for key 'seed' is type {} but it"
+                    " should be an int".format(val, type(val))
+                )
+
     del ftr_file
     return validated_todo_list_dict
 
@@ -520,7 +712,14 @@ def validate_yaml(config_path, select_config_yaml):
         )
 
     for select_key in VALID_SELECT_KEYS:
-        if not all([select_key in todo for todo in select_config_yaml["todo_list"]]):
+        if not all(
+            [
+                select_key in todo
+                # models are optional if todo searches for a model
+                or (select_key == "models" and "search" in todo)
+                for todo in select_config_yaml["todo_list"]
+            ]
+        ):
             if select_key not in select_config_yaml:
                 raise KeyError(
                     "'{0}' not defined for every item in todo_list, "
@@ -618,7 +817,7 @@ def validate_yaml(config_path, select_config_yaml):
 
         for todo_list_dict in validated_select_config["todo_list"]:
             if "num_train_samples" not in todo_list_dict:
-                ftr_file = joblib.load(todo_list_dict["feature_file"])
+                ftr_file = load_feature_file(todo_list_dict["feature_file"])
                 samples_in_ftr_file = ftr_file["num_samples"]
                 if samples_in_ftr_file < total_samples:
                     raise ValueError(
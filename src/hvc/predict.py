@@ -10,6 +10,8 @@ import yaml
 import numpy as np
 import joblib
 
+import hvc.audiofileIO
+import hvc.features
 import hvc.utils
 import hvc.utils.annotation as annotation
 import hvc.parseconfig
@@ -23,6 +25,376 @@ valid_models = validate_dict["valid_models"]
 valid_convert_types = validate_dict["valid_convert_types"]
 
 
+def _feature_extractor_for_model(model_meta_file):
+    """helper function that returns FeatureExtractor used to extract
+    features for a model.
+
+    Makes the FeatureExtractor from the extractor manifest saved by hvc.select.
+    For .meta files made by earlier versions of hvc that do not have a manifest,
+    loads the FeatureExtractor from the feature file used to train the model.
+    Then reduces the FeatureExtractor so that it only extracts the features
+    used by the model, e.g. one feature group out of several in the feature file.
+
+    Parameters
+    ----------
+    model_meta_file : dict
+        loaded from .meta file
+
+    Returns
+    -------
+    feature_extractor : hvc.features.extract.FeatureExtractor
+    """
+    if "extractor_manifest" in model_meta_file and os.path.isfile(
+        model_meta_file["extractor_manifest"]
+    ):
+        feature_extractor = hvc.features.FeatureExtractor.from_manifest(
+            model_meta_file["extractor_manifest"]
+        )
+    else:
+        print("loading feature file")
+        feature_file = hvc.utils.load_feature_file(model_meta_file["feature_file"])
+        feature_extractor = feature_file["feature_extractor"]
+
+    training_feature_list = feature_extractor.feature_list
+    if "feature_list_indices" in model_meta_file:
+        model_feature_list = [
+            training_feature_list[ind]
+            for ind in model_meta_file["feature_list_indices"]
+        ]
+    elif "feature_list" in model_meta_file and len(set(training_feature_list)) == len(
+        training_feature_list
+    ):
+        # .meta files from earlier versions only have names of features;
+        # keep order of training feature list, which is order of columns
+        # used to train model
+        model_feature_list = [
+            feature
+            for feature in training_feature_list
+            if feature in model_meta_file["feature_list"]
+        ]
+    else:
+        # can't tell which features were used, extract all of them
+        return feature_extractor
+
+    if model_feature_list == training_feature_list:
+        return feature_extractor
+    return hvc.features.FeatureExtractor(
+        spect_params=feature_extractor.spect_params,
+        feature_list=model_feature_list,
+        segment_params=feature_extractor.segment_params,
+        whole_file_spect=feature_extractor.whole_file_spect,
+    )
+
+
+class Predictor:
+    """classifier loaded from a .meta file, along with the FeatureExtractor
+    and scaler used to train it, that predicts labels from features extracted
+    from one audio file at a time.
+
+    Used by hvc.predict with stream=True, so that features go straight from
+    the FeatureExtractor to the classifier, without saving feature files.
+
+    Attributes
+    ----------
+    model_meta_file : dict
+        loaded from .meta file
+    model_name : str
+        name of model, e.g. 'knn'
+    clf : classifier
+        scikit-learn or keras model
+    feature_extractor : hvc.features.extract.FeatureExtractor
+        that extracts the features used by the model
+    """
+
+    def __init__(self, model_meta_file):
+        """__init__ for Predictor
+
+        Parameters
+        ----------
+        model_meta_file : str
+            filename of .meta file for classifier to use
+        """
+        self.model_meta_file = joblib.load(model_meta_file)
+        self.model_filename = self.model_meta_file["model_filename"]
+        self.model_name = self.model_meta_file["model_name"]
+        if self.model_name in valid_models["sklearn"]:
+            self.clf = joblib.load(self.model_filename)
+            self.scaler = self.model_meta_file["scaler"]
+        elif self.model_name in valid_models["keras"]:
+            import keras.models
+
+            self.clf = keras.models.load_model(self.model_filename)
+            self.spect_scaler = self.model_meta_file["spect_scaler"]
+            self.label_binarizer = self.model_meta_file["label_binarizer"]
+        self.feature_extractor = _feature_extractor_for_model(self.model_meta_file)
+
+    def _check_predict_proba(self, predict_proba):
+        """raise an error if predict_proba is True but model is not a
+        scikit-learn model, since only those have a predict_proba method
+        and a classes_ attribute used to size the array of probabilities"""
+        if predict_proba and self.model_name not in valid_models["sklearn"]:
+            raise ValueError(
+                "predict_proba argument set to True, but model in {} is {}, "
+                "which is not a valid scikit-learn model and does not have "
+                "a predict probability function built in".format(
+                    self.model_filename, self.model_name
+                )
+            )
+
+    def predict(self, extract_dict, predict_proba=False):
+        """predict labels for segments in one audio file
+
+        Parameters
+        ----------
+        extract_dict : dict
+            as yielded by FeatureExtractor.iter_extract
+        predict_proba : bool
+            If True, also return probabilities of labels. Default is False.
+
+        Returns
+        -------
+        pred_labels : numpy.ndarray
+            labels predicted by classifier. Segments with nan values for any
+            feature have 'nan' as their prediction.
+        pred_probs : numpy.ndarray
+            probabilities of each label, with nan for segments with nan values
+            for any feature. None unless predict_proba is True.
+        """
+        self._check_predict_proba(predict_proba)
+        pred_probs = None
+        if self.model_name in valid_models["sklearn"]:
+            features = extract_dict["features_arr"]
+            # rows with nan values for any feature get 'nan' as their prediction
+            not_nan_rows = np.where(~np.isnan(features).any(axis=1))[0]
+            pred_labels = np.full((features.shape[0],), "nan").astype(object)
+            if predict_proba:
+                pred_probs = np.full(
+                    (features.shape[0], self.clf.classes_.shape[0]), np.nan
+                )
+            if not_nan_rows.shape[0] > 0:
+                features_scaled = self.scaler.transform(features[not_nan_rows, :])
+                pred_labels[not_nan_rows] = self.clf.predict(features_scaled)
+                if predict_proba:
+                    pred_probs[not_nan_rows, :] = self.clf.predict_proba(
+                        features_scaled
+                    )
+            pred_labels = pred_labels.astype(str)
+        elif self.model_name in valid_models["keras"]:
+            inputs_key = self.model_meta_file["feature_list"][0]
+            neuralnet_inputs = extract_dict["neuralnet_inputs_dict"][inputs_key]
+            neuralnet_inputs_scaled = self.spect_scaler.transform(neuralnet_inputs)
+            neuralnet_inputs_scaled = neuralnet_inputs_scaled[:, :, :, np.newaxis]
+            pred_labels = self.clf.predict(neuralnet_inputs_scaled)
+            pred_labels = self.label_binarizer.inverse_transform(pred_labels)
+        return pred_labels, pred_probs
+
+    def predict_audio(
+        self,
+        filename=None,
+        raw_audio=None,
+        samp_freq=None,
+        onsets_Hz=None,
+        offsets_Hz=None,
+        predict_proba=False,
+    ):
+        """predict labels for segments in audio, either from an audio file or
+        from an array of samples. If onsets and offsets of segments are not
+        given, the audio is segmented with the segment_params of the
+        FeatureExtractor.
+
+        Parameters
+        ----------
+        filename : str
+            path to audio file. Required if raw_audio is None.
+        raw_audio : numpy.ndarray
+            audio samples. Default is None, in which case audio is loaded from filename.
+        samp_freq : int
+            sampling frequency of raw_audio. Required if raw_audio is not None.
+        onsets_Hz, offsets_Hz : numpy.ndarray
+            onsets and offsets of segments in units of samples. Default is None.
+        predict_proba : bool
+            If True, also return probabilities of labels. Default is False.
+
+        Returns
+        -------
+        file_predictions : dict
+            with keys songfile, samp_freq, onsets_Hz, offsets_Hz,
+            pred_labels, and pred_probs if predict_proba is True
+        """
+        self._check_predict_proba(predict_proba)
+        if raw_audio is None:
+            if filename is None:
+                raise ValueError("must specify either filename or raw_audio")
+            raw_audio, samp_freq = hvc.audiofileIO.load_audio(filename)
+        elif samp_freq is None:
+            raise ValueError("must specify samp_freq when raw_audio is specified")
+
+        if onsets_Hz is None or offsets_Hz is None:
+            if not hasattr(self.feature_extractor, "segmenter"):
+                raise ValueError(
+                    "onsets and offsets were not specified, but FeatureExtractor "
+                    "for model does not have segmenting parameters set."
+                )
+            segment_dict = self.feature_extractor.segmenter.segment(
+                raw_audio, method="evsonganaly", samp_freq=samp_freq
+            )
+            onsets_Hz = segment_dict["onsets_Hz"]
+            offsets_Hz = segment_dict["offsets_Hz"]
+        onsets_Hz = np.asarray(onsets_Hz)
+        offsets_Hz = np.asarray(offsets_Hz)
+
+        file_predictions = {
+            "songfile": filename,
+            "samp_freq": samp_freq,
+            "onsets_Hz": onsets_Hz,
+            "offsets_Hz": offsets_Hz,
+            "pred_labels": np.asarray([], dtype=str),
+        }
+        if predict_proba:
+            file_predictions["pred_probs"] = np.zeros((0, self.clf.classes_.shape[0]))
+        if onsets_Hz.shape[0] == 0:
+            return file_predictions
+
+        extract_dict = self.feature_extractor._from_file(
+            filename,
+            np.full(onsets_Hz.shape, "-"),
+            onsets_Hz,
+            offsets_Hz,
+            labels_to_use="all",
+            raw_audio=raw_audio,
+            samp_freq=samp_freq,
+        )
+        pred_labels, pred_probs = self.predict(extract_dict, predict_proba)
+        file_predictions["pred_labels"] = pred_labels
+        if predict_proba:
+            file_predictions["pred_probs"] = pred_probs
+        return file_predictions
+
+    def stream(self, predict_proba=False, **iter_extract_params):
+        """generator that extracts features from one audio file at a time and
+        yields predictions for that file. Parameters other than predict_proba
+        are passed to FeatureExtractor.iter_extract.
+
+        Yields
+        ------
+        file_predictions : dict
+            with keys songfile, samp_freq, labels, onsets_Hz, offsets_Hz,
+            pred_labels, and pred_probs if predict_proba is True
+        """
+        self._check_predict_proba(predict_proba)
+        for annotation_dict, extract_dict in self.feature_extractor.iter_extract(
+            **iter_extract_params
+        ):
+            pred_labels, pred_probs = self.predict(extract_dict, predict_proba)
+            file_predictions = {
+                "songfile": annotation_dict["filename"],
+                "samp_freq": extract_dict["samp_freq"],
+                "labels": extract_dict["labels"],
+                "onsets_Hz": extract_dict["onsets_Hz"],
+                "offsets_Hz": extract_dict["offsets_Hz"],
+                "pred_labels": pred_labels,
+            }
+            if predict_proba:
+                file_predictions["pred_probs"] = pred_probs
+            yield file_predictions
+
+
+def _predict_stream(
+    model_meta_file,
+    extract_params,
+    output_dir,
+    predict_proba,
+    convert_to,
+    return_predictions,
+):
+    """helper function that predicts labels with a Predictor, one audio file at
+    a time, and saves only the predictions, instead of saving features in a
+    feature file and then loading them to predict labels.
+
+    Parameters
+    ----------
+    model_meta_file : str
+        filename of .meta file for classifier to use
+    extract_params : dict
+        parameters for FeatureExtractor.iter_extract
+    output_dir : str
+        directory where predictions file is saved
+    predict_proba : bool
+        If True, estimate probabilities that labels are correct.
+    convert_to : str
+        format to convert predictions to, e.g. 'notmat'. If None, don't convert.
+    return_predictions : bool
+        If True, return predictions.
+
+    Returns
+    -------
+    predict_dict : dict
+        with predictions for all audio files, saved in output_dir in a file whose
+        name starts with 'predictions_created_'.
+        Only returned if return_predictions is True.
+    """
+    predictor = Predictor(model_meta_file)
+    predictor._check_predict_proba(predict_proba)
+    segment_params = predictor.feature_extractor.segment_params
+    all_labels = []
+    all_pred_labels = []
+    all_pred_probs = []
+    all_onsets_Hz = []
+    all_offsets_Hz = []
+    all_sampfreqs = []
+    songfiles = []
+    songfile_IDs = []
+    print("extracting features and predicting labels")
+    for songfile_ID, file_predictions in enumerate(
+        predictor.stream(predict_proba=predict_proba, **extract_params)
+    ):
+        if convert_to == "notmat":
+            annotation.make_notmat(
+                filename=file_predictions["songfile"],
+                labels=file_predictions["pred_labels"],
+                onsets_Hz=file_predictions["onsets_Hz"],
+                offsets_Hz=file_predictions["offsets_Hz"],
+                samp_freq=file_predictions["samp_freq"],
+                threshold=segment_params["threshold"],
+                min_syl_dur=segment_params["min_syl_dur"],
+                min_silent_dur=segment_params["min_silent_dur"],
+                clf_file=predictor.model_filename,
+                alternate_path=output_dir,
+            )
+        all_labels.extend(file_predictions["labels"])
+        all_pred_labels.append(np.asarray(file_predictions["pred_labels"]))
+        if predict_proba:
+            all_pred_probs.append(file_predictions["pred_probs"])
+        all_onsets_Hz.append(file_predictions["onsets_Hz"])
+        all_offsets_Hz.append(file_predictions["offsets_Hz"])
+        all_sampfreqs.append(file_predictions["samp_freq"])
+        songfiles.append(file_predictions["songfile"])
+        songfile_IDs.extend([songfile_ID] * len(file_predictions["onsets_Hz"]))
+
+    if songfiles == []:
+        raise ValueError("no segments found to predict labels for")
+
+    predict_dict = {
+        "labels": all_labels,
+        "pred_labels": np.concatenate(all_pred_labels),
+        "songfile_IDs": songfile_IDs,
+        "onsets_Hz": np.concatenate(all_onsets_Hz),
+        "offsets_Hz": np.concatenate(all_offsets_Hz),
+        "songfiles": songfiles,
+        "all_sampfreqs": all_sampfreqs,
+        "feature_list": predictor.feature_extractor.feature_list,
+        "labels_to_use": extract_params["labels_to_use"],
+    }
+    if predict_proba:
+        predict_dict["pred_probs"] = np.concatenate(all_pred_probs)
+    hvc.utils.save_feature_file(
+        predict_dict,
+        os.path.join(output_dir, "predictions_created_" + hvc.utils.timestamp()),
+    )
+    if return_predictions:
+        return predict_dict
+
+
 def predict(
     config_file=None,
     data_dirs=None,
@@ -34,6 +406,7 @@ def predict(
     predict_proba=False,
     convert_to=None,
     return_predictions=True,
+    stream=False,
 ):
     """high-level function for prediction of syllable labels.
     Accepts either a config file or a set of parameters and
@@ -69,6 +442,11 @@ def predict(
         If True, convert predictions to annotation files. Default is False.
     return_predictions : bool
         If True, return feature file with predicted labels. Default is True.
+    stream : bool
+        If True, features are extracted from one audio file at a time and passed
+        directly to the classifier, without saving a feature file. Only the
+        predictions are saved, in a file whose name starts with 'predictions_created_',
+        and the returned dict does not contain features. Default is False.
 
     Returns
     -------
@@ -123,12 +501,24 @@ def predict(
                 "file_format": todo["file_format"],
             }
 
-            model_meta_file = joblib.load(todo["model_meta_file"])
-            feature_file_for_model = model_meta_file["feature_file"]
-            print("loading feature file")
-            feature_file = joblib.load(feature_file_for_model)
+            if todo.get("stream", False):
+                _predict_stream(
+                    todo["model_meta_file"],
+                    {
+                        "data_dirs": todo["data_dirs"],
+                        "labels_to_use": "all",
+                        "file_format": todo["file_format"],
+                        "segment": True,
+                    },
+                    output_dir,
+                    todo.get("predict_proba", False),
+                    todo.get("convert", None),
+                    return_predictions=False,
+                )
+                continue
 
-            feature_extractor = feature_file["feature_extractor"]
+            model_meta_file = joblib.load(todo["model_meta_file"])
+            feature_extractor = _feature_extractor_for_model(model_meta_file)
             print("extracting features")
             feature_extractor.extract(
                 **extract_params, segment=True, make_output_subdir=False
@@ -149,7 +539,7 @@ def predict(
 
             for ftr_file in ftr_files:
                 print("predicting labels for features in file: {}".format(ftr_file))
-                ftr_file_dict = joblib.load(ftr_file)
+                ftr_file_dict = hvc.utils.load_feature_file(ftr_file)
                 if model_name in valid_models["sklearn"]:
                     features = ftr_file_dict["features"]
                     if np.any(
@@ -195,7 +585,7 @@ def predict(
                     if todo["predict_proba"]:
                         pred_probs = clf.predict_proba(features_scaled)
                         ftr_file_dict["pred_probs"] = pred_probs
-                joblib.dump(ftr_file_dict, ftr_file)
+                hvc.utils.save_feature_file(ftr_file_dict, ftr_file)
 
                 if "convert" in todo:
                     songfiles = ftr_file_dict["songfiles"]
@@ -249,6 +639,7 @@ def predict(
             else:
                 segment = False
 
+        model_meta_filename = model_meta_file
         model_meta_file = joblib.load(model_meta_file)
         model_filename = model_meta_file["model_filename"]
         model_name = model_meta_file["model_name"]
@@ -258,7 +649,7 @@ def predict(
                     "predict_proba argument set to True, but model in {} is {}, "
                     "which is not a valid scikit-learn model and does not have "
                     "a predict probability function built in".format(
-                        model_filename, model
+                        model_filename, model_name
                     )
                 )
 
@@ -269,10 +660,6 @@ def predict(
         if not os.path.isdir(output_dir):
             os.mkdir(output_dir)
 
-        feature_file_for_model = model_meta_file["feature_file"]
-        print("loading feature file")
-        feature_file = joblib.load(feature_file_for_model)
-
         extract_params = {
             "output_dir": output_dir,
             "labels_to_use": "all",
@@ -285,7 +672,20 @@ def predict(
         elif data_dirs:
             extract_params["data_dirs"] = data_dirs
 
-        feature_extractor = feature_file["feature_extractor"]
+        if stream:
+            iter_extract_params = {
+                key: val for key, val in extract_params.items() if key != "output_dir"
+            }
+            return _predict_stream(
+                model_meta_filename,
+                iter_extract_params,
+                output_dir,
+                predict_proba,
+                convert_to,
+                return_predictions,
+            )
+
+        feature_extractor = _feature_extractor_for_model(model_meta_file)
         print("extracting features")
         feature_extractor.extract(**extract_params, make_output_subdir=False)
 
@@ -302,7 +702,7 @@ def predict(
 
         for ftr_file in ftr_files:
             print("predicting labels for features in file: {}".format(ftr_file))
-            ftr_file_dict = joblib.load(ftr_file)
+            ftr_file_dict = hvc.utils.load_feature_file(ftr_file)
             if model_name in valid_models["sklearn"]:
                 features = ftr_file_dict["features"]
                 if np.any(
@@ -342,7 +742,7 @@ def predict(
             if predict_proba:
                 pred_probs = clf.predict_proba(features_scaled)
                 ftr_file_dict["pred_probs"] = pred_probs
-            joblib.dump(ftr_file_dict, ftr_file)
+            hvc.utils.save_feature_file(ftr_file_dict, ftr_file)
 
             if convert_to:
                 songfiles = ftr_file_dict["songfiles"]
@@ -369,7 +769,7 @@ def predict(
         if return_predictions:
             predict_dict = {}
             for ftr_file in ftr_files:
-                ftrs = joblib.load(ftr_file)
+                ftrs = hvc.utils.load_feature_file(ftr_file)
                 if predict_dict == {}:
                     predict_dict["labels"] = ftrs["labels"]
                     predict_dict["pred_labels"] = ftrs["pred_labels"]
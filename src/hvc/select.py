@@ -13,8 +13,15 @@ import joblib
 import yaml
 
 from .parseconfig import parse_config
-from .utils import grab_n_samples_by_song, get_acc_by_label, timestamp
+from .utils import SongSampler, get_acc_by_label, timestamp
+from .utils import successive_halving_svm_rbf
+from .utils import KNeighborsGraph, RBFKernelCache
+from .utils.kernel_cache import DEFAULT_MAX_SIZE as DEFAULT_KERNEL_CACHE_SIZE
+from .utils import load_feature_file
+from .utils.result_log import ResultLog
 from hvc.parse.select import _validate_models as validate_models
+from hvc.parse.select import _validate_search as validate_search
+from hvc.parse.select import _validate_early_stopping as validate_early_stopping
 
 
 path = os.path.abspath(__file__)
@@ -25,6 +32,9 @@ with open(os.path.join(dir_path, "parse", "validation.yml")) as val_yaml:
 
 model_types = validate_dict["valid_models"]
 
+# saved in output directory, so a resumed model selection does not search again
+SEARCH_RESULTS_FILENAME = "search_results"
+
 
 def determine_model_output_folder_name(model_dict):
     """generates name for folder that holds model files
@@ -53,6 +63,12 @@ def select(
     num_replicates=None,
     num_test_samples=None,
     output_dir=None,
+    n_jobs=1,
+    seed=None,
+    kernel_cache_size=DEFAULT_KERNEL_CACHE_SIZE,
+    search=None,
+    early_stopping=None,
+    resume_dir=None,
 ):
     """high-level function for machine-learning model selection.
     Accepts either a config file or a set of parameters and
@@ -89,6 +105,64 @@ def select(
         Number of samples to use to test accuracy of the trained classifier.
     output_dir : str
         directory in which to save output
+    n_jobs : int
+        number of worker processes used to fit scikit-learn models.
+        -1 means use all CPUs. Training sets for all replicates are drawn before
+        any model is fit, so results are the same for any value of n_jobs.
+        If a config file is used, this is set by the 'n_jobs' key of each item
+        in the todo_list. Default is 1.
+    seed : int
+        seed for random number generators used to draw test and training sets.
+        Default is None, in which case a seed is drawn from the operating system.
+        Either way, the seed is saved in the summary file, so the same sets can
+        be drawn again. If a config file is used, this is set by the 'seed' key
+        of each item in the todo_list.
+    kernel_cache_size : float
+        max. size in MB of kernels cached by each worker process, when fitting
+        support vector machines that use the same value of gamma, so that
+        each kernel is computed once. Models fit with cached kernels are saved
+        as hvc.utils.kernel_cache.PrecomputedRBFSVC, which predicts the same
+        labels as an SVC with kernel='rbf'. Kernels that are bigger are computed
+        on the fly for each model instead, and models are saved as SVC.
+        If a config file is used, this is set by the 'kernel_cache_size' key
+        of each item in the todo_list.
+        Default is 1024.
+    search : dict
+        that specifies a search for hyperparameters of a model with successive
+        halving (see hvc.utils.successive_halving_svm_rbf), using all samples
+        that are not in the test set. A model with the best hyperparameters is
+        added to the models that are fit, and results of the search are saved in
+        the summary file. Keys are 'model_name' (currently only 'svm'), and
+        'feature_group' or 'feature_list_indices', and optionally 'C_range',
+        'gamma_range', 'factor', 'min_samples', 'n_splits', and 'predict_proba'.
+        If a config file is used, this is set by the 'search' key of each item
+        in the todo_list. Default is None.
+    early_stopping : dict
+        if specified, models are fit for each number of samples in
+        train_samples_range in order, and no more are fit once accuracy
+        (averaged across classes, and then across replicates) stops improving.
+        Keys are all optional: 'tol', the smallest increase in accuracy from
+        one number of samples to the next that is not a plateau; 'patience',
+        the number of plateaus in a row after which no more are fit; 'max_std',
+        the standard deviation of accuracy across replicates above which
+        replicates are added; and 'max_replicates', the most replicates there
+        can be, including added ones. Defaults are 0.005, 1, 0.02, and twice
+        num_replicates. Elements of score_arr and avg_acc_arr in the summary
+        file for models that were not fit are NaN. If a config file is used,
+        this is set by the 'early_stopping' key of each item in the todo_list.
+        Default is None, in which case every model is fit with every number of
+        samples and replicate.
+    resume_dir : str
+        directory in which to save models and summary instead of a new
+        select_output directory in output_dir. The result of each model is
+        appended to a log (select_results.jsonl) as soon as it is fit, so if
+        model selection is interrupted, calling hvc.select again with the same
+        resume_dir and the same parameters only fits models that are not in the
+        log yet. A select_output directory left by an interrupted run can also be
+        used as resume_dir. To make a summary file from the models in the log
+        without fitting the rest, use hvc.finalize_select. If a config file is
+        used, this is set by the 'resume_dir' key of each item in the todo_list.
+        Default is None.
 
     Other Parameters
     ----------------
@@ -146,15 +220,20 @@ def select(
                 "Completing item {} of {} in to-do list".format(ind + 1, len(todo_list))
             )
 
-            output_dir = os.path.abspath(todo["output_dir"])
-            output_dir = os.path.join(output_dir, "select_output_" + timestamp())
+            if "resume_dir" in todo:
+                output_dir = os.path.abspath(todo["resume_dir"])
+            else:
+                output_dir = os.path.abspath(todo["output_dir"])
+                output_dir = os.path.join(output_dir, "select_output_" + timestamp())
             if not os.path.isdir(output_dir):
                 os.makedirs(output_dir)
 
             if "models" in todo:
                 models = todo["models"]
-            else:
+            elif "models" in select_config:
                 models = select_config["models"]
+            else:  # todo only searches for a model
+                models = []
 
             if "num_test_samples" in todo:
                 num_test_samples = todo["num_test_samples"]
@@ -171,8 +250,35 @@ def select(
             else:
                 num_replicates = select_config["num_replicates"]
 
+            if "n_jobs" in todo:
+                todo_n_jobs = todo["n_jobs"]
+            else:
+                todo_n_jobs = n_jobs
+
+            if "seed" in todo:
+                todo_seed = todo["seed"]
+            else:
+                todo_seed = seed
+
+            if "kernel_cache_size" in todo:
+                todo_kernel_cache_size = todo["kernel_cache_size"]
+            else:
+                todo_kernel_cache_size = kernel_cache_size
+
+            if "search" in todo:
+                todo_search = todo["search"]
+            else:
+                todo_search = None
+
+            if "early_stopping" in todo:
+                todo_early_stopping = todo["early_stopping"]
+            elif early_stopping is not None:
+                todo_early_stopping = validate_early_stopping(early_stopping)
+            else:
+                todo_early_stopping = None
+
             feature_file_path = todo["feature_file"]
-            feature_file = joblib.load(feature_file_path)
+            feature_file = load_feature_file(feature_file_path)
 
             select_config = {
                 "feature_file": feature_file,
@@ -183,24 +289,36 @@ def select(
                 "models": models,
                 "output_dir": output_dir,
                 "config_file": config_file,
+                "n_jobs": todo_n_jobs,
+                "seed": todo_seed,
+                "kernel_cache_size": todo_kernel_cache_size,
+                "search": todo_search,
+                "early_stopping": todo_early_stopping,
             }
             _select(**select_config)
 
     else:  # if a config_file was not specified
-        if not os.path.isfile(feature_file_path):
+        if not os.path.exists(feature_file_path):
             raise FileNotFoundError(
                 "Can not find feature file: {}".format(feature_file_path)
             )
         else:
-            feature_file = joblib.load(feature_file_path)
+            feature_file = load_feature_file(feature_file_path)
 
-        output_dir = os.path.abspath(output_dir)
-        if not os.path.isdir(output_dir):
-            raise NotADirectoryError("could not find output_dir: {}".format(output_dir))
-        else:
-            output_dir = os.path.join(output_dir, "select_output_" + timestamp())
+        if resume_dir is not None:
+            output_dir = os.path.abspath(resume_dir)
             if not os.path.isdir(output_dir):
                 os.makedirs(output_dir)
+        else:
+            output_dir = os.path.abspath(output_dir)
+            if not os.path.isdir(output_dir):
+                raise NotADirectoryError(
+                    "could not find output_dir: {}".format(output_dir)
+                )
+            else:
+                output_dir = os.path.join(output_dir, "select_output_" + timestamp())
+                if not os.path.isdir(output_dir):
+                    os.makedirs(output_dir)
 
         if type(train_samples_range) != range:
             raise TypeError(
@@ -218,6 +336,8 @@ def select(
             feature_list_indices is None
             and feature_group is None
             and neuralnet_input is None
+            # unless only searching for a model
+            and not (search is not None and model_name is None and models is None)
         ):
             raise ValueError(
                 "Must specify either `feature_list_indices`, "
@@ -252,7 +372,9 @@ def select(
                 "which models to fit."
             )
 
-        if models is None:
+        if models is None and model_name is None and search is not None:
+            models = []
+        elif models is None:
             models = {"model_name": model_name, "hyperparameters": hyperparameters}
             if feature_group is not None:
                 models["feature_group"] = feature_group
@@ -279,6 +401,10 @@ def select(
             ftr_list_group_ID=ftr_list_group_ID,
             ftr_grp_ID_dict=ftr_grp_ID_dict,
         )
+        if search is not None:
+            search = validate_search(search)
+        if early_stopping is not None:
+            early_stopping = validate_early_stopping(early_stopping)
 
         select_config = {
             "feature_file": feature_file,
@@ -288,11 +414,511 @@ def select(
             "num_test_samples": num_test_samples,
             "models": models,
             "output_dir": output_dir,
+            "n_jobs": n_jobs,
+            "seed": seed,
+            "kernel_cache_size": kernel_cache_size,
+            "search": search,
+            "early_stopping": early_stopping,
         }
 
         _select(**select_config)
 
 
+def _feature_inds_for_model(model_dict, feature_file):
+    """get boolean array that indexes columns of features array
+    used to train a scikit-learn model"""
+    # if model_dict specifies using a certain feature group
+    if "feature_group" in model_dict:
+        # determine if we already figured out which features belong to that feature group.
+        # Can only do that if model_dict defined for todo_list, not if model_dict defined
+        # at top level of select config file
+        if "feature_list_indices" in model_dict:
+            feature_inds = np.in1d(
+                feature_file["features_arr_column_IDs"],
+                model_dict["feature_list_indices"],
+            )
+        else:  # have to figure out feature list indices
+            ftr_grp_ID_dict = feature_file["feature_group_ID_dict"]
+            ftr_list_grp_ID = feature_file["feature_list_group_ID"]
+            # figure out what they are by finding ID # corresponding to feature
+            # group or groups in ID_dict, and then finding all the indices in the
+            # feature list that have that group ID #, using ftr_list_grp_ID, a list
+            # the same length as feature list where each element indicates whether
+            # the element with the same index in the feature list belongs to a
+            # feature group and if so which one, by ID #
+            if type(model_dict["feature_group"]) == str:
+                ftr_grp_ID = ftr_grp_ID_dict[model_dict["feature_group"]]
+                # now find all the indices of features associated with the
+                # feature group for that model
+                ftr_list_inds = [
+                    ind for ind, val in enumerate(ftr_list_grp_ID) if val == ftr_grp_ID
+                ]
+
+            # if user specified more than one feature group
+            elif type(model_dict["feature_group"]) == list:
+                ftr_list_inds = []
+                for ftr_grp in model_dict["feature_group"]:
+                    ftr_grp_ID = ftr_grp_ID_dict[ftr_grp]
+                    # now find all the indices of features associated with the
+                    # feature group for that model
+                    ftr_list_inds.extend(
+                        [
+                            ind
+                            for ind, val in enumerate(ftr_list_grp_ID)
+                            if val == ftr_grp_ID
+                        ]
+                    )
+            # finally use ftr_list_inds to get the actual columns we need from the
+            # features array. Need to this because multiple columns might belong to
+            # the same feature, e.g. if the feature is a spectrum
+            feature_inds = np.in1d(
+                feature_file["features_arr_column_IDs"], ftr_list_inds
+            )
+            # put feature list indices in model dict so we have it later when
+            # saving summary file
+            model_dict["feature_list_indices"] = ftr_list_inds
+
+    elif "feature_list_indices" in model_dict and "feature_group" not in model_dict:
+        # if no feature group in model dict, use feature list indices
+        # Note that for neuralnet models, there will be neither
+        if type(model_dict["feature_list_indices"]) is str:
+            if model_dict["feature_list_indices"] == "all":
+                feature_inds = np.ones(
+                    (feature_file["features_arr_column_IDs"].shape[-1],)
+                ).astype(bool)
+            else:
+                raise ValueError(
+                    "received invalid string for feature_list_indices: {}".format(
+                        model_dict["feature_list_indices"]
+                    )
+                )
+        else:
+            # use 'feature_list_indices' from model_dict to get the actual columns
+            # we need from the features array. Again, need to this because multiple
+            # columns might belong to the same feature,
+            # e.g. if the feature is a spectrum
+            feature_inds = np.in1d(
+                feature_file["features_arr_column_IDs"],
+                model_dict["feature_list_indices"],
+            )
+
+    return feature_inds
+
+
+class _ScaledFeatures:
+    """features of training and test set for one replicate, scaled by mean and
+    standard deviation of the training set. Shared by all models fit with the
+    same training set and feature columns, so the features are sliced from the
+    features array and scaled only once."""
+
+    def __init__(self, features, feature_inds, train_IDs, test_IDs):
+        # use 'advanced indexing' to get only sample rows and only feature models
+        self.scaler = StandardScaler()
+        self.train = self.scaler.fit_transform(
+            features[train_IDs[:, np.newaxis], feature_inds]
+        )
+        self.test = self.scaler.transform(
+            features[test_IDs[:, np.newaxis], feature_inds]
+        )
+
+
+def _fit_sklearn_model(
+    model_dict,
+    scaled_features,
+    train_labels,
+    test_labels,
+    labels_to_use,
+    model_filename,
+    knn_graph=None,
+    kernel_cache=None,
+):
+    """fit one scikit-learn model, score it on the test set, and save it.
+    If knn_graph is specified, labels for k-Nearest Neighbors models are
+    predicted from it, instead of searching for neighbors again.
+    If kernel_cache is specified, support vector machines are fit with
+    kernels from it, instead of computing kernels again.
+
+    Returns
+    -------
+    fit_dict : dict
+        with keys 'score', 'avg_acc', 'pred_labels', and 'scaler'
+    """
+    # lazy-imports to avoid loading all of scikit-learn if possible
+    if model_dict["model_name"] == "svm":
+        from sklearn.svm import SVC
+
+        print("training svm. ", end="")
+        clf = SVC(
+            C=model_dict["hyperparameters"]["C"],
+            gamma=model_dict["hyperparameters"]["gamma"],
+            decision_function_shape="ovr",
+            probability=model_dict["predict_proba"],
+        )
+
+    elif model_dict["model_name"] == "knn":
+        from sklearn import neighbors
+
+        print("training knn. ", end="")
+        clf = neighbors.KNeighborsClassifier(
+            model_dict["hyperparameters"]["k"], weights="distance"
+        )
+
+    print("fitting model. ", end="")
+    if model_dict["model_name"] == "svm" and kernel_cache is not None:
+        clf, pred_labels = kernel_cache.fit_predict(clf, train_labels)
+    else:
+        clf.fit(scaled_features.train, train_labels)
+        if model_dict["model_name"] == "knn" and knn_graph is not None:
+            pred_labels = knn_graph.predict(model_dict["hyperparameters"]["k"])
+        else:
+            pred_labels = clf.predict(scaled_features.test)
+    score = accuracy_score(test_labels, pred_labels)
+    print("score on test set: {:05.4f} ".format(score), end="")
+    acc_by_label, avg_acc = get_acc_by_label(test_labels, pred_labels, labels_to_use)
+    print(", average accuracy on test set: {:05.4f}".format(avg_acc))
+    joblib.dump(clf, model_filename)
+    return {
+        "score": score,
+        "avg_acc": avg_acc,
+        "pred_labels": pred_labels,
+        "scaler": scaled_features.scaler,
+    }
+
+
+def _fit_sklearn_models(
+    model_dicts,
+    model_filenames,
+    features,
+    feature_inds,
+    train_IDs,
+    train_labels,
+    test_IDs,
+    test_labels,
+    labels_to_use,
+    kernel_cache_size=DEFAULT_KERNEL_CACHE_SIZE,
+):
+    """fit scikit-learn models that use the same training set and feature
+    columns, after scaling features once, and for k-Nearest Neighbors models,
+    finding neighbors once. Support vector machines that use the same value of
+    gamma are fit with kernels computed once, if the kernels are no bigger
+    than kernel_cache_size, in MB. Defined at module level so that it
+    can be run in a worker process.
+
+    Returns
+    -------
+    fit_dicts : list
+        of dicts returned by _fit_sklearn_model, one for each model
+    """
+    scaled_features = _ScaledFeatures(features, feature_inds, train_IDs, test_IDs)
+    knn_ks = [
+        model_dict["hyperparameters"]["k"]
+        for model_dict in model_dicts
+        if model_dict["model_name"] == "knn"
+    ]
+    if knn_ks:
+        # find neighbors once for the largest k, and score every k from them
+        knn_graph = KNeighborsGraph(
+            scaled_features.train, train_labels, scaled_features.test, max(knn_ks)
+        )
+    else:
+        knn_graph = None
+
+    svm_gammas = [
+        model_dict["hyperparameters"]["gamma"]
+        for model_dict in model_dicts
+        if model_dict["model_name"] == "svm"
+    ]
+    # only cache kernels for gammas shared by more than one model,
+    # since SVC computes only the parts of a kernel that it needs,
+    # and computing the whole kernel for one model is slower
+    cached_gammas = [gamma for gamma in svm_gammas if svm_gammas.count(gamma) > 1]
+    kernel_cache = RBFKernelCache(
+        scaled_features.train, scaled_features.test, max_size=kernel_cache_size
+    )
+    if cached_gammas and not kernel_cache.fits():
+        print(
+            "kernels for {} training samples are {:.1f} MB, bigger than "
+            "kernel_cache_size, computing them for each model".format(
+                scaled_features.train.shape[0], kernel_cache.kernel_size
+            )
+        )
+        cached_gammas = []
+
+    # fit support vector machines with the same gamma one after another,
+    # so kernels for a gamma are not removed from the cache before every model
+    # that uses them has been fit
+    fit_order = sorted(
+        range(len(model_dicts)),
+        key=lambda ind: (
+            model_dicts[ind]["model_name"] == "svm",
+            model_dicts[ind]["hyperparameters"].get("gamma", 0),
+        ),
+    )
+    fit_dicts = [None] * len(model_dicts)
+    for ind in fit_order:
+        model_dict = model_dicts[ind]
+        if (
+            model_dict["model_name"] == "svm"
+            and model_dict["hyperparameters"]["gamma"] in cached_gammas
+        ):
+            model_kernel_cache = kernel_cache
+        else:
+            model_kernel_cache = None
+        fit_dicts[ind] = _fit_sklearn_model(
+            model_dict,
+            scaled_features,
+            train_labels,
+            test_labels,
+            labels_to_use,
+            model_filenames[ind],
+            knn_graph,
+            model_kernel_cache,
+        )
+    return fit_dicts
+
+
+def _fit_keras_model(
+    model_dict,
+    feature_file,
+    train_IDs,
+    train_labels,
+    test_IDs,
+    test_labels,
+    label_binarizer,
+    num_train_samples,
+    replicate,
+    model_output_dir,
+    model_filename,
+):
+    """fit one keras model, score it on the test set, and save it.
+
+    Returns
+    -------
+    fit_dict : dict
+        with keys 'score', 'avg_acc', 'pred_labels', 'spect_scaler',
+        and 'neuralnet_input'
+    """
+    # lazy-imports to avoid loading tensorflow if possible
+    from hvc.neuralnet.models.flatwindow import flatwindow
+    from hvc.neuralnet.utils import SpectScaler
+    from keras.callbacks import (
+        ModelCheckpoint,
+        CSVLogger,
+        EarlyStopping,
+    )
+
+    if "neuralnet_input" in model_dict:
+        neuralnet_input = model_dict["neuralnet_input"]
+        spects = feature_file["neuralnet_inputs"][neuralnet_input]
+    else:
+        # if not specified, assume that input should be the one that
+        # corresponds to the neural net model being trained
+        neuralnet_input = model_dict["model_name"]
+        try:
+            spects = feature_file["neuralnet_inputs"][neuralnet_input]
+        except KeyError:
+            raise KeyError(
+                "no input specified for model {}, and "
+                "input type for that model was not found in "
+                "feature file".format(model_dict["model_name"])
+            )
+
+    test_labels_onehot = label_binarizer.transform(test_labels)
+    train_labels_onehot = label_binarizer.transform(train_labels)
+
+    # get spects for train and test set,
+    # also add axis so correct input_shape for keras.conv_2d
+    test_spects = spects[test_IDs, :, :]
+    train_spects = spects[train_IDs, :, :]
+
+    # scale all spects by mean and std of training set
+    spect_scaler = SpectScaler()
+    # concatenate all spects then rotate so
+    # Hz bins are columns, i.e., 'features'
+    spect_scaler.fit(train_spects)
+    train_spects_scaled = spect_scaler.transform(train_spects)
+    test_spects_scaled = spect_scaler.transform(test_spects)
+
+    # have to add 'channels' axis for keras 2-d convolution
+    # even though these are spectrograms, don't have channels
+    # like an image would.
+    # Decided to leave it explicit here instead of hiding in a function
+    train_spects_scaled = train_spects_scaled[:, :, :, np.newaxis]
+    test_spects_scaled = test_spects_scaled[:, :, :, np.newaxis]
+
+    (
+        num_samples,
+        num_freqbins,
+        num_timebins,
+        num_channels,
+    ) = train_spects_scaled.shape
+    num_label_classes = len(feature_file["labels_to_use"])
+    input_shape = (num_freqbins, num_timebins, num_channels)
+    flatwin = flatwindow(input_shape=input_shape, num_label_classes=num_label_classes)
+
+    csv_str = "".join(
+        [
+            "flatwindow_training_",
+            "{}_samples_".format(num_train_samples),
+            "replicate_{}".format(replicate),
+            ".log",
+        ]
+    )
+    csv_filename = os.path.join(model_output_dir, csv_str)
+    csv_logger = CSVLogger(csv_filename, separator=",", append=True)
+
+    checkpoint = ModelCheckpoint(
+        model_filename,
+        monitor="val_accuracy",
+        verbose=1,
+        save_best_only=True,
+        save_weights_only=False,
+        mode="max",
+    )
+    earlystop = EarlyStopping(
+        monitor="val_accuracy",
+        min_delta=0,
+        patience=20,
+        verbose=1,
+        mode="auto",
+    )
+    callbacks_list = [csv_logger, checkpoint, earlystop]
+
+    flatwin.fit(
+        train_spects_scaled,
+        train_labels_onehot,
+        validation_data=(test_spects_scaled, test_labels_onehot),
+        batch_size=model_dict["hyperparameters"]["batch_size"],
+        epochs=model_dict["hyperparameters"]["epochs"],
+        callbacks=callbacks_list,
+        verbose=1,
+    )
+
+    pred_labels = flatwin.predict(test_spects_scaled, batch_size=32, verbose=1)
+    pred_labels = label_binarizer.inverse_transform(pred_labels)
+
+    score = accuracy_score(test_labels, pred_labels)
+    print("score on test set: {:05.4f} ".format(score), end="")
+
+    acc_by_label, avg_acc = get_acc_by_label(
+        test_labels, pred_labels, feature_file["labels_to_use"]
+    )
+    print(", average accuracy on test set: {:05.4f}".format(avg_acc))
+    return {
+        "score": score,
+        "avg_acc": avg_acc,
+        "pred_labels": pred_labels,
+        "spect_scaler": spect_scaler,
+        "neuralnet_input": neuralnet_input,
+    }
+
+
+def _search_model(search, feature_file, train_song_ID_list, seed, n_jobs):
+    """search for hyperparameters of a model with successive halving,
+    using samples from songs that are not in the test set
+
+    Returns
+    -------
+    model_dict : dict
+        for model with best hyperparameters, that can be added to models
+    search_results : dict
+        with keys 'best_params', 'best_score', and 'cv_results'
+    """
+    model_dict = {
+        "model_name": search["model_name"],
+        "predict_proba": search["predict_proba"],
+    }
+    for key in ("feature_group", "feature_list_indices"):
+        if key in search:
+            model_dict[key] = copy.deepcopy(search[key])
+    feature_inds = _feature_inds_for_model(model_dict, feature_file)
+
+    song_IDs = np.asarray(feature_file["songfile_IDs"])
+    sample_IDs = np.flatnonzero(np.isin(song_IDs, train_song_ID_list))
+    features = feature_file["features"][sample_IDs[:, np.newaxis], feature_inds]
+    # can't fit models to samples where features could not be extracted
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    sample_IDs, features = sample_IDs[not_nan], features[not_nan]
+
+    search_params = {
+        key: search[key]
+        for key in ("C_range", "gamma_range", "factor", "min_samples", "n_splits")
+        if key in search
+    }
+    print("searching for hyperparameters of {} model".format(search["model_name"]))
+    best_params, best_score, cv_results = successive_halving_svm_rbf(
+        features,
+        np.asarray(feature_file["labels"])[sample_IDs],
+        song_IDs[sample_IDs],
+        # seed from seed of sampler, so search can be repeated
+        seed=int(np.random.SeedSequence(seed, spawn_key=(2,)).generate_state(1)[0]),
+        n_jobs=n_jobs,
+        return_cv_results=True,
+        # scale features for each fold, so validation sets don't affect scaling
+        standardize=True,
+        **search_params
+    )
+    model_dict["hyperparameters"] = best_params
+    search_results = {
+        "best_params": best_params,
+        "best_score": best_score,
+        "cv_results": cv_results,
+    }
+    return model_dict, search_results
+
+
+def _early_stopping_rounds(
+    train_samples_range, num_replicates, avg_acc_arr, early_stopping
+):
+    """yields lists of (num_samples_ind, replicate, model_ind) for models to fit,
+    one number of training samples at a time, reading avg_acc_arr after each
+    list is fit to decide what to fit next.
+
+    For each number of samples, num_replicates of every model are fit, then
+    one more replicate is added at a time for models where the standard
+    deviation of avg_acc across replicates is more than max_std, until there
+    are max_replicates. No more numbers of samples are fit once mean avg_acc
+    of every model has increased by less than tol, patience times in a row.
+    """
+    max_replicates = avg_acc_arr.shape[1]
+    num_models = avg_acc_arr.shape[2]
+    prev_mean_acc = None
+    num_plateaus = 0
+    for num_samples_ind in range(len(train_samples_range)):
+        yield [
+            (num_samples_ind, replicate, model_ind)
+            for replicate in range(num_replicates)
+            for model_ind in range(num_models)
+        ]
+        for replicate in range(num_replicates, max_replicates):
+            # NaN for models that were not fit with earlier added replicates
+            std_acc = np.nanstd(avg_acc_arr[num_samples_ind, :replicate], axis=0)
+            noisy_model_inds = np.flatnonzero(std_acc > early_stopping["max_std"])
+            if noisy_model_inds.size == 0:
+                break
+            yield [
+                (num_samples_ind, replicate, model_ind)
+                for model_ind in noisy_model_inds
+            ]
+
+        mean_acc = np.nanmean(avg_acc_arr[num_samples_ind], axis=0)
+        if prev_mean_acc is not None and np.all(
+            mean_acc - prev_mean_acc < early_stopping["tol"]
+        ):
+            num_plateaus += 1
+            if num_plateaus >= early_stopping["patience"]:
+                print(
+                    "accuracy stopped improving with {} training samples, "
+                    "not fitting models with more".format(
+                        train_samples_range[num_samples_ind]
+                    )
+                )
+                return
+        else:
+            num_plateaus = 0
+        prev_mean_acc = mean_acc
+
+
 def _select(
     feature_file,
     feature_file_path,
@@ -302,399 +928,368 @@ def _select(
     models,
     output_dir,
     config_file=None,
+    n_jobs=1,
+    seed=None,
+    kernel_cache_size=DEFAULT_KERNEL_CACHE_SIZE,
+    search=None,
+    early_stopping=None,
 ):
     """helper function to do model selection, used with either config_file or
     another set of arguments passed to hvc.select"""
     labels = np.asarray(feature_file["labels"])
-    # call grab_n_samples this first time to get indices for test/validation set
-    # and a list of song IDs from which we will draw the training set indices below
-    test_IDs, train_song_ID_list = grab_n_samples_by_song(
-        feature_file["songfile_IDs"],
-        feature_file["labels"],
-        num_test_samples,
-        return_popped_songlist=True,
+    # draw indices for test/validation set, then training sets for every
+    # replicate from the rest of the songs, up front, so results do not depend
+    # on the order in which models are fit. Currently each training set is a
+    # random draw without anything like k-folds.
+    # For testing on large datasets this is okay but in situations
+    # where we're data-limited it's less than ideal, the whole point
+    # is to not have to hand-label a large data set
+    result_log = ResultLog(output_dir)
+    if seed is None and result_log.settings is not None:
+        # resume with the seed that the interrupted run drew training sets with
+        seed = result_log.settings["seed"]
+    sampler = SongSampler(feature_file["songfile_IDs"], labels, seed=seed)
+    test_IDs, train_song_ID_list, train_IDs_arr = sampler.train_test_split(
+        num_test_samples, train_samples_range, num_replicates
     )
     test_labels = labels[test_IDs]
 
-    score_arr = np.zeros(
-        (len(train_samples_range), len(range(num_replicates)), len(models))
-    )
-    avg_acc_arr = np.zeros(
-        (len(train_samples_range), len(range(num_replicates)), len(models))
-    )
-    pred_labels_arr = np.empty(
-        (len(train_samples_range), len(range(num_replicates)), len(models)), dtype="O"
+    if search is not None:
+        search_results_filename = os.path.join(output_dir, SEARCH_RESULTS_FILENAME)
+        if os.path.isfile(search_results_filename):
+            search_model_dict, search_results = joblib.load(search_results_filename)
+        else:
+            search_model_dict, search_results = _search_model(
+                search, feature_file, train_song_ID_list, sampler.seed, n_jobs
+            )
+            joblib.dump((search_model_dict, search_results), search_results_filename)
+        models = list(models) + [search_model_dict]
+
+    if early_stopping is not None:
+        early_stopping = copy.deepcopy(early_stopping)
+        if early_stopping["max_replicates"] is None:
+            early_stopping["max_replicates"] = 2 * num_replicates
+        max_replicates = max(num_replicates, early_stopping["max_replicates"])
+        # training sets for added replicates are drawn when they are needed
+        all_train_IDs_arr = np.empty(
+            (len(train_samples_range), max_replicates), dtype="O"
+        )
+        all_train_IDs_arr[:, :num_replicates] = train_IDs_arr
+        train_IDs_arr = all_train_IDs_arr
+    else:
+        max_replicates = num_replicates
+
+    if type(train_samples_range) is range:
+        logged_train_samples_range = {
+            "start": train_samples_range.start,
+            "stop": train_samples_range.stop,
+            "step": train_samples_range.step,
+        }
+    else:
+        logged_train_samples_range = [int(val) for val in train_samples_range]
+    result_log.start(
+        {
+            "config_file": config_file,
+            "feature_file": os.path.abspath(feature_file_path),
+            "train_samples_range": logged_train_samples_range,
+            "num_replicates": num_replicates,
+            "num_test_samples": num_test_samples,
+            "seed": sampler.seed,
+            "models": models,
+            "search": search,
+            "early_stopping": early_stopping,
+        }
     )
-    train_IDs_arr = np.empty(
-        (len(train_samples_range), len(range(num_replicates))), dtype="O"
+    if result_log.results:
+        print(
+            "Found results of {} models already fit in {}, "
+            "not fitting them again.".format(len(result_log.results), output_dir)
+        )
+
+    # results are saved in the log, and the summary is made from it by
+    # finalize_select; avg_acc_arr is kept so early stopping can decide what to fit
+    avg_acc_arr = np.full(
+        (len(train_samples_range), max_replicates, len(models)), np.nan
     )
 
-    for num_samples_ind, num_train_samples in enumerate(train_samples_range):
-        for replicate in range(num_replicates):
-            print(
-                "Training models with {0} samples, replicate #{1}".format(
-                    num_train_samples, replicate
+    feature_inds_list = []
+    for model_dict in models:
+        if model_dict["model_name"] in model_types["sklearn"]:
+            feature_inds_list.append(_feature_inds_for_model(model_dict, feature_file))
+        else:
+            feature_inds_list.append(None)
+        # save info associated with model such as indices of training samples.
+        model_output_dir = os.path.join(
+            output_dir, determine_model_output_folder_name(model_dict)
+        )
+        if not os.path.isdir(model_output_dir):
+            os.makedirs(model_output_dir)
+
+    if any(model_dict["model_name"] in model_types["keras"] for model_dict in models):
+        from sklearn.preprocessing import LabelBinarizer
+
+        label_binarizer = LabelBinarizer()
+        label_binarizer.fit(test_labels)
+
+    if early_stopping is None:
+        fit_rounds = [
+            [
+                (num_samples_ind, replicate, model_ind)
+                for num_samples_ind in range(len(train_samples_range))
+                for replicate in range(num_replicates)
+                for model_ind in range(len(models))
+            ]
+        ]
+    else:
+        fit_rounds = _early_stopping_rounds(
+            train_samples_range, num_replicates, avg_acc_arr, early_stopping
+        )
+
+    for fit_round in fit_rounds:
+        jobs = []
+        for num_samples_ind, replicate, model_ind in fit_round:
+            if result_log.has(num_samples_ind, replicate, model_ind):
+                # early stopping decides what to fit next from these
+                result = result_log.results[(num_samples_ind, replicate, model_ind)]
+                avg_acc_arr[num_samples_ind, replicate, model_ind] = result["avg_acc"]
+                continue
+            num_train_samples = train_samples_range[num_samples_ind]
+            if train_IDs_arr[num_samples_ind, replicate] is None:
+                train_IDs_arr[num_samples_ind, replicate] = sampler.train_sample(
+                    num_train_samples, replicate, train_song_ID_list
                 )
+            model_dict = models[model_ind]
+            model_output_dir = os.path.join(
+                output_dir, determine_model_output_folder_name(model_dict)
             )
-            # here we call grab_n_samples again with the train_song_ID_list
-            # from above. currently each fold is a random grab without
-            # anything like k-folds.
-            # For testing on large datasets this is okay but in situations
-            # where we're data-limited it's less than ideal, the whole point
-            # is to not have to hand-label a large data set
-            train_IDs = grab_n_samples_by_song(
-                feature_file["songfile_IDs"],
-                feature_file["labels"],
-                num_train_samples,
-                song_ID_list=train_song_ID_list,
+            model_fname_str = "{0}_{1}samples_replicate{2}.model".format(
+                model_dict["model_name"], num_train_samples, replicate
             )
-            train_IDs_arr[num_samples_ind, replicate] = train_IDs
-            train_labels = labels[train_IDs]
-            for model_ind, model_dict in enumerate(models):
-
-                # lazy-imports to avoid loading all of
-                # scikit-learn and tensorflow if possible
-                if model_dict["model_name"] == "svm":
-                    if "SVC" not in locals():
-                        from sklearn.svm import SVC
-
-                elif model_dict["model_name"] == "knn":
-                    if "neighbors" not in locals():
-                        from sklearn import neighbors
-
-                elif model_dict["model_name"] == "flatwindow":
-                    if "flatwindow" not in locals():
-                        from hvc.neuralnet.models.flatwindow import flatwindow
-                        from keras.callbacks import (
-                            ModelCheckpoint,
-                            CSVLogger,
-                            EarlyStopping,
-                        )
-
-                # save info associated with model such as indices of training samples.
-                # Note this is done outside the if/elif list for switching between
-                # models.
-                model_output_dir = os.path.join(
-                    output_dir, determine_model_output_folder_name(model_dict)
+            model_filename = os.path.join(model_output_dir, model_fname_str)
+            jobs.append(
+                (
+                    num_samples_ind,
+                    num_train_samples,
+                    replicate,
+                    model_ind,
+                    model_output_dir,
+                    model_filename,
                 )
-                if not os.path.isdir(model_output_dir):
-                    os.makedirs(model_output_dir)
+            )
 
-                model_fname_str = "{0}_{1}samples_replicate{2}.model".format(
-                    model_dict["model_name"], num_train_samples, replicate
+        # scikit-learn models are independent of each other, so fit them in
+        # worker processes. Models fit with the same training set and feature
+        # columns are fit by the same worker, so features are scaled once for all
+        # of them. Arrays bigger than 1 MB are memory-mapped by joblib instead of
+        # being copied to each worker.
+        sklearn_job_groups = {}
+        for job in jobs:
+            num_samples_ind, _, replicate, model_ind, _, _ = job
+            if models[model_ind]["model_name"] in model_types["sklearn"]:
+                group_key = (
+                    num_samples_ind,
+                    replicate,
+                    feature_inds_list[model_ind].tobytes(),
                 )
-                model_filename = os.path.join(model_output_dir, model_fname_str)
-
-                # if-elif that switches based on model type,
-                # start with sklearn models
-                if model_dict["model_name"] in model_types["sklearn"]:
-
-                    # if model_dict specifies using a certain feature group
-                    if "feature_group" in model_dict:
-                        # determine if we already figured out which features belong to that feature group.
-                        # Can only do that if model_dict defined for todo_list, not if model_dict defined
-                        # at top level of select config file
-                        if "feature_list_indices" in model_dict:
-                            feature_inds = np.in1d(
-                                feature_file["features_arr_column_IDs"],
-                                model_dict["feature_list_indices"],
-                            )
-                        else:  # have to figure out feature list indices
-                            ftr_grp_ID_dict = feature_file["feature_group_ID_dict"]
-                            ftr_list_grp_ID = feature_file["feature_list_group_ID"]
-                            # figure out what they are by finding ID # corresponding to feature
-                            # group or groups in ID_dict, and then finding all the indices in the
-                            # feature list that have that group ID #, using ftr_list_grp_ID, a list
-                            # the same length as feature list where each element indicates whether
-                            # the element with the same index in the feature list belongs to a
-                            # feature group and if so which one, by ID #
-                            if type(model_dict["feature_group"]) == str:
-                                ftr_grp_ID = ftr_grp_ID_dict[
-                                    model_dict["feature_group"]
-                                ]
-                                # now find all the indices of features associated with the
-                                # feature group for that model
-                                ftr_list_inds = [
-                                    ind
-                                    for ind, val in enumerate(ftr_list_grp_ID)
-                                    if val == ftr_grp_ID
-                                ]
-
-                            # if user specified more than one feature group
-                            elif type(model_dict["feature_group"]) == list:
-                                ftr_list_inds = []
-                                for ftr_grp in model_dict["feature_group"]:
-                                    ftr_grp_ID = ftr_grp_ID_dict[ftr_grp]
-                                    # now find all the indices of features associated with the
-                                    # feature group for that model
-                                    ftr_list_inds.extend(
-                                        [
-                                            ind
-                                            for ind, val in enumerate(ftr_list_grp_ID)
-                                            if val == ftr_grp_ID
-                                        ]
-                                    )
-                            # finally use ftr_list_inds to get the actual columns we need from the
-                            # features array. Need to this because multiple columns might belong to
-                            # the same feature, e.g. if the feature is a spectrum
-                            feature_inds = np.in1d(
-                                feature_file["features_arr_column_IDs"], ftr_list_inds
-                            )
-                            # put feature list indices in model dict so we have it later when
-                            # saving summary file
-                            model_dict["feature_list_indices"] = ftr_list_inds
-
-                    elif (
-                        "feature_list_indices" in model_dict
-                        and "feature_group" not in model_dict
-                    ):
-                        # if no feature group in model dict, use feature list indices
-                        # Note that for neuralnet models, there will be neither
-                        if type(model_dict["feature_list_indices"]) is str:
-                            if model_dict["feature_list_indices"] == "all":
-                                feature_inds = np.ones(
-                                    (feature_file["features_arr_column_IDs"].shape[-1],)
-                                ).astype(bool)
-                            else:
-                                raise ValueError(
-                                    "received invalid string for feature_list_indices: {}".format(
-                                        model_dict["feature_list_indices"]
-                                    )
-                                )
-                        else:
-                            # use 'feature_list_indices' from model_dict to get the actual columns
-                            # we need from the features array. Again, need to this because multiple
-                            # columns might belong to the same feature,
-                            # e.g. if the feature is a spectrum
-                            feature_inds = np.in1d(
-                                feature_file["features_arr_column_IDs"],
-                                model_dict["feature_list_indices"],
-                            )
-
-                    if model_dict["model_name"] == "svm":
-                        print("training svm. ", end="")
-                        clf = SVC(
-                            C=model_dict["hyperparameters"]["C"],
-                            gamma=model_dict["hyperparameters"]["gamma"],
-                            decision_function_shape="ovr",
-                            probability=model_dict["predict_proba"],
-                        )
-
-                    elif model_dict["model_name"] == "knn":
-                        print("training knn. ", end="")
-                        clf = neighbors.KNeighborsClassifier(
-                            model_dict["hyperparameters"]["k"], weights="distance"
-                        )
-
-                    # use 'advanced indexing' to get only sample rows and only feature models
-                    features_train = feature_file["features"][
-                        train_IDs[:, np.newaxis], feature_inds
-                    ]
-                    scaler = StandardScaler()
-                    features_train = scaler.fit_transform(features_train)
-
-                    features_test = feature_file["features"][
-                        test_IDs[:, np.newaxis], feature_inds
-                    ]
-                    features_test = scaler.transform(features_test)
-
-                    print("fitting model. ", end="")
-                    clf.fit(features_train, train_labels)
-                    score = clf.score(features_test, test_labels)
-                    print("score on test set: {:05.4f} ".format(score), end="")
-                    score_arr[num_samples_ind, replicate, model_ind] = score
-                    pred_labels = clf.predict(features_test)
-                    pred_labels_arr[num_samples_ind, replicate, model_ind] = pred_labels
-                    acc_by_label, avg_acc = get_acc_by_label(
-                        test_labels, pred_labels, feature_file["labels_to_use"]
-                    )
-                    print(", average accuracy on test set: {:05.4f}".format(avg_acc))
-                    avg_acc_arr[num_samples_ind, replicate, model_ind] = avg_acc
-                    joblib.dump(clf, model_filename)
-
-                # this is the middle of the if-elif that switches based on model type
-                # end sklearn, start keras models
-                elif model_dict["model_name"] in model_types["keras"]:
-                    if "neuralnet_input" in model_dict:
-                        neuralnet_input = model_dict["neuralnet_input"]
-                        spects = feature_file["neuralnet_inputs"][neuralnet_input]
-                    else:
-                        # if not specified, assume that input should be the one that
-                        # corresponds to the neural net model being trained
-                        neuralnet_input = model_dict["model_name"]
-                        try:
-                            spects = feature_file["neuralnet_inputs"][neuralnet_input]
-                        except KeyError:
-                            raise KeyError(
-                                "no input specified for model {}, and "
-                                "input type for that model was not found in "
-                                "feature file".format(model_dict["model_name"])
-                            )
-
-                    if "SpectScaler" not in locals():
-                        from hvc.neuralnet.utils import SpectScaler
-
-                    if "test_labels_onehot" not in locals():
-                        from sklearn.preprocessing import LabelBinarizer
-
-                        label_binarizer = LabelBinarizer()
-                        test_labels_onehot = label_binarizer.fit_transform(test_labels)
-
-                    if "test_spects" not in locals():
-                        # get spects for test set,
-                        # also add axis so correct input_shape for keras.conv_2d
-                        test_spects = spects[test_IDs, :, :]
-
-                    train_labels_onehot = label_binarizer.transform(train_labels)
-
-                    # get spects for train set,
-                    # also add axis so correct input_shape for keras.conv_2d
-                    train_spects = spects[train_IDs, :, :]
-
-                    # scale all spects by mean and std of training set
-                    spect_scaler = SpectScaler()
-                    # concatenate all spects then rotate so
-                    # Hz bins are columns, i.e., 'features'
-                    spect_scaler.fit(train_spects)
-                    train_spects_scaled = spect_scaler.transform(train_spects)
-                    test_spects_scaled = spect_scaler.transform(test_spects)
-
-                    # have to add 'channels' axis for keras 2-d convolution
-                    # even though these are spectrograms, don't have channels
-                    # like an image would.
-                    # Decided to leave it explicit here instead of hiding in a function
-                    train_spects_scaled = train_spects_scaled[:, :, :, np.newaxis]
-                    test_spects_scaled = test_spects_scaled[:, :, :, np.newaxis]
-
-                    (
-                        num_samples,
-                        num_freqbins,
-                        num_timebins,
-                        num_channels,
-                    ) = train_spects_scaled.shape
-                    num_label_classes = len(feature_file["labels_to_use"])
-                    input_shape = (num_freqbins, num_timebins, num_channels)
-                    flatwin = flatwindow(
-                        input_shape=input_shape, num_label_classes=num_label_classes
-                    )
-
-                    csv_str = "".join(
-                        [
-                            "flatwindow_training_",
-                            "{}_samples_".format(num_train_samples),
-                            "replicate_{}".format(replicate),
-                            ".log",
-                        ]
-                    )
-                    csv_filename = os.path.join(model_output_dir, csv_str)
-                    csv_logger = CSVLogger(csv_filename, separator=",", append=True)
-
-                    checkpoint = ModelCheckpoint(
-                        model_filename,
-                        monitor="val_accuracy",
-                        verbose=1,
-                        save_best_only=True,
-                        save_weights_only=False,
-                        mode="max",
-                    )
-                    earlystop = EarlyStopping(
-                        monitor="val_accuracy",
-                        min_delta=0,
-                        patience=20,
-                        verbose=1,
-                        mode="auto",
-                    )
-                    callbacks_list = [csv_logger, checkpoint, earlystop]
-
-                    flatwin.fit(
-                        train_spects_scaled,
-                        train_labels_onehot,
-                        validation_data=(test_spects_scaled, test_labels_onehot),
-                        batch_size=model_dict["hyperparameters"]["batch_size"],
-                        epochs=model_dict["hyperparameters"]["epochs"],
-                        callbacks=callbacks_list,
-                        verbose=1,
-                    )
+                sklearn_job_groups.setdefault(group_key, []).append(job)
+        sklearn_job_groups = list(sklearn_job_groups.values())
+        sklearn_fits = joblib.Parallel(n_jobs=n_jobs)(
+            joblib.delayed(_fit_sklearn_models)(
+                [models[job[3]] for job in job_group],
+                [job[5] for job in job_group],
+                feature_file["features"],
+                feature_inds_list[job_group[0][3]],
+                train_IDs_arr[job_group[0][0], job_group[0][2]],
+                labels[train_IDs_arr[job_group[0][0], job_group[0][2]]],
+                test_IDs,
+                test_labels,
+                feature_file["labels_to_use"],
+                kernel_cache_size,
+            )
+            for job_group in sklearn_job_groups
+        )
+        fits = {}
+        for job_group, group_fits in zip(sklearn_job_groups, sklearn_fits):
+            fits.update(zip(job_group, group_fits))
 
-                    pred_labels = flatwin.predict(
-                        test_spects_scaled, batch_size=32, verbose=1
+        for job in jobs:
+            (
+                num_samples_ind,
+                num_train_samples,
+                replicate,
+                model_ind,
+                model_output_dir,
+                model_filename,
+            ) = job
+            model_dict = models[model_ind]
+            train_IDs = train_IDs_arr[num_samples_ind, replicate]
+
+            if model_dict["model_name"] in model_types["keras"]:
+                # keras models are fit one at a time in this process,
+                # since each already uses all CPUs
+                print(
+                    "Training {0} with {1} samples, replicate #{2}".format(
+                        model_dict["model_name"], num_train_samples, replicate
                     )
-                    pred_labels = label_binarizer.inverse_transform(pred_labels)
-
-                    score = accuracy_score(test_labels, pred_labels)
-                    print("score on test set: {:05.4f} ".format(score), end="")
-                    score_arr[num_samples_ind, replicate, model_ind] = score
-
-                    pred_labels_arr[num_samples_ind, replicate, model_ind] = pred_labels
+                )
+                fits[job] = _fit_keras_model(
+                    model_dict,
+                    feature_file,
+                    train_IDs,
+                    labels[train_IDs],
+                    test_IDs,
+                    test_labels,
+                    label_binarizer,
+                    num_train_samples,
+                    replicate,
+                    model_output_dir,
+                    model_filename,
+                )
+            fit_dict = fits.pop(job)
 
-                    acc_by_label, avg_acc = get_acc_by_label(
-                        test_labels, pred_labels, feature_file["labels_to_use"]
-                    )
-                    print(", average accuracy on test set: {:05.4f}".format(avg_acc))
-                    avg_acc_arr[num_samples_ind, replicate, model_ind] = avg_acc
+            avg_acc_arr[num_samples_ind, replicate, model_ind] = fit_dict["avg_acc"]
 
-            model_meta_fname_str = "{0}_{1}samples_replicate{2}.meta".format(
-                model_dict["model_name"], num_train_samples, replicate
+            model_meta_filename = model_filename.replace(".model", ".meta")
+            # save parameters of feature extractor in a small file, so predict
+            # does not have to load the feature file to make a FeatureExtractor
+            extractor_manifest_filename = model_meta_filename.replace(
+                ".meta", ".extractor.json"
             )
-            model_meta_filename = os.path.join(model_output_dir, model_meta_fname_str)
+            feature_file["feature_extractor"].save_manifest(extractor_manifest_filename)
             model_meta_output_dict = {
                 "model_filename": model_filename,
+                "extractor_manifest": extractor_manifest_filename,
                 "config_file": config_file,
                 "feature_file": feature_file_path,
                 "test_IDs": test_IDs,
                 "train_IDs": train_IDs,
                 "model_name": model_dict["model_name"],
-                "pred_labels": pred_labels,
+                "pred_labels": fit_dict["pred_labels"],
                 "test_labels": test_labels,
             }
 
-            if "scaler" in locals():
-                model_meta_output_dict["scaler"] = scaler
-                # have to delete scaler
-                # so it's not still in memory next loop
-                # (e.g. because a different model that doesn't use scaler
-                # is tested in next loop)
-                del scaler
-            elif "spect_scaler" in locals():
-                # neural net models uses scaler on spectrogram
-                # instead of vanilla sklearn scalar
-                model_meta_output_dict["spect_scaler"] = spect_scaler
-                del spect_scaler
-
-            if "label_binarizer" in locals():
-                model_meta_output_dict["label_binarizer"] = label_binarizer
-
             if model_dict["model_name"] in model_types["sklearn"]:
+                model_meta_output_dict["scaler"] = fit_dict["scaler"]
                 # to be able to extract features for predictions
                 # on unlabeled data set, need list of features
                 if (type(model_dict["feature_list_indices"]) is str) and (
                     model_dict["feature_list_indices"] == "all"
                 ):
                     model_feature_list = feature_file["feature_list"]
+                    model_feature_list_indices = list(
+                        range(len(feature_file["feature_list"]))
+                    )
                 else:
                     model_feature_list = [
                         feature_file["feature_list"][ind]
                         for ind in model_dict["feature_list_indices"]
                     ]
+                    # columns of features array used to train model are in the
+                    # same order as the feature list, not the order of the indices
+                    model_feature_list_indices = sorted(
+                        set(model_dict["feature_list_indices"])
+                    )
                 model_meta_output_dict["feature_list"] = model_feature_list
+                model_meta_output_dict[
+                    "feature_list_indices"
+                ] = model_feature_list_indices
             elif model_dict["model_name"] in model_types["keras"]:
-                model_meta_output_dict["feature_list"] = [neuralnet_input]
+                # neural net models uses scaler on spectrogram
+                # instead of vanilla sklearn scalar
+                model_meta_output_dict["spect_scaler"] = fit_dict["spect_scaler"]
+                model_meta_output_dict["label_binarizer"] = label_binarizer
+                model_meta_output_dict["feature_list"] = [fit_dict["neuralnet_input"]]
             joblib.dump(model_meta_output_dict, model_meta_filename)
+            result_log.add(
+                {
+                    "num_samples_ind": int(num_samples_ind),
+                    "num_train_samples": int(num_train_samples),
+                    "replicate": int(replicate),
+                    "model_ind": int(model_ind),
+                    "score": float(fit_dict["score"]),
+                    "avg_acc": float(fit_dict["avg_acc"]),
+                    "meta_file": os.path.relpath(model_meta_filename, output_dir),
+                }
+            )
 
     # after looping through all samples + replicates
-    output_filename = os.path.join(
+    finalize_select(output_dir)
+
+
+def finalize_select(output_dir):
+    """make the summary file of a model selection from its log of results,
+    e.g. to get results from a model selection that was interrupted.
+    Called by hvc.select after all models are fit.
+
+    Parameters
+    ----------
+    output_dir : str
+        directory where hvc.select saved models and a log of their results,
+        i.e. a select_output directory or a resume_dir
+
+    Returns
+    -------
+    summary_filename : str
+        path to summary file. Elements of score_arr and avg_acc_arr for models
+        that are not in the log are NaN, and elements of pred_labels_arr and
+        train_IDs_arr are None.
+    """
+    result_log = ResultLog(output_dir)
+    if result_log.settings is None:
+        raise FileNotFoundError(
+            "did not find a log of results from hvc.select in {}".format(output_dir)
+        )
+    settings = result_log.settings
+    if type(settings["train_samples_range"]) is dict:
+        train_samples_range = range(
+            settings["train_samples_range"]["start"],
+            settings["train_samples_range"]["stop"],
+            settings["train_samples_range"]["step"],
+        )
+    else:
+        train_samples_range = settings["train_samples_range"]
+    num_replicates = settings["num_replicates"]
+    if settings["early_stopping"] is not None:
+        max_replicates = max(
+            num_replicates, settings["early_stopping"]["max_replicates"]
+        )
+    else:
+        max_replicates = num_replicates
+    models = settings["models"]
+
+    arr_shape = (len(train_samples_range), max_replicates, len(models))
+    score_arr = np.full(arr_shape, np.nan)
+    avg_acc_arr = np.full(arr_shape, np.nan)
+    pred_labels_arr = np.empty(arr_shape, dtype="O")
+    train_IDs_arr = np.empty(arr_shape[:2], dtype="O")
+    test_IDs = None
+    for key, result in sorted(result_log.results.items()):
+        score_arr[key] = result["score"]
+        avg_acc_arr[key] = result["avg_acc"]
+        model_meta = joblib.load(os.path.join(result_log.log_dir, result["meta_file"]))
+        pred_labels_arr[key] = model_meta["pred_labels"]
+        train_IDs_arr[key[:2]] = model_meta["train_IDs"]
+        test_IDs = model_meta["test_IDs"]
+
+    summary_filename = os.path.join(
         output_dir, "summary_model_select_file_created_" + timestamp()
     )
     select_summary_dict = {
-        "config_file": config_file,
-        "feature_file": feature_file_path,
+        "config_file": settings["config_file"],
+        "feature_file": settings["feature_file"],
         "train_samples_range": train_samples_range,
         "num_replicates": num_replicates,
-        "model_dict": model_dict,
+        "early_stopping": settings["early_stopping"],
+        "seed": settings["seed"],
+        "model_dict": models[-1],
         "test_IDs": test_IDs,
         "train_IDs_arr": train_IDs_arr,
         "score_arr": score_arr,
         "avg_acc_arr": avg_acc_arr,
         "pred_labels_arr": pred_labels_arr,
     }
-    joblib.dump(select_summary_dict, output_filename)
+    search_results_filename = os.path.join(output_dir, SEARCH_RESULTS_FILENAME)
+    if settings["search"] is not None and os.path.isfile(search_results_filename):
+        select_summary_dict["search"] = joblib.load(search_results_filename)[1]
+    joblib.dump(select_summary_dict, summary_filename)
+    return summary_filename
@@ -0,0 +1,433 @@
+"""
+long-running server that keeps trained models loaded in memory,
+and predicts labels for audio sent to it over localhost HTTP or a Unix socket
+"""
+import base64
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .predict import Predictor
+
+# number of most recent requests used to compute latency percentiles
+LATENCY_WINDOW = 1000
+
+
+class ServerMetrics:
+    """thread-safe counters of requests handled by a ModelServer
+
+    Attributes
+    ----------
+    start_time : float
+        time when server started, as returned by time.time
+    num_requests : int
+        number of requests handled
+    num_items : int
+        number of audio files or sample buffers that labels were predicted for
+    num_errors : int
+        number of requests that raised an error
+    latencies : collections.deque
+        latency in seconds of the LATENCY_WINDOW most recent requests
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start_time = time.time()
+        self.num_requests = 0
+        self.num_items = 0
+        self.num_errors = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, latency, num_items, error=False):
+        """record one request
+
+        Parameters
+        ----------
+        latency : float
+            time in seconds taken to handle request
+        num_items : int
+            number of items in request
+        error : bool
+            if True, request raised an error. Default is False.
+        """
+        with self._lock:
+            self.num_requests += 1
+            self.num_items += num_items
+            if error:
+                self.num_errors += 1
+            self.total_latency += latency
+            self.latencies.append(latency)
+
+    def to_dict(self):
+        """returns dict of metrics
+
+        Returns
+        -------
+        metrics : dict
+            with keys uptime, num_requests, num_items, num_errors,
+            requests_per_s, items_per_s, mean_latency, and
+            p50_latency, p95_latency, p99_latency, max_latency
+            computed from the most recent requests. Times are in seconds.
+        """
+        with self._lock:
+            uptime = time.time() - self.start_time
+            metrics = {
+                "uptime": uptime,
+                "num_requests": self.num_requests,
+                "num_items": self.num_items,
+                "num_errors": self.num_errors,
+                "requests_per_s": self.num_requests / uptime,
+                "items_per_s": self.num_items / uptime,
+                "mean_latency": (
+                    self.total_latency / self.num_requests
+                    if self.num_requests > 0
+                    else None
+                ),
+            }
+            latencies = np.asarray(self.latencies)
+        for percentile in (50, 95, 99):
+            metrics["p{}_latency".format(percentile)] = (
+                float(np.percentile(latencies, percentile))
+                if latencies.shape[0] > 0
+                else None
+            )
+        metrics["max_latency"] = (
+            float(latencies.max()) if latencies.shape[0] > 0 else None
+        )
+        return metrics
+
+
+def _to_json(arr):
+    """convert array of predictions to list that can be serialized as JSON,
+    with nan converted to None"""
+    arr = np.asarray(arr)
+    if arr.dtype.kind == "f":
+        return np.where(np.isnan(arr), None, arr.astype(object)).tolist()
+    return arr.tolist()
+
+
+class ModelServer:
+    """models loaded once from .meta files, that handle requests to predict labels
+
+    A request is a dict with the following keys:
+        items : list
+            of dicts, each with either
+                filename : str
+                    path to an audio file
+            or
+                samples : list
+                    of audio samples
+                samples_b64 : str
+                    audio samples, as bytes encoded with base64.
+                    Use instead of samples to send large buffers.
+                dtype : str
+                    dtype of samples_b64. Default is 'int16'.
+                samp_freq : int
+                    sampling frequency
+            and optionally
+                onsets_Hz, offsets_Hz : list
+                    of onsets and offsets of segments, in samples.
+                    If not specified, audio is segmented.
+        model : str
+            name of model to use. Optional if server has only one model.
+        predict_proba : bool
+            if True, return probabilities of labels. Default is False.
+
+    The response is a dict with key 'results', a list with one dict for each item,
+    with keys onsets_Hz, offsets_Hz, pred_labels, and pred_probs
+    if predict_proba is True. If the request raises an error,
+    the response is a dict with key 'error' instead.
+
+    Attributes
+    ----------
+    predictors : dict
+        that maps name of each model to a hvc.predict.Predictor
+    metrics : ServerMetrics
+        counters of requests handled
+    """
+
+    def __init__(self, model_meta_files):
+        """__init__ for ModelServer
+
+        Parameters
+        ----------
+        model_meta_files : list or dict
+            .meta files of models to load. If a list, each model is named
+            with the filename of its .meta file, without the extension.
+            If a dict, maps names of models to .meta files.
+        """
+        if type(model_meta_files) == str:
+            model_meta_files = [model_meta_files]
+        if type(model_meta_files) == list:
+            model_meta_files = {
+                os.path.splitext(os.path.basename(model_meta_file))[0]: model_meta_file
+                for model_meta_file in model_meta_files
+            }
+        self.predictors = {}
+        # requests are handled on separate threads, but only one thread at a time
+        # uses each model, since keras models are not thread-safe
+        self._clf_locks = {}
+        for model, model_meta_file in model_meta_files.items():
+            print("loading model {} from {}".format(model, model_meta_file))
+            self.predictors[model] = Predictor(model_meta_file)
+            self._clf_locks[model] = threading.Lock()
+        self.metrics = ServerMetrics()
+
+    def models(self):
+        """returns dict that maps name of each model to its model_name
+        and feature_list"""
+        return {
+            model: {
+                "model_name": predictor.model_name,
+                "feature_list": predictor.feature_extractor.feature_list,
+            }
+            for model, predictor in self.predictors.items()
+        }
+
+    def _predict_item(self, model, item, predict_proba):
+        predictor = self.predictors[model]
+        if "filename" in item:
+            raw_audio, samp_freq = None, None
+        elif "samples" in item or "samples_b64" in item:
+            if "samp_freq" not in item:
+                raise ValueError("items with samples must also specify samp_freq")
+            samp_freq = int(item["samp_freq"])
+            if "samples_b64" in item:
+                raw_audio = np.frombuffer(
+                    base64.b64decode(item["samples_b64"]),
+                    dtype=item.get("dtype", "int16"),
+                )
+            else:
+                raw_audio = np.asarray(item["samples"])
+        else:
+            raise ValueError("each item must have either filename or samples")
+
+        onsets_Hz = item.get("onsets_Hz", None)
+        offsets_Hz = item.get("offsets_Hz", None)
+        if (onsets_Hz is None) != (offsets_Hz is None):
+            raise ValueError("must specify both onsets_Hz and offsets_Hz, or neither")
+
+        if onsets_Hz is not None:
+            onsets_Hz = np.asarray(onsets_Hz, dtype=int)
+            offsets_Hz = np.asarray(offsets_Hz, dtype=int)
+        with self._clf_locks[model]:
+            file_predictions = predictor.predict_audio(
+                filename=item.get("filename", None),
+                raw_audio=raw_audio,
+                samp_freq=samp_freq,
+                onsets_Hz=onsets_Hz,
+                offsets_Hz=offsets_Hz,
+                predict_proba=predict_proba,
+            )
+        result = {
+            "onsets_Hz": _to_json(file_predictions["onsets_Hz"]),
+            "offsets_Hz": _to_json(file_predictions["offsets_Hz"]),
+            "pred_labels": _to_json(file_predictions["pred_labels"]),
+        }
+        if predict_proba:
+            result["pred_probs"] = _to_json(file_predictions["pred_probs"])
+        if "filename" in item:
+            result["filename"] = item["filename"]
+        return result
+
+    def handle(self, request):
+        """handle a request to predict labels
+
+        Parameters
+        ----------
+        request : dict
+            as described in the docstring for ModelServer
+
+        Returns
+        -------
+        response : dict
+            with key 'results', or key 'error' if request raised an error
+        """
+        tic = time.perf_counter()
+        items = request.get("items", []) if type(request) == dict else []
+        try:
+            if type(request) != dict:
+                raise ValueError("request must be a JSON object")
+            model = request.get("model", None)
+            if model is None:
+                if len(self.predictors) > 1:
+                    raise ValueError(
+                        "server has more than one model, please specify model, "
+                        "one of: {}".format(list(self.predictors.keys()))
+                    )
+                model = list(self.predictors.keys())[0]
+            elif model not in self.predictors:
+                raise ValueError("model {} not found".format(model))
+            if type(items) != list:
+                raise ValueError("items must be a list")
+            predict_proba = request.get("predict_proba", False)
+            response = {
+                "model": model,
+                "results": [
+                    self._predict_item(model, item, predict_proba) for item in items
+                ],
+            }
+            error = False
+        except Exception as err:
+            response = {"error": "{}: {}".format(type(err).__name__, err)}
+            error = True
+        latency = time.perf_counter() - tic
+        num_items = len(items) if type(items) == list else 0
+        self.metrics.record(latency, num_items, error=error)
+        response["latency"] = latency
+        return response
+
+
+class _HTTPRequestHandler(BaseHTTPRequestHandler):
+    """handles POST /predict, GET /metrics, and GET /models
+    for the ModelServer in self.server.model_server"""
+
+    def _send_json(self, status, response_dict):
+        body = json.dumps(response_dict).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.server.model_server.metrics.to_dict())
+        elif self.path == "/models":
+            self._send_json(200, self.server.model_server.models())
+        else:
+            self._send_json(404, {"error": "not found: {}".format(self.path)})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found: {}".format(self.path)})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as err:
+            self._send_json(400, {"error": "invalid JSON: {}".format(err)})
+            return
+        response = self.server.model_server.handle(request)
+        self._send_json(400 if "error" in response else 200, response)
+
+    def log_message(self, format, *args):
+        # don't print a line for every request
+        pass
+
+
+class _UnixRequestHandler(socketserver.StreamRequestHandler):
+    """handles requests sent to a Unix domain socket as one JSON object per line,
+    and writes one JSON response per line. A request of {"command": "metrics"}
+    or {"command": "models"} returns metrics or models instead of predictions."""
+
+    def handle(self):
+        model_server = self.server.model_server
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as err:
+                response = {"error": "invalid JSON: {}".format(err)}
+            else:
+                command = (
+                    request.get("command", None) if type(request) == dict else None
+                )
+                if command == "metrics":
+                    response = model_server.metrics.to_dict()
+                elif command == "models":
+                    response = model_server.models()
+                else:
+                    response = model_server.handle(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _ThreadingUnixStreamServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+def make_server(model_server, host="127.0.0.1", port=8000, socket_path=None):
+    """make server that passes requests to model_server
+
+    Parameters
+    ----------
+    model_server : ModelServer
+    host : str
+        host for HTTP server. Default is '127.0.0.1', i.e. only accept
+        requests from the same machine.
+    port : int
+        port for HTTP server. Default is 8000. If 0, a free port is used.
+    socket_path : str
+        path to Unix domain socket. If specified, server listens on this socket
+        instead of HTTP. A socket that already exists at this path, e.g. from
+        a server that was stopped, is replaced. Default is None.
+
+    Returns
+    -------
+    server : socketserver.BaseServer
+        call its serve_forever method to handle requests
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            # only remove a socket left behind by a server that was stopped,
+            # never some other file at a mistyped path
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise FileExistsError(
+                    "{} already exists and is not a socket".format(socket_path)
+                )
+            os.remove(socket_path)
+        server = _ThreadingUnixStreamServer(socket_path, _UnixRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), _HTTPRequestHandler)
+        server.daemon_threads = True
+    server.model_server = model_server
+    return server
+
+
+def serve(model_meta_files, host="127.0.0.1", port=8000, socket_path=None):
+    """load models and serve predictions until interrupted
+
+    Parameters
+    ----------
+    model_meta_files : list or dict
+        .meta files of models to load, as for ModelServer
+    host : str
+        host for HTTP server. Default is '127.0.0.1'.
+    port : int
+        port for HTTP server. Default is 8000.
+    socket_path : str
+        path to Unix domain socket. If specified, server listens on this socket
+        instead of HTTP. Default is None.
+    """
+    model_server = ModelServer(model_meta_files)
+    server = make_server(model_server, host, port, socket_path)
+    if socket_path is not None:
+        print(
+            "serving models {} on {}".format(list(model_server.predictors), socket_path)
+        )
+    else:
+        print(
+            "serving models {} on http://{}:{}".format(
+                list(model_server.predictors), *server.server_address[:2]
+            )
+        )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
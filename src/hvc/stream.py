@@ -0,0 +1,445 @@
+"""
+segment and classify audio as it is recorded, one block of samples at a time,
+e.g. for closed-loop experiments that need labels shortly after each syllable ends
+"""
+import numpy as np
+import scipy.signal
+
+from .parse.ref_spect_params import refs_dict
+
+
+class RingBuffer:
+    """fixed-size buffer that keeps the most recent samples of an audio stream
+
+    Samples are indexed by their position in the stream, i.e. the first sample
+    ever written has index 0, no matter how many times the buffer has wrapped around.
+
+    Attributes
+    ----------
+    capacity : int
+        number of samples kept
+    num_written : int
+        total number of samples written to the buffer
+    """
+
+    def __init__(self, capacity, dtype=None):
+        """__init__ for RingBuffer
+
+        Parameters
+        ----------
+        capacity : int
+            number of samples kept
+        dtype : numpy.dtype
+            dtype of samples. Default is None, in which case the dtype of the
+            first block written is used, so that samples are read back unchanged
+            (features computed from int16 audio differ from float audio).
+        """
+        if type(capacity) != int or capacity < 1:
+            raise ValueError(
+                "capacity for RingBuffer must be a positive int, not {}".format(
+                    capacity
+                )
+            )
+        self.capacity = capacity
+        self._buffer = None if dtype is None else np.zeros((capacity,), dtype=dtype)
+        self.num_written = 0
+
+    @property
+    def first(self):
+        """position in the stream of the oldest sample in the buffer"""
+        return max(self.num_written - self.capacity, 0)
+
+    def write(self, block):
+        """write block of samples to buffer, overwriting the oldest samples"""
+        block = np.asarray(block)
+        if self._buffer is None:
+            self._buffer = np.zeros((self.capacity,), dtype=block.dtype)
+        # only the last capacity samples of a long block are kept
+        keep = block[-self.capacity :]
+        start = (self.num_written + block.shape[0] - keep.shape[0]) % self.capacity
+        stop = start + keep.shape[0]
+        if stop <= self.capacity:
+            self._buffer[start:stop] = keep
+        else:
+            split = self.capacity - start
+            self._buffer[start:] = keep[:split]
+            self._buffer[: stop - self.capacity] = keep[split:]
+        self.num_written += block.shape[0]
+
+    def read(self, start, stop):
+        """read samples from start up to but not including stop
+
+        Parameters
+        ----------
+        start, stop : int
+            positions of samples in the stream
+
+        Returns
+        -------
+        samples : numpy.ndarray
+            copy of samples
+        """
+        if start < self.first or stop > self.num_written:
+            raise ValueError(
+                "samples {} to {} are not in buffer, which has samples {} to {}".format(
+                    start,
+                    stop,
+                    self.first,
+                    self.num_written,
+                )
+            )
+        inds = np.arange(start, stop) % self.capacity
+        return self._buffer[inds]
+
+
+class StreamingSegmenter:
+    """segments audio into syllables one block at a time,
+    using the same method as hvc.audiofileIO.Segmenter with method 'evsonganaly'.
+
+    Audio is bandpass filtered, squared, and smoothed, and segments are where the
+    smoothed amplitude is above threshold. Instead of filtering forward and
+    backward with filtfilt, which needs the whole file, the same FIR filter
+    is applied twice causally, and filter and smoothing state are kept between
+    blocks. This gives the same amplitude as Segmenter, delayed by a fixed
+    number of samples (the delay attribute), which is subtracted from the
+    onsets and offsets that are returned. So onsets and offsets match those
+    found by Segmenter, except for segments within numtaps samples of the
+    start of the stream, where filtfilt pads the signal.
+
+    An onset event is returned as soon as amplitude crosses threshold.
+    An offset event is returned once amplitude has stayed below threshold for
+    longer than min_silent_dur, so that the segment can't be merged with the next
+    one, and only if the segment is longer than min_syl_dur.
+    So offset events lag the actual offset by delay samples plus min_silent_dur.
+
+    Attributes
+    ----------
+    samp_freq : int
+        sampling frequency
+    threshold : int
+        value above which amplitude is considered part of a segment
+    min_syl_dur : float
+        minimum duration of a segment, in seconds
+    min_silent_dur : float
+        minimum duration of silent gap between segments, in seconds
+    delay : int
+        number of samples by which amplitude lags audio
+    num_processed : int
+        number of samples processed so far
+    """
+
+    def __init__(
+        self,
+        samp_freq,
+        threshold=5000,
+        min_syl_dur=0.02,
+        min_silent_dur=0.002,
+        freq_cutoffs=None,
+        numtaps=512,
+        smooth_win=2,
+    ):
+        """__init__ for StreamingSegmenter
+
+        Parameters
+        ----------
+        samp_freq : int
+            sampling frequency
+        threshold : int
+            value above which amplitude is considered part of a segment.
+            Default is 5000.
+        min_syl_dur : float
+            minimum duration of a segment. Default is 0.02, i.e. 20 ms.
+        min_silent_dur : float
+            minimum duration of silent gap between segment. Default is 0.002, i.e. 2 ms.
+        freq_cutoffs : list
+            of two ints, cutoffs for bandpass filter. Default is None, in which case
+            the cutoffs used by Segmenter are used.
+        numtaps : int
+            order of FIR bandpass filter. Default is 512, as used by Segmenter for
+            files longer than 1539 samples. Smaller values reduce the delay,
+            but then onsets and offsets will differ from those found by Segmenter.
+        smooth_win : int
+            size of smoothing window in milliseconds. Default is 2.
+        """
+        if freq_cutoffs is None:
+            freq_cutoffs = refs_dict["evsonganaly"]["freq_cutoffs"]
+        self.samp_freq = samp_freq
+        self.threshold = threshold
+        self.min_syl_dur = min_syl_dur
+        self.min_silent_dur = min_silent_dur
+
+        nyquist_rate = samp_freq / 2
+        cutoffs = np.asarray(
+            [freq_cutoffs[0] / nyquist_rate, freq_cutoffs[1] / nyquist_rate]
+        )
+        # same filter as evfuncs.bandpass_filtfilt
+        self._b = scipy.signal.firwin(numtaps + 1, cutoffs, pass_zero=False)
+        self._filter_zi = [np.zeros((numtaps,)), np.zeros((numtaps,))]
+        smooth_len = int(np.round(samp_freq * smooth_win / 1000))
+        self._h = np.ones((smooth_len,)) / smooth_len
+        self._smooth_zi = np.zeros((smooth_len - 1,))
+        # each pass of the linear-phase filter delays by numtaps / 2 samples;
+        # evfuncs.smooth_data centers the smoothing window, causal smoothing does not
+        self.delay = numtaps + int(round((smooth_len - 1) / 2))
+
+        self.num_processed = 0
+        self._above = False
+        self._onset = None
+        self._offset = None
+
+    def _amplitude(self, block):
+        filtered = np.asarray(block, dtype=np.float64)
+        for ind in range(2):
+            filtered, self._filter_zi[ind] = scipy.signal.lfilter(
+                self._b, [1.0], filtered, zi=self._filter_zi[ind]
+            )
+        smooth, self._smooth_zi = scipy.signal.lfilter(
+            self._h, [1.0], np.power(filtered, 2), zi=self._smooth_zi
+        )
+        return smooth
+
+    def _finalize(self, sample):
+        """end current segment; returns offset event, or None if segment is too short"""
+        onset, offset = self._onset, self._offset
+        self._onset, self._offset = None, None
+        if (offset - onset) / self.samp_freq > self.min_syl_dur:
+            return {
+                "event": "offset",
+                "onset_Hz": onset,
+                "offset_Hz": offset,
+                "sample": sample,
+            }
+
+    def _finalize_at(self):
+        """first sample at which an onset would start a new segment,
+        instead of merging with the current one"""
+        return (
+            self._offset
+            + self.delay
+            + int(np.floor(self.min_silent_dur * self.samp_freq))
+            + 1
+        )
+
+    def process(self, block):
+        """segment a block of audio
+
+        Parameters
+        ----------
+        block : numpy.ndarray
+            1-d array of audio samples that follow the samples already processed
+
+        Returns
+        -------
+        events : list
+            of dicts, in the order they occurred. Each has keys
+                event : str
+                    'onset' or 'offset'
+                onset_Hz : int
+                    onset of segment, in samples since the start of the stream
+                offset_Hz : int
+                    offset of segment. Only for 'offset' events.
+                sample : int
+                    sample at which the event was detected
+        """
+        amp = self._amplitude(block)
+        above_th = amp > self.threshold
+        crossings = np.diff(
+            np.concatenate((np.asarray([self._above]), above_th)).astype(np.int8)
+        )
+        events = []
+        for ind in np.nonzero(crossings)[0]:
+            sample = self.num_processed + ind
+            if self._offset is not None and sample >= self._finalize_at():
+                event = self._finalize(self._finalize_at())
+                if event is not None:
+                    events.append(event)
+            if crossings[ind] > 0:
+                if self._offset is not None:
+                    # silent gap too short, so merge with current segment
+                    self._offset = None
+                else:
+                    self._onset = sample - self.delay
+                    events.append(
+                        {"event": "onset", "onset_Hz": self._onset, "sample": sample}
+                    )
+            else:
+                self._offset = sample - self.delay
+        if above_th.shape[0] > 0:
+            self._above = bool(above_th[-1])
+        self.num_processed += above_th.shape[0]
+        if self._offset is not None and self.num_processed >= self._finalize_at():
+            event = self._finalize(self._finalize_at())
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self):
+        """end the segment in progress, e.g. when the stream ends.
+
+        Returns
+        -------
+        events : list
+            with offset event for segment in progress, if any
+        """
+        if self._onset is None:
+            return []
+        if self._offset is None:
+            # still above threshold at end of stream, as in Segmenter
+            self._offset = self.num_processed - self.delay
+        event = self._finalize(self.num_processed)
+        return [event] if event is not None else []
+
+
+class StreamingClassifier:
+    """segments audio one block at a time with a StreamingSegmenter,
+    and predicts the label of each segment shortly after it ends,
+    with a model that is loaded once
+
+    Some features, e.g. the duration of the preceding syllable for the knn model,
+    depend on the segments around a syllable. Each segment is classified together
+    with the segment before it, so those features are the same as when
+    predicting from a whole file. Features that depend on the following segment
+    can only be computed once it ends; set lookahead to 1 to wait for it, at the
+    cost of higher latency. With lookahead of 0, those features are computed as
+    if each segment were the last one in a file. If the segment before is no
+    longer in the ring buffer, or it ended more than max_gap before the segment
+    starts, e.g. between bouts of song, the segment is classified as if it were
+    the first one in a file.
+
+    Attributes
+    ----------
+    predictor : hvc.predict.Predictor
+        model used to predict labels
+    segmenter : StreamingSegmenter
+    ring_buffer : RingBuffer
+        holds the most recent audio, from which segments are taken
+    lookahead : int
+        number of following segments that must end before a segment is classified
+    """
+
+    def __init__(
+        self,
+        predictor,
+        samp_freq,
+        buffer_dur=10.0,
+        lookahead=0,
+        predict_proba=False,
+        max_gap=None,
+        **kwargs
+    ):
+        """__init__ for StreamingClassifier
+
+        Parameters
+        ----------
+        predictor : hvc.predict.Predictor
+            model used to predict labels
+        samp_freq : int
+            sampling frequency of audio stream
+        buffer_dur : float
+            duration of audio kept in ring buffer, in seconds. Must be longer than
+            lookahead + 2 segments and the gaps between them. Default is 10.0.
+        lookahead : int
+            number of following segments that must end before a segment is
+            classified. Default is 0, i.e. classify each segment as soon as it ends.
+        predict_proba : bool
+            if True, also predict probabilities of labels. Default is False.
+        max_gap : float
+            longest silence in seconds between a segment and the one before it,
+            for which the segment is classified together with the one before.
+            Default is None, in which case the segment before is used as long
+            as it is still in the ring buffer.
+        kwargs
+            passed to StreamingSegmenter. Default is the segment_params
+            of the model's FeatureExtractor.
+        """
+        self.predictor = predictor
+        self.samp_freq = samp_freq
+        self.lookahead = lookahead
+        self.predict_proba = predict_proba
+        self.max_gap = max_gap
+        segment_params = predictor.feature_extractor.segment_params
+        if segment_params is not None:
+            segment_params = dict(segment_params)
+            segment_params.update(kwargs)
+            kwargs = segment_params
+        self.segmenter = StreamingSegmenter(samp_freq, **kwargs)
+        self.ring_buffer = RingBuffer(int(buffer_dur * samp_freq))
+        self._previous = None
+        self._pending = []
+
+    def _classify(self, event, following):
+        if self._previous is not None:
+            # forget segment before, once it is not in the buffer anymore,
+            # or if it was in another bout
+            if max(self._previous["onset_Hz"], 0) < self.ring_buffer.first:
+                self._previous = None
+            elif self.max_gap is not None and (
+                event["onset_Hz"] - self._previous["offset_Hz"]
+                > self.max_gap * self.samp_freq
+            ):
+                self._previous = None
+        segments = [event] + following
+        if self._previous is not None:
+            segments = [self._previous] + segments
+        # onsets can be before the start of the stream, because of filter delay
+        start = max(segments[0]["onset_Hz"], 0)
+        audio = self.ring_buffer.read(start, segments[-1]["offset_Hz"])
+        file_predictions = self.predictor.predict_audio(
+            raw_audio=audio,
+            samp_freq=self.samp_freq,
+            onsets_Hz=np.asarray(
+                [max(segment["onset_Hz"], 0) - start for segment in segments]
+            ),
+            offsets_Hz=np.asarray(
+                [segment["offset_Hz"] - start for segment in segments]
+            ),
+            predict_proba=self.predict_proba,
+        )
+        ind = 0 if self._previous is None else 1
+        event["label"] = file_predictions["pred_labels"][ind]
+        if self.predict_proba:
+            event["pred_probs"] = file_predictions["pred_probs"][ind]
+        self._previous = event
+        return event
+
+    def _classify_pending(self, num_following):
+        """classify pending segments that have num_following segments after them"""
+        classified = []
+        while len(self._pending) > num_following:
+            event = self._pending.pop(0)
+            classified.append(self._classify(event, self._pending[:num_following]))
+        return classified
+
+    def process(self, block):
+        """segment a block of audio, and predict labels of segments that ended
+
+        Parameters
+        ----------
+        block : numpy.ndarray
+            1-d array of audio samples that follow the samples already processed
+
+        Returns
+        -------
+        events : list
+            as returned by StreamingSegmenter.process, except that each 'offset'
+            event is returned once lookahead more segments have ended, with key
+            'label', and 'pred_probs' if predict_proba is True
+        """
+        self.ring_buffer.write(block)
+        events = []
+        for event in self.segmenter.process(block):
+            if event["event"] == "offset":
+                self._pending.append(event)
+                events.extend(self._classify_pending(self.lookahead))
+            else:
+                events.append(event)
+        return events
+
+    def flush(self):
+        """end the segment in progress, and predict labels of all segments
+        that have not been classified yet"""
+        self._pending.extend(self.segmenter.flush())
+        classified = []
+        while len(self._pending) > 0:
+            classified.extend(self._classify_pending(len(self._pending) - 1))
+        return classified
@@ -1,5 +1,8 @@
 from .general import *
+from .knn_graph import KNeighborsGraph
+from .kernel_cache import RBFKernelCache
+from .cross_val import SongFolds, song_stratified_folds
 from .datasets import fetch
-from .features import load_feature_file
+from .features import load_feature_file, save_feature_file
 from .annotation import notmat_to_annot_dict, annot_list_to_csv, notmat_list_to_csv
 from .annotation import make_notmat, xml_to_annot_list, xml_to_csv, csv_to_annot_list
@@ -315,7 +315,8 @@ def make_notmat(
 
     Returns
     -------
-    None
+    notmat_name : str
+        path to .not.mat file that was saved
     """
     # chr() to convert back to character from uint32
     if labels.dtype == "int32":
@@ -361,12 +362,14 @@ def make_notmat(
                 )
             else:
                 scipy.io.savemat(alternate_notmat_name, notmat_dict)
+                return alternate_notmat_name
         else:
             raise FileExistsError(
                 "{} already exists but no alternate path provided".format(notmat_name)
             )
     else:
         scipy.io.savemat(notmat_name, notmat_dict)
+        return notmat_name
 
 
 def xml_to_annot_list(annotation_file, concat_seqs_into_songs=True, wavpath="./Wave"):
@@ -0,0 +1,392 @@
+"""
+folds for cross-validation that keep all samples from a song in the same fold,
+built once and shared by every candidate model that is scored with them
+"""
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from .kernel_cache import RBFKernelCache
+from .knn_graph import KNeighborsGraph
+
+
+def song_stratified_folds(labels, song_IDs, n_splits=5, seed=None):
+    """split samples into folds so that all samples from a song are in the same
+    fold, and each fold has about the same proportion of each label.
+
+    Songs are assigned to folds one at a time, like
+    sklearn.model_selection.StratifiedGroupKFold does: songs whose labels are
+    least evenly distributed are assigned first, each to the fold where it makes
+    the proportions of labels across folds most even, or if there is a tie,
+    to the fold with the fewest samples.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        label for each sample
+    song_IDs : numpy.ndarray
+        ID of song that each sample came from
+    n_splits : int
+        number of folds. Default is 5.
+    seed : int
+        used to shuffle songs before they are assigned to folds, so that
+        songs with the same distribution of labels are assigned in random order.
+        Default is None, in which case songs are not shuffled.
+
+    Returns
+    -------
+    folds : list
+        of tuples (train_inds, test_inds), indices of samples
+        in training and test sets for each fold
+    """
+    labels = np.asarray(labels)
+    song_IDs = np.asarray(song_IDs)
+    song_ID_list, song_inds = np.unique(song_IDs, return_inverse=True)
+    if song_ID_list.shape[0] < n_splits:
+        raise ValueError(
+            "can't split {} songs into {} folds".format(song_ID_list.shape[0], n_splits)
+        )
+    label_codes = np.unique(labels, return_inverse=True)[1]
+    num_labels = label_codes.max() + 1
+    # number of samples with each label in each song
+    song_counts = np.zeros((song_ID_list.shape[0], num_labels))
+    np.add.at(song_counts, (song_inds, label_codes), 1)
+    label_totals = song_counts.sum(axis=0)
+
+    song_order = np.arange(song_ID_list.shape[0])
+    if seed is not None:
+        song_order = np.random.default_rng(seed).permutation(song_order)
+    song_order = song_order[
+        np.argsort(-np.std(song_counts[song_order], axis=1), kind="stable")
+    ]
+
+    fold_counts = np.zeros((n_splits, num_labels))
+    song_folds = np.empty((song_ID_list.shape[0],), dtype=int)
+    for song_ind in song_order:
+        # std. across folds of proportion of each label, if song is added to
+        # each fold, averaged across labels
+        trial_counts = fold_counts[np.newaxis, :, :] + np.where(
+            np.eye(n_splits, dtype=bool)[:, :, np.newaxis],
+            song_counts[song_ind],
+            0,
+        )
+        evenness = np.mean(np.std(trial_counts / label_totals, axis=1), axis=1)
+        best = np.flatnonzero(np.isclose(evenness, evenness.min()))
+        fold_ind = best[np.argmin(fold_counts[best].sum(axis=1))]
+        fold_counts[fold_ind] += song_counts[song_ind]
+        song_folds[song_ind] = fold_ind
+
+    sample_folds = song_folds[song_inds]
+    return [
+        (
+            np.flatnonzero(sample_folds != fold_ind),
+            np.flatnonzero(sample_folds == fold_ind),
+        )
+        for fold_ind in range(n_splits)
+    ]
+
+
+def _score_estimators(X_train, y_train, X_test, y_test, estimators):
+    """accuracy of each estimator on one fold"""
+    scores = np.empty((len(estimators),))
+    for ind, estimator in enumerate(estimators):
+        clf = clone(estimator).fit(X_train, y_train)
+        scores[ind] = np.mean(clf.predict(X_test) == y_test)
+    return scores
+
+
+def _score_svm_rbf(X_train, y_train, X_test, y_test, C_values, gamma):
+    """accuracy on one fold of SVMs with one value of gamma and each value of C,
+    computing RBF kernels once"""
+    kernel_cache = RBFKernelCache(X_train, X_test)
+    scores = np.empty((len(C_values),))
+    for ind, C in enumerate(C_values):
+        clf = SVC(C=C, gamma=gamma)
+        if kernel_cache.fits():
+            clf, pred_labels = kernel_cache.fit_predict(clf, y_train)
+        else:
+            clf.fit(X_train, y_train)
+            pred_labels = clf.predict(X_test)
+        scores[ind] = np.mean(pred_labels == y_test)
+    return scores
+
+
+def _score_knn(X_train, y_train, X_test, y_test, k_range):
+    """accuracy on one fold of k-Nearest Neighbors for each k in k_range"""
+    knn_graph = KNeighborsGraph(X_train, y_train, X_test, max(k_range))
+    return knn_graph.score(y_test, k_range)
+
+
+class SongFolds:
+    """folds for cross-validation, built once, that keep all samples from a
+    song in the same fold, with features for each fold scaled once and cached,
+    so that many candidate models can be scored with the same folds.
+
+    Features are scaled with a StandardScaler fit to the training set of each
+    fold, so the test set of a fold does not affect how it is scaled.
+
+    Attributes
+    ----------
+    features : numpy.ndarray
+        m-by-n array of m samples, each with n features
+    labels : numpy.ndarray
+        label for each sample
+    song_IDs : numpy.ndarray
+        ID of song that each sample came from, or None
+    n_splits : int
+        number of folds
+    standardize : bool
+        if True, features are scaled for each fold
+    folds : list
+        of tuples (train_inds, test_inds), indices of samples
+        in training and test sets for each fold
+    """
+
+    def __init__(
+        self, features, labels, song_IDs=None, n_splits=5, standardize=True, seed=None
+    ):
+        """__init__ for SongFolds
+
+        Parameters
+        ----------
+        features : numpy.ndarray
+            m-by-n array of m samples, each with n features
+        labels : numpy.ndarray
+            label for each sample
+        song_IDs : numpy.ndarray
+            ID of song that each sample came from, e.g. songfile_IDs from a
+            feature file. Default is None, in which case every sample is
+            treated as if it came from its own song, and folds are the same as
+            sklearn.model_selection.StratifiedKFold makes.
+        n_splits : int
+            number of folds. Default is 5.
+        standardize : bool
+            if True, scale features for each fold by subtracting mean and
+            dividing by standard deviation of training set. Default is True.
+        seed : int
+            used to shuffle songs (or samples, if song_IDs is None) before
+            they are split into folds. Default is None.
+        """
+        self.features = np.asarray(features)
+        self.labels = np.asarray(labels)
+        if self.features.ndim != 2:
+            raise ValueError("features should be a 2-d array")
+        if self.labels.shape[0] != self.features.shape[0]:
+            raise ValueError(
+                "labels has {} labels but there are {} samples".format(
+                    self.labels.shape[0], self.features.shape[0]
+                )
+            )
+        self.n_splits = n_splits
+        self.standardize = standardize
+        if song_IDs is None:
+            self.song_IDs = None
+            if seed is None:
+                kfold = StratifiedKFold(n_splits=n_splits)
+            else:
+                kfold = StratifiedKFold(
+                    n_splits=n_splits, shuffle=True, random_state=seed
+                )
+            self.folds = list(kfold.split(self.features, self.labels))
+        else:
+            self.song_IDs = np.asarray(song_IDs)
+            if self.song_IDs.shape[0] != self.features.shape[0]:
+                raise ValueError(
+                    "song_IDs has {} IDs but there are {} samples".format(
+                        self.song_IDs.shape[0], self.features.shape[0]
+                    )
+                )
+            self.folds = song_stratified_folds(
+                self.labels, self.song_IDs, n_splits=n_splits, seed=seed
+            )
+        self._fold_features = {}
+
+    def fold(self, fold_ind, sample_IDs=None):
+        """training and test sets for one fold
+
+        Parameters
+        ----------
+        fold_ind : int
+            index of fold
+        sample_IDs : numpy.ndarray
+            indices of samples. If specified, only these samples are returned,
+            e.g. subsets drawn with the subsample method. They are scaled the
+            same way as when all samples are used. Default is None.
+
+        Returns
+        -------
+        X_train : numpy.ndarray
+            features of training set, scaled if standardize is True
+        y_train : numpy.ndarray
+            labels of training set
+        X_test : numpy.ndarray
+            features of test set, scaled if standardize is True
+        y_test : numpy.ndarray
+            labels of test set
+        """
+        train_inds, test_inds = self.folds[fold_ind]
+        if fold_ind not in self._fold_features:
+            X_train = self.features[train_inds]
+            X_test = self.features[test_inds]
+            if self.standardize:
+                scaler = StandardScaler().fit(X_train)
+                X_train = scaler.transform(X_train)
+                X_test = scaler.transform(X_test)
+            self._fold_features[fold_ind] = (X_train, X_test)
+        X_train, X_test = self._fold_features[fold_ind]
+        y_train, y_test = self.labels[train_inds], self.labels[test_inds]
+        if sample_IDs is not None:
+            train_mask = np.isin(train_inds, sample_IDs)
+            test_mask = np.isin(test_inds, sample_IDs)
+            X_train, y_train = X_train[train_mask], y_train[train_mask]
+            X_test, y_test = X_test[test_mask], y_test[test_mask]
+        return X_train, y_train, X_test, y_test
+
+    def subsample(self, num_samples, seed=None):
+        """draw a subset of samples by song, with about the same number of
+        samples from the test set of each fold, so that every fold can still
+        be scored with the subset.
+
+        Songs from the test set of each fold are shuffled, and samples are taken
+        from them until there are num_samples / n_splits, like
+        SongSampler.sample does.
+
+        Parameters
+        ----------
+        num_samples : int
+            number of samples to draw
+        seed : int, numpy.random.SeedSequence, or numpy.random.Generator
+            passed to numpy.random.default_rng. Default is None.
+
+        Returns
+        -------
+        sample_IDs : numpy.ndarray
+            indices of samples, sorted
+        """
+        rng = np.random.default_rng(seed)
+        samples_per_fold = int(np.ceil(num_samples / self.n_splits))
+        sample_IDs = []
+        for _, test_inds in self.folds:
+            if self.song_IDs is None:
+                sample_IDs.append(rng.permutation(test_inds)[:samples_per_fold])
+                continue
+            fold_song_IDs = self.song_IDs[test_inds]
+            song_ID_list = rng.permutation(np.unique(fold_song_IDs))
+            # take samples from shuffled songs, in order, then truncate
+            fold_sample_IDs = np.concatenate(
+                [test_inds[fold_song_IDs == song_ID] for song_ID in song_ID_list]
+            )
+            sample_IDs.append(fold_sample_IDs[:samples_per_fold])
+        return np.sort(np.concatenate(sample_IDs))
+
+    def _map_folds(self, func, args, sample_IDs=None, n_jobs=1):
+        """run func on each fold with each tuple of args in parallel, and return
+        results as a nested list, results[args_ind][fold_ind]"""
+        fold_sets = [
+            self.fold(fold_ind, sample_IDs) for fold_ind in range(self.n_splits)
+        ]
+        results = joblib.Parallel(n_jobs=n_jobs)(
+            joblib.delayed(func)(*fold_sets[fold_ind], *task_args)
+            for task_args in args
+            for fold_ind in range(self.n_splits)
+        )
+        return [
+            results[args_ind * self.n_splits : (args_ind + 1) * self.n_splits]
+            for args_ind in range(len(args))
+        ]
+
+    def score(self, estimators, sample_IDs=None, n_jobs=1):
+        """accuracy of each estimator on each fold
+
+        Parameters
+        ----------
+        estimators : list
+            of sklearn classifiers, not fit. Each is cloned and fit
+            to the training set of every fold.
+        sample_IDs : numpy.ndarray
+            indices of samples to use, e.g. drawn with the subsample method.
+            Default is None, in which case all samples are used.
+        n_jobs : int
+            number of folds and estimators scored in parallel. Default is 1.
+
+        Returns
+        -------
+        scores : numpy.ndarray
+            of shape (len(estimators), n_splits)
+        """
+        results = self._map_folds(
+            _score_estimators,
+            [([estimator],) for estimator in estimators],
+            sample_IDs,
+            n_jobs,
+        )
+        return np.asarray([np.concatenate(fold_scores) for fold_scores in results])
+
+    def score_svm_rbf(self, candidates, sample_IDs=None, n_jobs=1):
+        """accuracy on each fold of SVMs with RBF kernels, computing kernels
+        once per fold for each value of gamma, and using them to fit
+        every candidate with that gamma
+
+        Parameters
+        ----------
+        candidates : list
+            of dicts with keys 'C' and 'gamma'
+        sample_IDs : numpy.ndarray
+            indices of samples to use, e.g. drawn with the subsample method.
+            Default is None, in which case all samples are used.
+        n_jobs : int
+            number of folds and values of gamma scored in parallel. Default is 1.
+
+        Returns
+        -------
+        scores : numpy.ndarray
+            of shape (len(candidates), n_splits)
+        """
+        gammas = sorted(set(candidate["gamma"] for candidate in candidates))
+        candidate_inds = [
+            [
+                ind
+                for ind, candidate in enumerate(candidates)
+                if candidate["gamma"] == gamma
+            ]
+            for gamma in gammas
+        ]
+        results = self._map_folds(
+            _score_svm_rbf,
+            [
+                ([candidates[ind]["C"] for ind in inds], gamma)
+                for gamma, inds in zip(gammas, candidate_inds)
+            ],
+            sample_IDs,
+            n_jobs,
+        )
+        scores = np.empty((len(candidates), self.n_splits))
+        for inds, fold_scores in zip(candidate_inds, results):
+            scores[inds] = np.stack(fold_scores, axis=1)
+        return scores
+
+    def score_knn(self, k_range, sample_IDs=None, n_jobs=1):
+        """accuracy on each fold of k-Nearest Neighbors classifiers for each k
+        in k_range, found with one neighbor search per fold
+        (see hvc.utils.knn_graph.KNeighborsGraph)
+
+        Parameters
+        ----------
+        k_range : range
+            of ints, values of k
+        sample_IDs : numpy.ndarray
+            indices of samples to use, e.g. drawn with the subsample method.
+            Default is None, in which case all samples are used.
+        n_jobs : int
+            number of folds scored in parallel. Default is 1.
+
+        Returns
+        -------
+        scores : numpy.ndarray
+            of shape (len(k_range), n_splits)
+        """
+        results = self._map_folds(_score_knn, [(k_range,)], sample_IDs, n_jobs)
+        return np.stack(results[0], axis=1)
@@ -1,21 +1,257 @@
 """utility functions for features"""
+import json
+import os
 
 import joblib
+import numpy as np
 
+from ..__about__ import __version__
 
-def load_feature_file(filename):
+METADATA_FILENAME = "metadata.json"
+FEATURE_FILE_FORMAT_VERSION = 2
+
+
+def _atomic_write(path, write_func):
+    """call write_func with a temporary path, then rename to path.
+    Arrays that are memory-mapped from the old file stay valid."""
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    write_func(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_npy(path, arr):
+    def _write(tmp_path):
+        with open(tmp_path, "wb") as fp:
+            np.save(fp, arr)
+
+    _atomic_write(path, _write)
+
+
+def _is_saved_at(arr, path):
+    """True if arr is memory-mapped from path, i.e. does not need to be saved again"""
+    return (
+        isinstance(arr, np.memmap)
+        and arr.filename is not None
+        and os.path.abspath(arr.filename) == os.path.abspath(path)
+    )
+
+
+def _numpy_scalar_to_python(obj):
+    """default for json.dumps, converts numpy scalars.
+    Anything else (e.g. arrays) raises TypeError so that it is pickled instead"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(type(obj).__name__)
+    )
+
+
+def _array_from_list(val):
+    """returns array made from list val, or None if list should not be
+    saved as an array, e.g. because it is empty or its items are objects"""
+    if type(val) != list or len(val) == 0:
+        return None
+    arr = np.asarray(val)
+    if arr.ndim != 1 or arr.dtype.kind not in "biufU":
+        return None
+    return arr
+
+
+def _dict_list_to_json(val):
+    """returns list of dicts val (e.g. annotation_list) as a list that can be
+    saved as JSON, where arrays in each dict are saved with their dtype
+    so they can be converted back. Returns None if val is not a list of dicts
+    whose values are all either 1-d arrays or JSON-serializable."""
+    if type(val) != list or len(val) == 0:
+        return None
+    dict_list = []
+    for item in val:
+        if type(item) != dict:
+            return None
+        item_json = {"values": {}, "arrays": {}}
+        for key, item_val in item.items():
+            if isinstance(item_val, np.ndarray):
+                if item_val.ndim != 1 or item_val.dtype.kind not in "biufU":
+                    return None
+                item_json["arrays"][key] = {
+                    "dtype": item_val.dtype.str,
+                    "data": item_val.tolist(),
+                }
+            else:
+                item_json["values"][key] = item_val
+        dict_list.append(item_json)
+    try:
+        return json.loads(json.dumps(dict_list, default=_numpy_scalar_to_python))
+    except (TypeError, ValueError):
+        return None
+
+
+def _dict_list_from_json(dict_list):
+    """inverse of _dict_list_to_json"""
+    return [
+        {
+            **item_json["values"],
+            **{
+                key: np.asarray(array["data"], dtype=array["dtype"])
+                for key, array in item_json["arrays"].items()
+            },
+        }
+        for item_json in dict_list
+    ]
+
+
+def save_feature_file(feature_file_dict, filename):
+    """saves a feature file as a directory, with one .npy file for each
+    array (e.g. features, onsets_Hz, labels, and each neuralnet input)
+    and metadata in a metadata.json file, so that arrays can be loaded
+    memory-mapped.
+
+    Lists of numbers or strings (e.g. labels) are saved as arrays.
+    The FeatureExtractor is saved as an extractor manifest (see
+    FeatureExtractor.save_manifest), and lists of dicts such as annotation_list
+    are saved as JSON files. Any other values that are neither arrays nor
+    JSON-serializable are pickled into separate .joblib files.
+
+    Parameters
+    ----------
+    feature_file_dict : dict
+        containing features, labels, and metadata related to feature extraction,
+        as created by hvc.features.extract.FeatureExtractor.extract.
+        Arrays that are memory-mapped from the same directory, i.e. because
+        the feature file was loaded with load_feature_file, are not written again.
+    filename : str
+        name of feature file directory. Created if it does not exist.
+    """
+    dirname = os.path.abspath(filename)
+    if os.path.isfile(dirname):
+        raise FileExistsError(
+            "{} is a file, can not save feature file directory".format(dirname)
+        )
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    metadata = {
+        "format_version": FEATURE_FILE_FORMAT_VERSION,
+        "hvc_version": __version__,
+        "values": {},
+        "arrays": [],
+        "lists": [],
+        "array_dicts": {},
+        "manifests": [],
+        "dict_lists": [],
+        "pickled": [],
+    }
+    for key, val in feature_file_dict.items():
+        if hasattr(val, "save_manifest"):
+            _atomic_write(os.path.join(dirname, key + ".json"), val.save_manifest)
+            metadata["manifests"].append(key)
+        elif _dict_list_to_json(val) is not None:
+            dict_list = _dict_list_to_json(val)
+
+            def _write_dict_list(tmp_path):
+                with open(tmp_path, "w") as fp:
+                    json.dump(dict_list, fp)
+
+            _atomic_write(os.path.join(dirname, key + ".json"), _write_dict_list)
+            metadata["dict_lists"].append(key)
+        elif isinstance(val, np.ndarray) and val.dtype.kind != "O":
+            array_path = os.path.join(dirname, key + ".npy")
+            if not _is_saved_at(val, array_path):
+                _save_npy(array_path, val)
+            metadata["arrays"].append(key)
+        elif _array_from_list(val) is not None:
+            _save_npy(os.path.join(dirname, key + ".npy"), _array_from_list(val))
+            metadata["lists"].append(key)
+        elif (
+            type(val) == dict
+            and len(val) > 0
+            and all(
+                [
+                    isinstance(sub_val, np.ndarray) and sub_val.dtype.kind != "O"
+                    for sub_val in val.values()
+                ]
+            )
+        ):
+            sub_dir = os.path.join(dirname, key)
+            if not os.path.isdir(sub_dir):
+                os.makedirs(sub_dir)
+            for sub_key, sub_val in val.items():
+                array_path = os.path.join(sub_dir, sub_key + ".npy")
+                if not _is_saved_at(sub_val, array_path):
+                    _save_npy(array_path, sub_val)
+            metadata["array_dicts"][key] = list(val.keys())
+        else:
+            try:
+                # round trip through json so e.g. numpy scalars become python types
+                metadata["values"][key] = json.loads(
+                    json.dumps(val, default=_numpy_scalar_to_python)
+                )
+            except (TypeError, ValueError):
+                joblib.dump(val, os.path.join(dirname, key + ".joblib"))
+                metadata["pickled"].append(key)
+
+    def _write_metadata(tmp_path):
+        with open(tmp_path, "w") as fp:
+            json.dump(metadata, fp, indent=2)
+
+    # write metadata last, so feature file is only valid once all values are saved
+    _atomic_write(os.path.join(dirname, METADATA_FILENAME), _write_metadata)
+
+
+def load_feature_file(filename, mmap_mode="r"):
     """loads a feature file.
-    Wrapper around joblib.load.
+
+    Feature files saved by save_feature_file (directories) are loaded with
+    arrays memory-mapped, so loading is fast no matter how large the arrays are,
+    and only the rows that are used are read from disk. The FeatureExtractor
+    is re-created from its manifest, instead of being unpickled.
+    Feature files saved by earlier versions of hvc (single files
+    created with joblib.dump) are loaded with joblib.load.
 
     Parameters
     ----------
     filename : str
         name of feature file
+    mmap_mode : str
+        mode used to memory-map arrays, as for numpy.load.
+        Default is 'r', i.e. read-only. If None, arrays are read into memory.
+        Only used for feature files saved as directories.
 
     Returns
     -------
     feature_file : dict
         containing features, labels, and metadata related to feature extraction
     """
+    if not os.path.isdir(filename):
+        return joblib.load(filename)
+
+    with open(os.path.join(filename, METADATA_FILENAME)) as fp:
+        metadata = json.load(fp)
+    feature_file = {}
+    feature_file.update(metadata["values"])
+    for key in metadata["arrays"]:
+        feature_file[key] = np.load(
+            os.path.join(filename, key + ".npy"), mmap_mode=mmap_mode
+        )
+    for key in metadata["lists"]:
+        feature_file[key] = np.load(os.path.join(filename, key + ".npy")).tolist()
+    for key, sub_keys in metadata["array_dicts"].items():
+        feature_file[key] = {
+            sub_key: np.load(
+                os.path.join(filename, key, sub_key + ".npy"), mmap_mode=mmap_mode
+            )
+            for sub_key in sub_keys
+        }
+    for key in metadata.get("manifests", []):
+        # import here, since hvc.features imports hvc.utils
+        from ..features.extract import FeatureExtractor
 
-    return joblib.load(filename)
+        feature_file[key] = FeatureExtractor.from_manifest(
+            os.path.join(filename, key + ".json")
+        )
+    for key in metadata.get("dict_lists", []):
+        with open(os.path.join(filename, key + ".json")) as fp:
+            feature_file[key] = _dict_list_from_json(json.load(fp))
+    for key in metadata["pickled"]:
+        feature_file[key] = joblib.load(os.path.join(filename, key + ".joblib"))
+    return feature_file
@@ -6,12 +6,11 @@ from urllib.error import HTTPError
 import numpy as np
 import sklearn.preprocessing
 from scipy.io import loadmat
-from sklearn import neighbors
 from sklearn.model_selection import GridSearchCV
 from sklearn.model_selection import StratifiedShuffleSplit
-from sklearn.model_selection import cross_val_score
 from sklearn.svm import SVC
 
+from .cross_val import SongFolds
 from .randomdotorg import RandomDotOrg
 
 
@@ -148,10 +147,22 @@ def grid_search_svm_rbf(
     C_range=np.logspace(-1, 4, 6),
     gamma_range=np.logspace(-6, -1, 6),
     return_cv_results=False,
+    song_IDs=None,
+    n_splits=5,
+    standardize=False,
+    seed=42,
+    n_jobs=-1,
 ):
     """carries out a grid search of C and gamma parameters for an RBF kernel to
     use with a support vector machine.
 
+    By default, uses sklearn.model_selection.GridSearchCV with n_splits
+    random splits made by StratifiedShuffleSplit, with 20% of samples in each
+    validation set. If song_IDs is specified, every candidate is instead scored
+    with the same folds, built once with SongFolds, where samples from the same
+    song are always in the same fold, and RBF kernels are computed once per fold
+    for each value of gamma.
+
     Parameters
     ----------
     X : ndarray
@@ -168,6 +179,22 @@ def grid_search_svm_rbf(
     return_cv_results : bool
         if True, return results from grid search using cross validation.
         Default is False.
+    song_IDs : ndarray
+        numpy array of length m, ID of song that each sample came from.
+        If specified, samples from the same song are always in the same fold.
+        Default is None.
+    n_splits : int
+        number of splits or folds for cross-validation. Default is 5.
+    standardize : bool
+        if True, scale X for each fold with a StandardScaler fit to the training
+        set of that fold. Can only be used when song_IDs is specified.
+        Default is False, in which case X should already be scaled.
+    seed : int
+        random_state of StratifiedShuffleSplit, or if song_IDs is specified,
+        used to shuffle songs before they are split into folds. Default is 42.
+    n_jobs : int
+        number of jobs run in parallel. Default is -1,
+        which means "use all processors".
 
     Returns
     -------
@@ -178,30 +205,224 @@ def grid_search_svm_rbf(
         highest accuracy with cross-validation
     cv_results : dict
         of scores, returned by sklearn.model_selection.GridSearchCV.
+        If song_IDs is specified, has only the keys of GridSearchCV.cv_results_
+        that are about scores, not the times to fit and score.
         Only returned if return_cv_results is True.
     """
-
-    param_grid = dict(gamma=gamma_range, C=C_range)
-    cv = StratifiedShuffleSplit(n_splits=5, test_size=0.2, random_state=42)
-    # note call to GridSearchCV with n_jobs = -1, which means
-    # "run parallel if possible"
-    grid = GridSearchCV(SVC(), param_grid=param_grid, cv=cv, n_jobs=-1)
-    grid.fit(X, y)
+    if song_IDs is None:
+        if standardize:
+            raise ValueError("standardize can only be True if song_IDs is specified")
+        param_grid = dict(gamma=gamma_range, C=C_range)
+        cv = StratifiedShuffleSplit(n_splits=n_splits, test_size=0.2, random_state=seed)
+        grid = GridSearchCV(SVC(), param_grid=param_grid, cv=cv, n_jobs=n_jobs)
+        grid.fit(X, y)
+        best_params, best_score = grid.best_params_, grid.best_score_
+        cv_results = grid.cv_results_
+    else:
+        song_folds = SongFolds(
+            X, y, song_IDs, n_splits=n_splits, standardize=standardize, seed=seed
+        )
+        candidates = [
+            {"C": float(C), "gamma": float(gamma)}
+            for C in C_range
+            for gamma in gamma_range
+        ]
+        fold_scores = song_folds.score_svm_rbf(candidates, n_jobs=n_jobs)
+        cv_results = _cv_results(candidates, fold_scores)
+        best_ind = np.argmin(cv_results["rank_test_score"])
+        best_params = candidates[best_ind]
+        best_score = cv_results["mean_test_score"][best_ind]
+        cv_results = {key: np.asarray(val) for key, val in cv_results.items()}
     print(
         "The best parameters are {0} with a score of {1:0.2f}".format(
-            grid.best_params_, grid.best_score_
+            best_params, best_score
+        )
+    )
+    return_tuple = (best_params, best_score)
+    if return_cv_results:
+        return_tuple += (cv_results,)
+    return return_tuple
+
+
+def _cv_results(candidates, fold_scores):
+    """dict of lists of scores for each candidate, with the same keys as
+    cv_results_ of sklearn.model_selection.GridSearchCV that are about scores"""
+    mean_scores = fold_scores.mean(axis=1)
+    # rank 1 is best, ties keep order of candidates
+    order = np.argsort(-mean_scores, kind="stable")
+    ranks = np.empty((len(candidates),), dtype=int)
+    ranks[order] = np.arange(1, len(candidates) + 1)
+    cv_results = {
+        "params": list(candidates),
+        "param_C": [candidate["C"] for candidate in candidates],
+        "param_gamma": [candidate["gamma"] for candidate in candidates],
+        "mean_test_score": list(mean_scores),
+        "std_test_score": list(fold_scores.std(axis=1)),
+        "rank_test_score": list(ranks),
+    }
+    for split_ind in range(fold_scores.shape[1]):
+        cv_results["split{}_test_score".format(split_ind)] = list(
+            fold_scores[:, split_ind]
+        )
+    return cv_results
+
+
+def successive_halving_svm_rbf(
+    X,
+    y,
+    song_IDs,
+    C_range=np.logspace(-1, 4, 6),
+    gamma_range=np.logspace(-6, -1, 6),
+    factor=3,
+    min_samples=None,
+    n_splits=5,
+    seed=42,
+    n_jobs=1,
+    return_cv_results=False,
+    standardize=False,
+):
+    """searches for C and gamma parameters for an RBF kernel to use with a
+    support vector machine, like grid_search_svm_rbf, but with successive halving:
+    all candidates are scored with cross-validation on a small subset of samples,
+    then only the best 1 / factor of them are scored again with factor times
+    as many samples, until the last candidates are scored with all samples.
+
+    Folds are built once with SongFolds, so samples from the same song are
+    always in the same fold of cross-validation, and accuracy is not inflated
+    by syllables from one song being in training and validation sets.
+    Subsets are drawn by song from every fold, and every iteration uses the
+    same folds.
+
+    Parameters
+    ----------
+    X : ndarray
+        m-by-n array containing m samples each with n features
+    y : ndarray
+        numpy array of length m containing m labels corresponding to the
+        m samples in X
+    song_IDs : ndarray
+        numpy array of length m, ID of song that each sample came from
+    C_range : ndarray
+        range of values over which to search for best C.
+        default is np.logspace(-1, 4, 6)
+    gamma_range : ndarray
+        range of values over which to search for best gamma.
+        default is np.logspace(-6, -1, 6)
+    factor : int
+        1 / factor of candidates are kept after each iteration, and the number
+        of samples is multiplied by factor. Default is 3.
+    min_samples : int
+        number of samples in first iteration. Default is None, in which case
+        it is chosen so that it is multiplied by factor for each iteration until
+        the last iteration uses all m samples, but with at least 2 samples of
+        each class in each fold. The last iteration always uses all m samples.
+    n_splits : int
+        number of folds for cross-validation. Default is 5.
+    seed : int
+        seed used to draw subsets. Default is 42.
+    n_jobs : int
+        number of folds scored in parallel. Default is 1.
+    return_cv_results : bool
+        if True, return results from each iteration. Default is False.
+    standardize : bool
+        if True, scale X for each fold with a StandardScaler fit to the training
+        set of that fold. Default is False, in which case X should already
+        be scaled.
+
+    Returns
+    -------
+    best_params : dict
+        values for C and gamma that gave the highest accuracy with
+        cross-validation in the last iteration
+    best_score : float
+        highest accuracy with cross-validation in the last iteration
+    cv_results : dict
+        of scores, with the same keys as cv_results_ of
+        sklearn.model_selection.HalvingGridSearchCV, where each candidate
+        scored in each iteration is one element. Only returned if
+        return_cv_results is True.
+    """
+    song_folds = SongFolds(
+        X, y, song_IDs, n_splits=n_splits, standardize=standardize, seed=seed
+    )
+    candidates = [
+        {"C": float(C), "gamma": float(gamma)} for C in C_range for gamma in gamma_range
+    ]
+    num_samples = song_folds.features.shape[0]
+    num_classes = np.unique(song_folds.labels).shape[0]
+    # number of iterations needed to narrow down candidates to less than factor
+    num_iterations = 1 + int(np.floor(np.log(len(candidates)) / np.log(factor)))
+    if min_samples is None:
+        # need at least 2 samples of each class in each fold
+        min_samples = max(
+            num_samples // factor ** (num_iterations - 1), n_splits * 2 * num_classes
         )
+    # fewer iterations if there are not enough samples
+    # to multiply min_samples by factor for each one
+    num_iterations = min(
+        num_iterations,
+        1 + int(np.floor(np.log(num_samples / min_samples) / np.log(factor))),
     )
-    return_tuple = (grid.best_params_, grid.best_score_)
+
+    cv_results = {}
+    num_fits = 0
+    for iteration in range(num_iterations):
+        if iteration == num_iterations - 1:
+            # score last candidates with all samples
+            sample_IDs = None
+            iter_samples = num_samples
+        else:
+            sample_IDs = song_folds.subsample(
+                min_samples * factor**iteration,
+                seed=np.random.SeedSequence(seed, spawn_key=(iteration,)),
+            )
+            iter_samples = sample_IDs.shape[0]
+        fold_scores = song_folds.score_svm_rbf(
+            candidates, sample_IDs=sample_IDs, n_jobs=n_jobs
+        )
+        num_fits += fold_scores.size
+
+        iter_results = {
+            "iter": [iteration] * len(candidates),
+            "n_resources": [iter_samples] * len(candidates),
+        }
+        iter_results.update(_cv_results(candidates, fold_scores))
+        for key, val in iter_results.items():
+            cv_results.setdefault(key, []).extend(val)
+
+        order = np.argsort(iter_results["rank_test_score"], kind="stable")
+        best_params = candidates[order[0]]
+        best_score = iter_results["mean_test_score"][order[0]]
+        num_to_keep = int(np.ceil(len(candidates) / factor))
+        candidates = [candidates[ind] for ind in order[:num_to_keep]]
+
+    cv_results = {key: np.asarray(val) for key, val in cv_results.items()}
+    print(
+        "The best parameters are {0} with a score of {1:0.2f}, "
+        "found with {2} fits".format(best_params, best_score, num_fits)
+    )
+    return_tuple = (best_params, best_score)
     if return_cv_results:
-        return_tuple += (grid.cv_results_,)
+        return_tuple += (cv_results,)
     return return_tuple
 
 
-def find_best_k(samples, labels, k_range=range(1, 11), cv=10, standardize=True):
+def find_best_k(
+    samples,
+    labels,
+    k_range=range(1, 11),
+    cv=10,
+    standardize=True,
+    song_IDs=None,
+    n_jobs=1,
+):
     """find best k to use with k-Nearest Neighbors algorithm
     using 10-fold cross validation.
 
+    Folds are built once with SongFolds, and for each fold, nearest neighbors
+    are found once for the largest k in k_range, and accuracy for every k
+    is computed from them (see hvc.utils.knn_graph.KNeighborsGraph).
+
     Uses the distances weighted by their inverse to determine the nearest neighbor
     Empirically, with the 'knn' features, weighting by inverse always give slightly better accuracy.
 
@@ -219,7 +440,15 @@ def find_best_k(samples, labels, k_range=range(1, 11), cv=10, standardize=True):
     standardize : bool
         If True, scale values in columns of `samples` by subtracting mean and
         dividing by standard deviation (with `sklearn.preprocessing.scale`).
-        Default is True.
+        Default is True. If song_IDs is specified, samples are scaled for each
+        fold with a StandardScaler fit to the training set of that fold instead.
+    song_IDs : ndarray
+        numpy vector of length `m`, ID of song that each sample came from.
+        If specified, samples from the same song are always in the same fold.
+        Default is None, in which case folds are the same as those that
+        sklearn.model_selection.cross_val_score uses.
+    n_jobs : int
+        number of folds scored in parallel. Default is 1.
 
     Returns
     -------
@@ -252,14 +481,16 @@ def find_best_k(samples, labels, k_range=range(1, 11), cv=10, standardize=True):
             "where m is number of rows in samples matrix."
         )
 
-    if standardize:
-        samples = sklearn.preprocessing.scale(samples)
-
-    cv_scores = np.empty((len(k_range),))
-    for ind, k in enumerate(k_range):
-        clf = neighbors.KNeighborsClassifier(n_neighbors=k, weights="distance")
-        scores = cross_val_score(clf, samples, labels, cv=cv, scoring="accuracy")
-        cv_scores[ind] = scores.mean()
+    if song_IDs is None:
+        if standardize:
+            samples = sklearn.preprocessing.scale(samples)
+        # same folds that cross_val_score uses for a classifier
+        song_folds = SongFolds(samples, labels, n_splits=cv, standardize=False)
+    else:
+        song_folds = SongFolds(
+            samples, labels, song_IDs, n_splits=cv, standardize=standardize
+        )
+    cv_scores = song_folds.score_knn(k_range, n_jobs=n_jobs).mean(axis=1)
     best_k = k_range[cv_scores.argmax()]  # argmax returns index of max val
     print("best k was {} with accuracy of {}".format(best_k, np.max(cv_scores)))
     return cv_scores, best_k
@@ -318,6 +549,10 @@ def grab_n_samples_by_song(
     sample_IDs :
 
     song_ID_list_copy_to_pop :
+
+    See Also
+    --------
+    SongSampler : draws the same kind of sets faster, with numpy random Generators
     """
 
     song_IDs_arr = np.asarray(song_IDs)
@@ -388,6 +623,258 @@ def grab_n_samples_by_song(
         return sample_IDs
 
 
+class SongSampler:
+    """Draws sets of samples by song, like grab_n_samples_by_song, but builds an
+    index of the samples from each song once, so each draw only touches the
+    samples it returns, and draws with numpy random Generators.
+
+    Each training set is drawn with its own seed, made from the sampler's seed
+    and the number of samples and replicate, so any set can be drawn again
+    without drawing the sets before it.
+
+    Attributes
+    ----------
+    song_ID_list : numpy.ndarray
+        unique song IDs, sorted
+    song_ptr : numpy.ndarray
+        indices into sample_inds, like the indptr of a CSR matrix:
+        samples from song_ID_list[i] are sample_inds[song_ptr[i]:song_ptr[i + 1]]
+    sample_inds : numpy.ndarray
+        indices of samples, sorted by song
+    labelset : numpy.ndarray
+        unique labels
+    label_codes : numpy.ndarray
+        index of each sample's label in labelset
+    seed : int
+        used to make a seed for each draw. If None is passed when the
+        sampler is created, this is entropy from the operating system,
+        that can be passed as seed to another sampler to draw the same sets.
+    """
+
+    def __init__(self, song_IDs, labels, seed=None):
+        """__init__ for SongSampler
+
+        Parameters
+        ----------
+        song_IDs : list of ints
+            song ID for each sample in sample set
+        labels : list of chars
+            label for each sample in sample set
+        seed : int
+            seed for random number generators. Default is None.
+        """
+        song_IDs = np.asarray(song_IDs)
+        labels = np.asarray(labels)
+        if song_IDs.shape[0] != labels.shape[0]:
+            raise ValueError(
+                "song_IDs has {} samples but labels has {}".format(
+                    song_IDs.shape[0], labels.shape[0]
+                )
+            )
+        self.song_ID_list, song_inds = np.unique(song_IDs, return_inverse=True)
+        # stable sort keeps samples from each song in order
+        self.sample_inds = np.argsort(song_inds, kind="stable")
+        self.song_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(song_inds, minlength=len(self.song_ID_list))))
+        )
+        self.labelset, self.label_codes = np.unique(labels, return_inverse=True)
+        self.seed = np.random.SeedSequence(seed).entropy
+
+    def _seed_sequence(self, *key):
+        return np.random.SeedSequence(self.seed, spawn_key=key)
+
+    def _samples_from_songs(self, song_pos):
+        """returns indices of samples from songs, in order of song_pos"""
+        starts = self.song_ptr[song_pos]
+        counts = self.song_ptr[song_pos + 1] - starts
+        ends = np.cumsum(counts)
+        offsets = np.repeat(starts - (ends - counts), counts)
+        return self.sample_inds[offsets + np.arange(ends[-1] if ends.size else 0)]
+
+    def _fix_singletons(self, sample_IDs, song_pos, num_songs):
+        """replace samples so that no class has only one sample,
+        without drawing again. Returns sample_IDs and number of songs used."""
+        num_samples = sample_IDs.shape[0]
+        label_counts = np.bincount(
+            self.label_codes[sample_IDs], minlength=len(self.labelset)
+        )
+        singletons = np.flatnonzero(label_counts == 1)
+        if singletons.size == 0:
+            return sample_IDs, num_songs
+
+        # samples after sample_IDs, from the rest of the shuffled songs
+        all_samples = self._samples_from_songs(song_pos)
+        rest = all_samples[num_samples:]
+        rest_codes = self.label_codes[rest]
+        taken = np.zeros(rest.shape, dtype=bool)
+        last_taken = -1
+        sample_IDs = sample_IDs.copy()
+        for label_code in singletons:
+            if label_counts[label_code] != 1:
+                continue
+            later = np.flatnonzero((rest_codes == label_code) & ~taken)
+            if later.size > 0:
+                # add the next example of the class, in place of the last sample
+                # from a class that will still have more than one example
+                donors = np.flatnonzero(label_counts[self.label_codes[sample_IDs]] > 2)
+                if donors.size == 0:
+                    raise ValueError(
+                        "can't draw {} samples with at least two examples of "
+                        "each class".format(num_samples)
+                    )
+                replace_at = donors[-1]
+                label_counts[self.label_codes[sample_IDs[replace_at]]] -= 1
+                take = later[0]
+            else:
+                # the only example of the class in these songs: replace it with
+                # the next sample from a class that has more than one example
+                replace_at = np.flatnonzero(self.label_codes[sample_IDs] == label_code)[
+                    0
+                ]
+                label_counts[label_code] -= 1
+                candidates = np.flatnonzero((label_counts[rest_codes] >= 2) & ~taken)
+                if candidates.size == 0:
+                    raise ValueError(
+                        "can't draw {} samples with at least two examples of "
+                        "each class".format(num_samples)
+                    )
+                take = candidates[0]
+            sample_IDs[replace_at] = rest[take]
+            label_counts[rest_codes[take]] += 1
+            taken[take] = True
+            last_taken = max(last_taken, take)
+
+        if last_taken >= 0:
+            # songs that samples were taken from are used, like songs in sample_IDs
+            song_ends = np.cumsum(self.song_ptr[song_pos + 1] - self.song_ptr[song_pos])
+            num_songs = max(
+                num_songs,
+                np.searchsorted(song_ends, num_samples + last_taken, side="right") + 1,
+            )
+        return sample_IDs, num_songs
+
+    def sample(
+        self, num_samples, song_ID_list=None, seed=None, return_popped_songlist=False
+    ):
+        """draw samples from songs in shuffled order until there are more than
+        num_samples, then truncate at num_samples, as grab_n_samples_by_song does.
+
+        If any class has only one sample, samples are replaced, instead of
+        drawing again: with the next example of that class from the rest of
+        the shuffled songs, in place of the last sample from a class with more
+        than two examples, or, if there are no other examples of that class,
+        with the next sample from a class that already has more than one.
+
+        Parameters
+        ----------
+        num_samples : int
+            number of samples to return
+        song_ID_list : list of ints
+            ID numbers for songs from which to draw.
+            If None, all songs are used. Default is None.
+        seed : int, numpy.random.SeedSequence, or numpy.random.Generator
+            passed to numpy.random.default_rng. Default is None.
+        return_popped_songlist : bool
+            if True, also return IDs of songs that no samples were drawn from.
+            Default is False.
+
+        Returns
+        -------
+        sample_IDs : numpy.ndarray
+            indices of samples
+        song_ID_list_popped : numpy.ndarray
+            IDs of songs in song_ID_list that no samples were drawn from,
+            in shuffled order. Only returned if return_popped_songlist is True.
+        """
+        rng = np.random.default_rng(seed)
+        if song_ID_list is None:
+            song_pos = np.arange(len(self.song_ID_list))
+        else:
+            song_ID_list = np.asarray(song_ID_list)
+            song_pos = np.searchsorted(self.song_ID_list, song_ID_list)
+            song_pos[song_pos == len(self.song_ID_list)] = 0
+            if not np.array_equal(self.song_ID_list[song_pos], song_ID_list):
+                raise ValueError("song_ID_list contains IDs that are not in song_IDs")
+        song_pos = rng.permutation(song_pos)
+
+        song_ends = np.cumsum(self.song_ptr[song_pos + 1] - self.song_ptr[song_pos])
+        if song_ends.size == 0 or song_ends[-1] < num_samples:
+            raise ValueError(
+                "can't draw {} samples, only {} samples in songs".format(
+                    num_samples, song_ends[-1] if song_ends.size else 0
+                )
+            )
+        # number of songs until there are more than num_samples
+        num_songs = min(
+            np.searchsorted(song_ends, num_samples, side="right") + 1, len(song_pos)
+        )
+        sample_IDs = self._samples_from_songs(song_pos[:num_songs])[:num_samples]
+        sample_IDs, num_songs = self._fix_singletons(sample_IDs, song_pos, num_songs)
+
+        if return_popped_songlist:
+            return sample_IDs, self.song_ID_list[song_pos[num_songs:]]
+        else:
+            return sample_IDs
+
+    def train_test_split(self, num_test_samples, train_samples_range, num_replicates):
+        """draw a test set, then draw training sets from the rest of the songs,
+        num_replicates for each number of samples in train_samples_range
+
+        Parameters
+        ----------
+        num_test_samples : int
+            number of samples in test set
+        train_samples_range : range
+            of numbers of samples in training sets
+        num_replicates : int
+            number of training sets for each number of samples
+
+        Returns
+        -------
+        test_IDs : numpy.ndarray
+            indices of samples in test set
+        train_song_ID_list : numpy.ndarray
+            IDs of songs not in test set, from which training sets are drawn
+        train_IDs_arr : numpy.ndarray
+            with dtype object and shape (len(train_samples_range), num_replicates),
+            of indices of samples in each training set
+        """
+        test_IDs, train_song_ID_list = self.sample(
+            num_test_samples, seed=self._seed_sequence(0), return_popped_songlist=True
+        )
+        train_IDs_arr = np.empty((len(train_samples_range), num_replicates), dtype="O")
+        for num_samples_ind, num_train_samples in enumerate(train_samples_range):
+            for replicate in range(num_replicates):
+                train_IDs_arr[num_samples_ind, replicate] = self.train_sample(
+                    num_train_samples, replicate, train_song_ID_list
+                )
+        return test_IDs, train_song_ID_list, train_IDs_arr
+
+    def train_sample(self, num_train_samples, replicate, train_song_ID_list):
+        """draw one training set, the same one that train_test_split draws
+        for num_train_samples and replicate, e.g. to add replicates later
+
+        Parameters
+        ----------
+        num_train_samples : int
+            number of samples in training set
+        replicate : int
+            index of replicate
+        train_song_ID_list : numpy.ndarray
+            IDs of songs not in test set, returned by train_test_split
+
+        Returns
+        -------
+        train_IDs : numpy.ndarray
+            indices of samples in training set
+        """
+        return self.sample(
+            num_train_samples,
+            song_ID_list=train_song_ID_list,
+            seed=self._seed_sequence(1, num_train_samples, replicate),
+        )
+
+
 def get_acc_by_label(labels, pred_labels, labelset):
     """accuracy averaged across classes
 
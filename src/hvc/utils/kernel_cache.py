@@ -0,0 +1,185 @@
+"""
+cache of RBF kernels, used to fit support vector machines with different
+values of C without computing the kernel again for each one
+"""
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics.pairwise import rbf_kernel
+
+# default max. size of cache, in MB
+DEFAULT_MAX_SIZE = 1024
+
+
+class RBFKernelCache:
+    """RBF kernels between training samples (the Gram matrix), and between test
+    and training samples, computed once for each value of gamma, that are used
+    to fit and score SVC models with kernel='precomputed'.
+
+    Kernels for the values of gamma used least recently are removed when the
+    cache would grow bigger than max_size. If the kernels for one value of
+    gamma are bigger than max_size, the fits method returns False, and models
+    should be fit with kernels computed on the fly instead, as SVC does.
+
+    Attributes
+    ----------
+    train_features : numpy.ndarray
+        m-by-n array of m training samples, each with n features
+    test_features : numpy.ndarray
+        array of test samples, with n features
+    max_size : float
+        max. size of cache, in MB
+    """
+
+    def __init__(self, train_features, test_features, max_size=DEFAULT_MAX_SIZE):
+        """__init__ for RBFKernelCache
+
+        Parameters
+        ----------
+        train_features : numpy.ndarray
+            m-by-n array of m training samples, each with n features
+        test_features : numpy.ndarray
+            array of test samples, with n features
+        max_size : float
+            max. size of cache, in MB. Default is 1024.
+        """
+        self.train_features = np.asarray(train_features, dtype=np.float64)
+        self.test_features = np.asarray(test_features, dtype=np.float64)
+        self.max_size = max_size
+        self._kernels = OrderedDict()
+
+    @property
+    def kernel_size(self):
+        """size in MB of kernels for one value of gamma"""
+        num_train = self.train_features.shape[0]
+        num_elements = num_train * (num_train + self.test_features.shape[0])
+        return num_elements * np.dtype(np.float64).itemsize / 2**20
+
+    def fits(self):
+        """returns True if kernels for one value of gamma fit in the cache"""
+        return self.kernel_size <= self.max_size
+
+    def kernels(self, gamma):
+        """get kernels for gamma, computing them if they are not in the cache
+
+        Parameters
+        ----------
+        gamma : float
+            parameter of RBF kernel
+
+        Returns
+        -------
+        train_kernel : numpy.ndarray
+            kernel between training samples, of shape (m, m)
+        test_kernel : numpy.ndarray
+            kernel between test and training samples,
+            of shape (number of test samples, m)
+        """
+        gamma = float(gamma)
+        if gamma in self._kernels:
+            self._kernels.move_to_end(gamma)
+            return self._kernels[gamma]
+
+        if not self.fits():
+            raise ValueError(
+                "kernels are {:.1f} MB, bigger than max_size of cache, "
+                "{:.1f} MB".format(self.kernel_size, self.max_size)
+            )
+        while (len(self._kernels) + 1) * self.kernel_size > self.max_size:
+            self._kernels.popitem(last=False)
+        train_kernel = rbf_kernel(self.train_features, gamma=gamma)
+        test_kernel = rbf_kernel(self.test_features, self.train_features, gamma=gamma)
+        self._kernels[gamma] = (train_kernel, test_kernel)
+        return train_kernel, test_kernel
+
+    def fit_predict(self, clf, train_labels):
+        """fit SVC with precomputed kernels, and predict labels of test samples
+
+        Parameters
+        ----------
+        clf : sklearn.svm.SVC
+            with kernel='rbf', not fit
+        train_labels : numpy.ndarray
+            label for each training sample
+
+        Returns
+        -------
+        clf : PrecomputedRBFSVC
+            fit, that predicts labels from features the same way as clf would
+            if it had been fit with kernels computed on the fly
+        pred_labels : numpy.ndarray
+            predicted label for each test sample
+        """
+        if clf.kernel != "rbf":
+            raise ValueError("clf has kernel {}, not 'rbf'".format(clf.kernel))
+        gamma = clf.gamma
+        train_kernel, test_kernel = self.kernels(gamma)
+        precomputed_clf = clone(clf).set_params(kernel="precomputed")
+        precomputed_clf.fit(train_kernel, train_labels)
+        pred_labels = precomputed_clf.predict(test_kernel)
+        clf = PrecomputedRBFSVC(precomputed_clf, self.train_features, gamma)
+        return clf, pred_labels
+
+
+class PrecomputedRBFSVC:
+    """SVC fit with a precomputed RBF kernel, saved with its support vectors,
+    that predicts from features by computing the kernel between features and
+    the support vectors, and passing it to the SVC, so it only uses the
+    public API of SVC with kernel='precomputed'.
+
+    Attributes
+    ----------
+    svc : sklearn.svm.SVC
+        fit with kernel='precomputed'
+    support_vectors : numpy.ndarray
+        training samples that are support vectors of svc
+    gamma : float
+        parameter of RBF kernel
+    kernel : str
+        'rbf'
+    C : float
+        regularization parameter of svc
+    classes_ : numpy.ndarray
+        labels of classes, from svc
+    """
+
+    kernel = "rbf"
+
+    def __init__(self, svc, train_features, gamma):
+        """__init__ for PrecomputedRBFSVC
+
+        Parameters
+        ----------
+        svc : sklearn.svm.SVC
+            fit with kernel='precomputed', with an RBF kernel
+            between training samples
+        train_features : numpy.ndarray
+            training samples that svc was fit to
+        gamma : float
+            parameter of RBF kernel
+        """
+        self.svc = svc
+        self.support_vectors = train_features[svc.support_]
+        self._num_train = train_features.shape[0]
+        self.gamma = float(gamma)
+        self.C = svc.C
+        self.classes_ = svc.classes_
+
+    def _kernel(self, features):
+        """kernel between features and training samples. Columns for samples
+        that are not support vectors are not used by the SVC, so they are zero"""
+        kernel = np.zeros((features.shape[0], self._num_train))
+        kernel[:, self.svc.support_] = rbf_kernel(
+            features, self.support_vectors, gamma=self.gamma
+        )
+        return kernel
+
+    def predict(self, features):
+        return self.svc.predict(self._kernel(features))
+
+    def predict_proba(self, features):
+        return self.svc.predict_proba(self._kernel(features))
+
+    def decision_function(self, features):
+        return self.svc.decision_function(self._kernel(features))
@@ -0,0 +1,208 @@
+"""
+graph of k nearest neighbors, used to score k-Nearest Neighbors classifiers
+for many values of k from one neighbor search
+"""
+import numpy as np
+
+# max. number of elements in the array of distances for one chunk of test samples
+CHUNK_ELEMENTS = 2**22
+
+
+class KNeighborsGraph:
+    """nearest neighbors of test samples among training samples, found once for
+    the largest k, that are used to predict labels for any smaller k.
+
+    Labels are predicted the same way as by
+    sklearn.neighbors.KNeighborsClassifier(weights='distance'):
+    each neighbor votes for its label with the inverse of its distance,
+    and if any neighbors are at distance zero, only they vote.
+    Predictions can differ from KNeighborsClassifier only when two neighbors
+    are the same distance from a test sample.
+
+    Attributes
+    ----------
+    classes : numpy.ndarray
+        unique labels of training samples, sorted
+    max_k : int
+        number of neighbors found for each test sample
+    indices : numpy.ndarray
+        of shape (number of test samples, max_k), indices of training samples
+        that are nearest neighbors of each test sample, from nearest to farthest
+    distances : numpy.ndarray
+        of shape (number of test samples, max_k), Euclidean distances to the
+        neighbors in indices
+    """
+
+    def __init__(
+        self,
+        train_features,
+        train_labels,
+        test_features,
+        max_k,
+        train_mask=None,
+        chunk_size=None,
+    ):
+        """__init__ for KNeighborsGraph
+
+        Parameters
+        ----------
+        train_features : numpy.ndarray
+            m-by-n array of m training samples, each with n features
+        train_labels : numpy.ndarray
+            vector of length m, label for each training sample
+        test_features : numpy.ndarray
+            array of test samples, with n features
+        max_k : int
+            largest number of neighbors that will be used to predict labels
+        train_mask : numpy.ndarray
+            boolean vector of length m. If specified, only training samples
+            where train_mask is True are neighbors, e.g. to score subsets of a
+            training set, or folds of cross-validation, without copying the
+            training set. Default is None, in which case all training samples
+            are used.
+        chunk_size : int
+            number of test samples for which distances are computed at once.
+            Default is None, in which case chunk_size is chosen so that arrays
+            of distances have no more than about 4 million elements.
+        """
+        train_features = np.asarray(train_features, dtype=np.float64)
+        test_features = np.asarray(test_features, dtype=np.float64)
+        train_labels = np.asarray(train_labels)
+        if train_features.ndim != 2 or test_features.ndim != 2:
+            raise ValueError("train_features and test_features should be 2-d arrays")
+        if train_features.shape[1] != test_features.shape[1]:
+            raise ValueError(
+                "train_features has {} features but test_features has {}".format(
+                    train_features.shape[1], test_features.shape[1]
+                )
+            )
+        if train_labels.shape[0] != train_features.shape[0]:
+            raise ValueError(
+                "train_labels has {} labels but there are {} training samples".format(
+                    train_labels.shape[0], train_features.shape[0]
+                )
+            )
+        if train_mask is not None:
+            train_mask = np.asarray(train_mask, dtype=bool)
+            num_train = np.count_nonzero(train_mask)
+        else:
+            num_train = train_features.shape[0]
+        if max_k > num_train:
+            raise ValueError(
+                "max_k is {} but there are only {} training samples".format(
+                    max_k, num_train
+                )
+            )
+
+        self.classes, self._label_codes = np.unique(train_labels, return_inverse=True)
+        self.max_k = max_k
+
+        num_test = test_features.shape[0]
+        if chunk_size is None:
+            chunk_size = max(
+                CHUNK_ELEMENTS
+                // max(train_features.shape[0], max_k * train_features.shape[1], 1),
+                1,
+            )
+        self.indices = np.empty((num_test, max_k), dtype=np.intp)
+        self.distances = np.empty((num_test, max_k))
+        train_sq = np.einsum("ij,ij->i", train_features, train_features)
+        for start in range(0, num_test, chunk_size):
+            test_chunk = test_features[start : start + chunk_size]
+            # squared distances, from |a - b|^2 = |a|^2 - 2ab + |b|^2
+            dist_sq = test_chunk @ train_features.T
+            dist_sq *= -2
+            dist_sq += train_sq
+            dist_sq += np.einsum("ij,ij->i", test_chunk, test_chunk)[:, np.newaxis]
+            if train_mask is not None:
+                dist_sq[:, ~train_mask] = np.inf
+            nearest = np.argpartition(dist_sq, max_k - 1, axis=1)[:, :max_k]
+            # compute distances to nearest neighbors again without cancellation
+            # error, so identical samples are at distance zero, then sort
+            nearest_dist = np.sqrt(
+                np.sum(
+                    (test_chunk[:, np.newaxis, :] - train_features[nearest]) ** 2,
+                    axis=-1,
+                )
+            )
+            order = np.argsort(nearest_dist, axis=1, kind="stable")
+            self.indices[start : start + chunk_size] = np.take_along_axis(
+                nearest, order, axis=1
+            )
+            self.distances[start : start + chunk_size] = np.take_along_axis(
+                nearest_dist, order, axis=1
+            )
+
+    def predict_k_range(self, k_range):
+        """predict labels of test samples for each k in k_range
+
+        Parameters
+        ----------
+        k_range : range
+            of ints, values of k. Largest must be no more than max_k.
+
+        Returns
+        -------
+        pred_labels : numpy.ndarray
+            of shape (len(k_range), number of test samples)
+        """
+        k_range = list(k_range)
+        if max(k_range) > self.max_k or min(k_range) < 1:
+            raise ValueError(
+                "values of k must be between 1 and max_k, {}".format(self.max_k)
+            )
+        num_test = self.indices.shape[0]
+        rows = np.arange(num_test)
+        # votes weighted by inverse of distance, and votes of neighbors at
+        # distance zero, added one neighbor at a time
+        votes = np.zeros((num_test, self.classes.shape[0]))
+        zero_votes = np.zeros((num_test, self.classes.shape[0]))
+        # neighbors are sorted, so if any are at distance zero the first one is
+        has_zero = self.distances[:, 0] == 0
+        pred_codes = np.empty((len(k_range), num_test), dtype=np.intp)
+        with np.errstate(divide="ignore"):
+            weights = 1.0 / self.distances
+        for k in range(1, max(k_range) + 1):
+            codes = self._label_codes[self.indices[:, k - 1]]
+            is_zero = self.distances[:, k - 1] == 0
+            votes[rows[~is_zero], codes[~is_zero]] += weights[~is_zero, k - 1]
+            zero_votes[rows[is_zero], codes[is_zero]] += 1
+            for k_ind, k_val in enumerate(k_range):
+                if k_val == k:
+                    pred_codes[k_ind] = np.where(
+                        has_zero, zero_votes.argmax(axis=1), votes.argmax(axis=1)
+                    )
+        return self.classes[pred_codes]
+
+    def predict(self, k):
+        """predict labels of test samples using k nearest neighbors
+
+        Parameters
+        ----------
+        k : int
+            number of neighbors. Must be no more than max_k.
+
+        Returns
+        -------
+        pred_labels : numpy.ndarray
+            predicted label for each test sample
+        """
+        return self.predict_k_range([k])[0]
+
+    def score(self, test_labels, k_range):
+        """accuracy on test samples for each k in k_range
+
+        Parameters
+        ----------
+        test_labels : numpy.ndarray
+            true label for each test sample
+        k_range : range
+            of ints, values of k. Largest must be no more than max_k.
+
+        Returns
+        -------
+        scores : numpy.ndarray
+            accuracy for each k in k_range
+        """
+        pred_labels = self.predict_k_range(k_range)
+        return np.mean(pred_labels == np.asarray(test_labels)[np.newaxis, :], axis=1)
@@ -0,0 +1,118 @@
+"""prefetch data on background threads while it is being processed"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """iterates over the results of calling a function on each item in a
+    sequence, calling the function for up to `depth` items ahead of the item
+    currently being processed, on a pool of threads.
+
+    Meant for functions that are bound by I/O, e.g. reading audio files,
+    so that files are read while the CPU is busy computing features from the
+    file that was read before. Results are yielded in the same order as items.
+
+    Attributes
+    ----------
+    depth : int
+        maximum number of items to prefetch. If 0, the function is called for
+        each item only when it is needed, in the thread that is iterating.
+    wait_time : float
+        total time in seconds spent waiting for results, i.e. time when the
+        thread iterating over the Prefetcher was blocked by I/O
+    num_waits : int
+        number of items whose result was not ready when it was needed
+    num_items : int
+        number of results yielded so far
+
+    Examples
+    --------
+    >>> prefetcher = Prefetcher(hvc.audiofileIO.load_audio, audio_files, depth=4)
+    >>> for audio_file, (raw_audio, samp_freq) in prefetcher:
+    ...     # compute features while the next 4 files are read
+    >>> prefetcher.io_stats()
+    """
+
+    def __init__(self, func, items, depth=2, num_threads=None):
+        """__init__ for Prefetcher
+
+        Parameters
+        ----------
+        func : callable
+            called with each item in items as its only argument
+        items : iterable
+            items to call func on
+        depth : int
+            maximum number of items to prefetch. Default is 2.
+        num_threads : int
+            number of threads in pool. Default is None, in which case
+            one thread is used per item being prefetched, i.e. num_threads = depth.
+        """
+        if type(depth) != int or depth < 0:
+            raise ValueError(
+                "depth for Prefetcher must be a non-negative int, not {}".format(depth)
+            )
+        self.func = func
+        self.items = items
+        self.depth = depth
+        if num_threads is None:
+            num_threads = depth
+        self.num_threads = num_threads
+        self.wait_time = 0.0
+        self.num_waits = 0
+        self.num_items = 0
+
+    def __iter__(self):
+        if self.depth == 0:
+            for item in self.items:
+                tic = time.perf_counter()
+                result = self.func(item)
+                self.wait_time += time.perf_counter() - tic
+                self.num_waits += 1
+                self.num_items += 1
+                yield item, result
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.num_threads)
+        pending = deque()
+        items = iter(self.items)
+        try:
+            # fill queue, then submit one new item each time a result is taken
+            for item in items:
+                pending.append((item, executor.submit(self.func, item)))
+                if len(pending) >= self.depth:
+                    break
+            while pending:
+                item, future = pending.popleft()
+                if not future.done():
+                    self.num_waits += 1
+                tic = time.perf_counter()
+                result = future.result()
+                self.wait_time += time.perf_counter() - tic
+                # keep `depth` items prefetching while this one is processed
+                for next_item in items:
+                    pending.append((next_item, executor.submit(self.func, next_item)))
+                    break
+                self.num_items += 1
+                yield item, result
+        finally:
+            # if iteration stopped early, don't read files that won't be used
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def io_stats(self):
+        """returns dict with counters of time spent waiting on I/O
+
+        Returns
+        -------
+        io_stats : dict
+            with keys depth, num_items, num_waits, and wait_time (in seconds)
+        """
+        return {
+            "depth": self.depth,
+            "num_items": self.num_items,
+            "num_waits": self.num_waits,
+            "wait_time": self.wait_time,
+        }
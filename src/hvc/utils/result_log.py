@@ -0,0 +1,142 @@
+"""log of results from models fit by hvc.select, appended to as each model is
+fit, so that an interrupted model selection can be resumed without fitting
+the same models again"""
+import hashlib
+import json
+import os
+
+from ..__about__ import __version__
+from .shards import _atomic_write
+
+RESULT_LOG_FILENAME = "select_results.jsonl"
+
+
+class ResultLog:
+    """file with one line of JSON for each model that has been fit
+    (select_results.jsonl), after a first line with the settings of the
+    model selection.
+
+    Each line is written and flushed to disk only after the model and its
+    .meta file have been saved, so any fit in the log has valid files, and if
+    model selection is interrupted, it can resume with the fits that are not
+    in the log yet. A partially-written last line, e.g. from a crash,
+    is removed when the log is loaded.
+
+    Attributes
+    ----------
+    log_dir : str
+        directory where log is saved
+    log_path : str
+        path to log file
+    settings : dict
+        parameters of model selection that determine which models are fit and
+        with which samples, e.g. feature_file, seed, and models.
+        None if the log does not exist yet and start has not been called.
+    results : dict
+        that maps tuples (num_samples_ind, replicate, model_ind) to
+        the dict logged for that fit
+    """
+
+    def __init__(self, log_dir):
+        """__init__ for ResultLog
+
+        Parameters
+        ----------
+        log_dir : str
+            directory where log is saved. If it already has a log,
+            settings and results are loaded from it.
+        """
+        self.log_dir = os.path.abspath(os.path.normpath(log_dir))
+        self.log_path = os.path.join(self.log_dir, RESULT_LOG_FILENAME)
+        self.settings = None
+        self._settings_hash = None
+        self.results = {}
+        if os.path.isfile(self.log_path):
+            with open(self.log_path) as fp:
+                lines = fp.readlines()
+            header = json.loads(lines[0])
+            self.settings = header["settings"]
+            self._settings_hash = header["settings_hash"]
+            for line_num, line in enumerate(lines[1:]):
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    if line_num == len(lines) - 2:
+                        # last line was not completely written; remove it,
+                        # so the next result is not appended to it
+                        with open(self.log_path, "w") as fp:
+                            fp.writelines(lines[:-1])
+                        break
+                    raise
+                self.results[self.result_key(result)] = result
+            else:
+                if not lines[-1].endswith("\n"):
+                    # newline after last result was not written
+                    with open(self.log_path, "a") as fp:
+                        fp.write("\n")
+
+    @staticmethod
+    def result_key(result):
+        """returns tuple (num_samples_ind, replicate, model_ind) for a result"""
+        return result["num_samples_ind"], result["replicate"], result["model_ind"]
+
+    @staticmethod
+    def _hash(settings):
+        settings_str = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha1(settings_str.encode()).hexdigest()
+
+    def start(self, settings):
+        """start a new log with settings, or, if there already is a log,
+        check that it has the same settings
+
+        Parameters
+        ----------
+        settings : dict
+            parameters of model selection. Must be serializable as JSON
+            (values that are not are converted with str).
+        """
+        settings_hash = self._hash(settings)
+        if self._settings_hash is not None:
+            if self._settings_hash != settings_hash:
+                raise ValueError(
+                    "results in {} are from a model selection with different "
+                    "settings (e.g. feature_file, train_samples_range, seed, "
+                    "or models). Please use a different directory.".format(self.log_dir)
+                )
+            return
+        if not os.path.isdir(self.log_dir):
+            os.makedirs(self.log_dir)
+        header = {
+            "version": __version__,
+            "settings_hash": settings_hash,
+            "settings": settings,
+        }
+
+        def write_header(path):
+            with open(path, "w") as fp:
+                fp.write(json.dumps(header, default=str) + "\n")
+
+        _atomic_write(self.log_path, write_header)
+        self.settings = json.loads(json.dumps(settings, default=str))
+        self._settings_hash = settings_hash
+
+    def has(self, num_samples_ind, replicate, model_ind):
+        """returns True if the result of a fit is in the log"""
+        return (num_samples_ind, replicate, model_ind) in self.results
+
+    def add(self, result):
+        """append the result of one fit to the log
+
+        Parameters
+        ----------
+        result : dict
+            with keys num_samples_ind, replicate, and model_ind, plus any
+            other values that can be serialized as JSON
+        """
+        if self._settings_hash is None:
+            raise ValueError("must call start before adding results to log")
+        with open(self.log_path, "a") as fp:
+            fp.write(json.dumps(result) + "\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+        self.results[self.result_key(result)] = result
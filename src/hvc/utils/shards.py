@@ -0,0 +1,210 @@
+"""shards of features saved during extraction, so that an interrupted
+extraction can be resumed without extracting features from the same
+audio files again"""
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+
+from ..__about__ import __version__
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _atomic_write(path, write_func):
+    """call write_func with a temporary path, then rename to path,
+    so that other processes never see a partially-written file"""
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    write_func(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class ShardStore:
+    """directory of shards, each holding the features extracted from one or
+    more audio files, plus a manifest (manifest.json) that lists which audio
+    files are in which shard.
+
+    A shard is only added to the manifest after it has been completely
+    written, so if extraction is interrupted, any file in the manifest
+    has valid features saved, and extraction can resume with the files
+    that are not in the manifest yet.
+
+    Each audio file is identified by its absolute path, size, modification time,
+    and its annotation (labels, onsets, and offsets), so a file whose audio or
+    annotation changes is extracted again.
+
+    Attributes
+    ----------
+    shard_dir : str
+        directory where shards and manifest are saved
+    settings : dict
+        parameters that determine the features extracted, e.g. feature_list and
+        spect_params. Shards can only be reused by an extraction with the same
+        settings and the same version of hvc.
+    manifest : dict
+        with keys 'version', 'settings_hash', and 'files', a dict that maps the key
+        of each audio file to the filename and to the name of its shard
+    """
+
+    def __init__(self, shard_dir, settings):
+        """__init__ for ShardStore
+
+        Parameters
+        ----------
+        shard_dir : str
+            directory where shards and manifest are saved. Created if it does not
+            exist. If it already has a manifest, shards listed in it are reused.
+        settings : dict
+            parameters that determine the features extracted. Must be serializable
+            as JSON (values that are not are converted with str).
+        """
+        self.shard_dir = os.path.abspath(os.path.normpath(shard_dir))
+        if not os.path.isdir(self.shard_dir):
+            os.makedirs(self.shard_dir)
+        self.settings = settings
+        settings_str = json.dumps(settings, sort_keys=True, default=str)
+        settings_hash = hashlib.sha1(settings_str.encode()).hexdigest()
+
+        manifest_path = os.path.join(self.shard_dir, MANIFEST_FILENAME)
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as fp:
+                self.manifest = json.load(fp)
+            if self.manifest.get("version") != __version__:
+                # shards are pickled, and features may be computed differently
+                # by another version of hvc
+                raise ValueError(
+                    "shards in {} were extracted with version {} of hvc, "
+                    "but this is version {}. Please use a different "
+                    "shard_dir.".format(
+                        self.shard_dir, self.manifest.get("version"), __version__
+                    )
+                )
+            if self.manifest["settings_hash"] != settings_hash:
+                raise ValueError(
+                    "shards in {} were extracted with different settings "
+                    "(e.g. feature_list, spect_params, or labels_to_use). "
+                    "Please use a different shard_dir.".format(self.shard_dir)
+                )
+        else:
+            self.manifest = {
+                "version": __version__,
+                "settings_hash": settings_hash,
+                "files": {},
+            }
+        # number shards after the last one in the manifest; can't just count them,
+        # since a shard is no longer listed if all its files were extracted again
+        shard_nums = [
+            int(entry["shard"].split("_")[1].split(".")[0])
+            for entry in self.manifest["files"].values()
+        ]
+        self._next_shard_num = max(shard_nums) + 1 if shard_nums else 0
+        self._loaded_shard_name = None
+        self._loaded_shard = None
+
+    @staticmethod
+    def file_key(annotation_dict):
+        """returns str that identifies an audio file and its annotation
+
+        Parameters
+        ----------
+        annotation_dict : dict
+            with keys filename, labels, onsets_Hz, offsets_Hz
+
+        Returns
+        -------
+        key : str
+            hex digest
+        """
+        filename = os.path.abspath(annotation_dict["filename"])
+        stat = os.stat(filename)
+        sha1 = hashlib.sha1()
+        sha1.update(
+            "{}:{}:{}".format(filename, stat.st_size, stat.st_mtime_ns).encode()
+        )
+        sha1.update(
+            "".join([str(label) for label in annotation_dict["labels"]]).encode()
+        )
+        for key in ("onsets_Hz", "offsets_Hz"):
+            sha1.update(np.asarray(annotation_dict[key], dtype=np.int64).tobytes())
+        return sha1.hexdigest()
+
+    def _shard_path(self, shard_name):
+        return os.path.join(self.shard_dir, shard_name)
+
+    def has(self, annotation_dict):
+        """returns True if features from the audio file in annotation_dict
+        are saved in a shard"""
+        key = self.file_key(annotation_dict)
+        if key not in self.manifest["files"]:
+            return False
+        return os.path.isfile(self._shard_path(self.manifest["files"][key]["shard"]))
+
+    def add(self, annotation_list, extract_dicts):
+        """save features from audio files as a new shard,
+        then add the files to the manifest
+
+        Parameters
+        ----------
+        annotation_list : list
+            of annotation dicts, one for each audio file
+        extract_dicts : list
+            of dicts returned by FeatureExtractor._from_file, one for each
+            annotation dict in annotation_list. May be None for files
+            where no features were extracted.
+        """
+        keys = [self.file_key(annotation_dict) for annotation_dict in annotation_list]
+        shard = dict(zip(keys, extract_dicts))
+        # a shard left by an interrupted run that is not in the manifest yet
+        # has the same name, and is replaced
+        shard_name = "shard_{:06d}.joblib".format(self._next_shard_num)
+        _atomic_write(
+            self._shard_path(shard_name), lambda path: joblib.dump(shard, path)
+        )
+        self._next_shard_num += 1
+
+        for key, annotation_dict in zip(keys, annotation_list):
+            self.manifest["files"][key] = {
+                "filename": os.path.abspath(annotation_dict["filename"]),
+                "shard": shard_name,
+            }
+
+        def _dump_manifest(path):
+            with open(path, "w") as fp:
+                json.dump(self.manifest, fp, indent=2)
+
+        _atomic_write(os.path.join(self.shard_dir, MANIFEST_FILENAME), _dump_manifest)
+
+    def get(self, annotation_dict):
+        """load features extracted from audio file in annotation_dict
+
+        Parameters
+        ----------
+        annotation_dict : dict
+            with keys filename, labels, onsets_Hz, offsets_Hz
+
+        Returns
+        -------
+        extract_dict : dict
+            as returned by FeatureExtractor._from_file
+        """
+        key = self.file_key(annotation_dict)
+        if key not in self.manifest["files"]:
+            raise KeyError(
+                "no shard in {} has features from {}".format(
+                    self.shard_dir, annotation_dict["filename"]
+                )
+            )
+        shard_name = self.manifest["files"][key]["shard"]
+        # keep the last shard loaded, since consecutive files are usually in it
+        if shard_name != self._loaded_shard_name:
+            self._loaded_shard = joblib.load(self._shard_path(shard_name))
+            self._loaded_shard_name = shard_name
+        return self._loaded_shard[key]
+
+    def extract_dicts(self, annotation_list):
+        """generator that yields extract_dict for each annotation dict in
+        annotation_list, loaded from shards. Used to merge shards."""
+        for annotation_dict in annotation_list:
+            yield self.get(annotation_dict)
@@ -0,0 +1,234 @@
+"""on-disk cache of spectrograms made from audio files"""
+import hashlib
+import json
+import os
+from glob import glob
+
+import numpy as np
+
+from ..__about__ import __version__
+
+# arrays saved for each cached spectrogram.
+# "spect" is written last, so an entry only counts as cached once it exists
+ENTRY_ARRAYS = ("freq_bins", "time_bins", "spect")
+
+
+class SpectrogramCache:
+    """cache of spectrograms made from entire audio files, saved in a directory
+    as .npy files so they can be loaded with memory mapping.
+
+    Each spectrogram is keyed by the identity of the audio file and by a hash of
+    the parameters used to make it. By default the identity of a file is its
+    absolute path, size, and modification time; if hash_contents is True, it is a
+    hash of the file's contents, so that copies of the same file share entries.
+
+    Attributes
+    ----------
+    cache_dir : str
+        directory where spectrograms are saved
+    max_size : int
+        maximum size of cache in bytes. When adding a spectrogram makes the cache
+        larger than max_size, the least recently used spectrograms are removed.
+        If None, the size of the cache is not limited.
+    hash_contents : bool
+        if True, identify audio files by a hash of their contents
+    """
+
+    def __init__(self, cache_dir, max_size=None, hash_contents=False):
+        """__init__ for SpectrogramCache
+
+        Parameters
+        ----------
+        cache_dir : str
+            directory where spectrograms are saved. Created if it does not exist.
+        max_size : int
+            maximum size of cache in bytes. Default is None, i.e. no limit.
+        hash_contents : bool
+            if True, identify audio files by a hash of their contents, instead of
+            by path, size, and modification time. Default is False.
+        """
+        if max_size is not None and type(max_size) != int:
+            raise TypeError(
+                "max_size for SpectrogramCache must be an int, not {}".format(
+                    type(max_size)
+                )
+            )
+        self.cache_dir = os.path.abspath(os.path.normpath(cache_dir))
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self.max_size = max_size
+        self.hash_contents = hash_contents
+
+    def _file_ID(self, audio_file):
+        """returns str that identifies an audio file"""
+        if self.hash_contents:
+            sha1 = hashlib.sha1()
+            with open(audio_file, "rb") as fp:
+                for chunk in iter(lambda: fp.read(2**20), b""):
+                    sha1.update(chunk)
+            return sha1.hexdigest()
+        else:
+            stat = os.stat(audio_file)
+            return "{}:{}:{}".format(
+                os.path.abspath(audio_file), stat.st_size, stat.st_mtime_ns
+            )
+
+    def key(self, audio_file, spect_params):
+        """returns key for spectrogram made from audio_file with spect_params
+
+        Parameters
+        ----------
+        audio_file : str
+            path to audio file
+        spect_params : dict
+            parameters for hvc.audiofileIO.Spectrogram
+
+        Returns
+        -------
+        key : str
+            hex digest that is used as prefix of filenames in cache_dir
+        """
+        # canonical form of spect_params, so order of keys does not change the hash
+        params_str = json.dumps(spect_params, sort_keys=True, default=str)
+        key_str = "{}|{}|{}".format(__version__, self._file_ID(audio_file), params_str)
+        return hashlib.sha1(key_str.encode()).hexdigest()
+
+    def _entry_paths(self, key):
+        return {
+            array_name: os.path.join(
+                self.cache_dir, "{}.{}.npy".format(key, array_name)
+            )
+            for array_name in ENTRY_ARRAYS
+        }
+
+    def get(self, audio_file, spect_params):
+        """get cached spectrogram
+
+        Parameters
+        ----------
+        audio_file : str
+            path to audio file
+        spect_params : dict
+            parameters for hvc.audiofileIO.Spectrogram
+
+        Returns
+        -------
+        spect, freq_bins, time_bins : numpy.ndarray
+            as returned by hvc.audiofileIO.Spectrogram.make.
+            spect is a read-only memory map.
+            If spectrogram is not in cache, returns None.
+        """
+        paths = self._entry_paths(self.key(audio_file, spect_params))
+        try:
+            spect = np.load(paths["spect"], mmap_mode="r")
+            freq_bins = np.load(paths["freq_bins"])
+            time_bins = np.load(paths["time_bins"])
+        except (FileNotFoundError, ValueError):
+            # not cached, or was removed by another process while loading
+            return None
+        # update modification time so entry counts as recently used
+        try:
+            os.utime(paths["spect"])
+        except OSError:
+            # removed by another process since loading, or cache is read-only;
+            # spectrogram is still valid, it just isn't marked as recently used
+            pass
+        return spect, freq_bins, time_bins
+
+    def put(self, audio_file, spect_params, spect, freq_bins, time_bins):
+        """add spectrogram to cache,
+        then remove least recently used spectrograms if cache is larger than max_size
+
+        Parameters
+        ----------
+        audio_file : str
+            path to audio file
+        spect_params : dict
+            parameters for hvc.audiofileIO.Spectrogram
+        spect, freq_bins, time_bins : numpy.ndarray
+            as returned by hvc.audiofileIO.Spectrogram.make
+        """
+        paths = self._entry_paths(self.key(audio_file, spect_params))
+        arrays = {"spect": spect, "freq_bins": freq_bins, "time_bins": time_bins}
+        for array_name in ENTRY_ARRAYS:
+            # write to temporary file then rename, so other processes
+            # never load a partially-written array
+            tmp_path = "{}.{}.tmp".format(paths[array_name], os.getpid())
+            with open(tmp_path, "wb") as fp:
+                np.save(fp, arrays[array_name])
+            os.replace(tmp_path, paths[array_name])
+        if self.max_size is not None:
+            self.evict()
+
+    def get_or_make(
+        self, audio_file, spect_params, spectrogram_maker, raw_audio, samp_freq
+    ):
+        """get spectrogram from cache, or make it and add it to the cache
+        if it is not cached already
+
+        Parameters
+        ----------
+        audio_file : str
+            path to audio file
+        spect_params : dict
+            parameters used to make spectrogram_maker
+        spectrogram_maker : hvc.audiofileIO.Spectrogram
+            used to make spectrogram if it is not cached
+        raw_audio : numpy.ndarray
+            audio from audio_file
+        samp_freq : int
+            sampling frequency
+
+        Returns
+        -------
+        spect, freq_bins, time_bins : numpy.ndarray
+            as returned by hvc.audiofileIO.Spectrogram.make
+        """
+        cached = self.get(audio_file, spect_params)
+        if cached is not None:
+            return cached
+        spect, freq_bins, time_bins = spectrogram_maker.make(raw_audio, samp_freq)
+        self.put(audio_file, spect_params, spect, freq_bins, time_bins)
+        return spect, freq_bins, time_bins
+
+    def size(self):
+        """returns total size in bytes of all spectrograms in cache"""
+        return sum(
+            [
+                os.path.getsize(path)
+                for path in glob(os.path.join(self.cache_dir, "*.npy"))
+            ]
+        )
+
+    def evict(self):
+        """remove least recently used spectrograms until cache is
+        no larger than max_size"""
+        if self.max_size is None:
+            return
+        entries = []
+        for spect_path in glob(os.path.join(self.cache_dir, "*.spect.npy")):
+            key = os.path.basename(spect_path).split(".")[0]
+            paths = self._entry_paths(key)
+            try:
+                last_used = os.path.getmtime(spect_path)
+                entry_size = sum(
+                    [
+                        os.path.getsize(path)
+                        for path in paths.values()
+                        if os.path.exists(path)
+                    ]
+                )
+            except FileNotFoundError:
+                continue
+            entries.append((last_used, entry_size, paths))
+        total_size = sum([entry[1] for entry in entries])
+        for last_used, entry_size, paths in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_size:
+                break
+            # remove "spect" first so entry stops counting as cached
+            for array_name in reversed(ENTRY_ARRAYS):
+                try:
+                    os.remove(paths[array_name])
+                except FileNotFoundError:
+                    pass
+            total_size -= entry_size
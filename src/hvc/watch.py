@@ -0,0 +1,266 @@
+"""
+watch directories where audio files are being recorded, and predict labels
+for each new audio file once it has been completely written
+"""
+import json
+import os
+import time
+from glob import glob
+
+from .predict import Predictor
+from .utils import annotation
+
+RECORD_FILENAME = "hvc_watch_record.json"
+
+
+class FolderWatcher:
+    """polls directories for new audio files, segments them and predicts labels
+    with a model that is loaded once, then saves the predictions as .not.mat files.
+
+    A file is only processed once its size and modification time have not changed
+    for settle_time seconds, and, for .cbin files, once its .rec file exists,
+    so files that are still being written by a recording rig are skipped until the
+    next poll.
+
+    Files that have been processed are saved in a record (a .json file), along with
+    their size and modification time, so that if the watcher is restarted it
+    does not process them again. A file is processed again only if it changes,
+    in which case the .not.mat file saved for it by the watcher is replaced.
+
+    Attributes
+    ----------
+    predictor : hvc.predict.Predictor
+        model used to predict labels
+    data_dirs : list
+        of directories that are watched
+    file_format : str
+        format of audio files, {'cbin', 'wav'}
+    output_dir : str
+        alternate directory where .not.mat files are saved if a .not.mat file
+        already exists next to an audio file, as for annotation.make_notmat
+    poll_interval : float
+        time in seconds between polls
+    settle_time : float
+        time in seconds that a file must go without changing before it is processed
+    record_file : str
+        path to .json file with record of processed files
+    record : dict
+        that maps absolute path of each processed audio file to a dict with keys
+        size, mtime_ns, processed_at, and either num_segments and notmat
+        (the path to the .not.mat file saved), or error
+    """
+
+    def __init__(
+        self,
+        model_meta_file,
+        data_dirs,
+        file_format="cbin",
+        output_dir=None,
+        poll_interval=5.0,
+        settle_time=2.0,
+        record_file=None,
+    ):
+        """__init__ for FolderWatcher
+
+        Parameters
+        ----------
+        model_meta_file : str
+            filename of .meta file for model used to predict labels
+        data_dirs : list
+            of directories to watch
+        file_format : str
+            format of audio files, {'cbin', 'wav'}. Default is 'cbin'.
+        output_dir : str
+            alternate directory for .not.mat files. Default is None.
+        poll_interval : float
+            time in seconds between polls. Default is 5.0.
+        settle_time : float
+            time in seconds that a file must go without changing before it is
+            processed. Default is 2.0.
+        record_file : str
+            path to .json file with record of processed files. Default is None,
+            in which case the record is saved as hvc_watch_record.json
+            in output_dir, or in the first directory in data_dirs if
+            output_dir is None.
+        """
+        if type(data_dirs) == str:
+            data_dirs = [data_dirs]
+        for data_dir in data_dirs:
+            if not os.path.isdir(data_dir):
+                raise NotADirectoryError(
+                    "{} is not a directory, can't watch it".format(data_dir)
+                )
+        if file_format not in ("cbin", "wav"):
+            raise ValueError("{} is not a known audio file format".format(file_format))
+
+        self.data_dirs = [os.path.abspath(data_dir) for data_dir in data_dirs]
+        self.file_format = file_format
+        if output_dir is not None:
+            output_dir = os.path.abspath(output_dir)
+            if not os.path.isdir(output_dir):
+                os.makedirs(output_dir)
+        self.output_dir = output_dir
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+
+        if record_file is None:
+            record_dir = output_dir if output_dir is not None else self.data_dirs[0]
+            record_file = os.path.join(record_dir, RECORD_FILENAME)
+        self.record_file = os.path.abspath(record_file)
+        if os.path.isfile(self.record_file):
+            with open(self.record_file) as fp:
+                self.record = json.load(fp)
+        else:
+            self.record = {}
+
+        self.predictor = Predictor(model_meta_file)
+        if not hasattr(self.predictor.feature_extractor, "segmenter"):
+            raise ValueError(
+                "FeatureExtractor for model in {} does not have segmenting "
+                "parameters set, can't segment new audio files".format(model_meta_file)
+            )
+        # size and modification time of each unprocessed file seen at last poll
+        self._last_seen = {}
+
+    def _save_record(self):
+        # write to temporary file then rename, so a watcher that is killed
+        # while saving never leaves a partially-written record
+        tmp_path = "{}.{}.tmp".format(self.record_file, os.getpid())
+        with open(tmp_path, "w") as fp:
+            json.dump(self.record, fp, indent=2)
+        os.replace(tmp_path, self.record_file)
+
+    def is_processed(self, audio_file, stat=None):
+        """returns True if audio_file is in record and has not changed since
+        it was processed"""
+        audio_file = os.path.abspath(audio_file)
+        if audio_file not in self.record:
+            return False
+        if stat is None:
+            stat = os.stat(audio_file)
+        entry = self.record[audio_file]
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def _is_ready(self, audio_file, stat, now):
+        """returns True if audio_file appears to be completely written"""
+        if self.file_format == "cbin":
+            rec_file = audio_file.replace(".cbin", ".rec")
+            if not os.path.isfile(rec_file):
+                return False
+        last_seen = self._last_seen.get(audio_file, None)
+        self._last_seen[audio_file] = (stat.st_size, stat.st_mtime_ns)
+        if last_seen != (stat.st_size, stat.st_mtime_ns):
+            # new, or changed since last poll
+            return False
+        return now - stat.st_mtime >= self.settle_time
+
+    def new_files(self):
+        """returns list of audio files in data_dirs that have not been processed
+        and are completely written, sorted by modification time"""
+        now = time.time()
+        ready = []
+        for data_dir in self.data_dirs:
+            for audio_file in glob(os.path.join(data_dir, "*." + self.file_format)):
+                try:
+                    stat = os.stat(audio_file)
+                except FileNotFoundError:
+                    # removed since glob
+                    continue
+                if self.is_processed(audio_file, stat):
+                    continue
+                if self._is_ready(audio_file, stat, now):
+                    ready.append((stat.st_mtime_ns, audio_file))
+        return [audio_file for _, audio_file in sorted(ready)]
+
+    def process(self, audio_file):
+        """segment audio_file, predict labels, save .not.mat file,
+        and add audio_file to record
+
+        Parameters
+        ----------
+        audio_file : str
+            path to audio file
+
+        Returns
+        -------
+        entry : dict
+            added to record for audio_file
+        """
+        audio_file = os.path.abspath(audio_file)
+        stat = os.stat(audio_file)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "processed_at": time.time(),
+        }
+        try:
+            previous_notmat = self.record.get(audio_file, {}).get("notmat", None)
+            if previous_notmat is not None and os.path.isfile(previous_notmat):
+                # file changed since the watcher saved this .not.mat for it;
+                # remove it so make_notmat saves the new one in the same place
+                os.remove(previous_notmat)
+            file_predictions = self.predictor.predict_audio(filename=audio_file)
+            segment_params = self.predictor.feature_extractor.segment_params
+            entry["notmat"] = annotation.make_notmat(
+                filename=audio_file,
+                labels=file_predictions["pred_labels"],
+                onsets_Hz=file_predictions["onsets_Hz"],
+                offsets_Hz=file_predictions["offsets_Hz"],
+                samp_freq=file_predictions["samp_freq"],
+                threshold=segment_params["threshold"],
+                min_syl_dur=segment_params["min_syl_dur"],
+                min_silent_dur=segment_params["min_silent_dur"],
+                clf_file=self.predictor.model_filename,
+                alternate_path=self.output_dir,
+            )
+            entry["num_segments"] = int(file_predictions["onsets_Hz"].shape[0])
+        except Exception as err:
+            # record error so that a file that can't be processed, e.g. because
+            # it is corrupted, is not retried on every poll
+            entry["error"] = "{}: {}".format(type(err).__name__, err)
+            print("could not process {}, {}".format(audio_file, entry["error"]))
+        self.record[audio_file] = entry
+        self._last_seen.pop(audio_file, None)
+        self._save_record()
+        return entry
+
+    def poll(self):
+        """process all new audio files that are completely written
+
+        Returns
+        -------
+        processed : list
+            of audio files processed
+        """
+        processed = []
+        for audio_file in self.new_files():
+            entry = self.process(audio_file)
+            if "error" not in entry:
+                print(
+                    "labeled {} segments in {}".format(
+                        entry["num_segments"], audio_file
+                    )
+                )
+            processed.append(audio_file)
+        return processed
+
+    def run(self, max_polls=None):
+        """poll data_dirs every poll_interval seconds until interrupted
+
+        Parameters
+        ----------
+        max_polls : int
+            number of times to poll before returning. Default is None,
+            i.e. poll until interrupted with Ctrl-C.
+        """
+        print("watching {} for new .{} files".format(self.data_dirs, self.file_format))
+        num_polls = 0
+        try:
+            while max_polls is None or num_polls < max_polls:
+                tic = time.time()
+                self.poll()
+                num_polls += 1
+                if max_polls is None or num_polls < max_polls:
+                    time.sleep(max(self.poll_interval - (time.time() - tic), 0))
+        except KeyboardInterrupt:
+            print("stopped watching")
@@ -158,7 +158,7 @@ def run_main_workflow(tmp_output_dir, script_tuple_dict, configs_path):
         predict_output_dir = predict_outputs[-1]  # [-1] is newest dir, after sort
         feature_files = glob(os.path.join(predict_output_dir, "feature*"))
         for ftr_filename in feature_files:
-            ftr_file = joblib.load(ftr_filename)
+            ftr_file = hvc.utils.load_feature_file(ftr_filename)
             assert "pred_labels" in ftr_file
             if "predict_proba_True" in extract_config_filename:
                 assert "pred_probs" in ftr_file
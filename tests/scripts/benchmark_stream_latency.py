@@ -0,0 +1,157 @@
+"""benchmark latency of hvc.stream.StreamingClassifier,
+using audio files as a stand-in for a live stream.
+
+Audio is fed to the classifier in blocks, as it would arrive from a sound card.
+Latency of each syllable label is measured from the end of the syllable
+(its offset) until the label is returned, and has two parts:
+  - buffering, i.e. time until the block with the sample where the offset is
+    detected has been recorded. Depends on block size, filter delay,
+    min_silent_dur, and lookahead.
+  - compute, i.e. time spent processing that block, including segmenting and
+    predicting the label.
+With --realtime, blocks are fed at the rate they would be recorded, and latency
+is measured with the wall clock instead.
+
+Example:
+$ python tests/scripts/benchmark_stream_latency.py \
+    tests/data_for_tests/model_files/knn.meta \
+    tests/data_for_tests/cbins/gy6or6/032412/*.cbin
+"""
+import argparse
+import time
+
+import numpy as np
+
+import hvc.audiofileIO
+from hvc.predict import Predictor
+from hvc.stream import StreamingClassifier
+
+
+class FileAudioSource:
+    """yields blocks of samples from audio files, one after another,
+    like a continuous stream"""
+
+    def __init__(self, audio_files, block_size, realtime=False):
+        self.audio_files = audio_files
+        self.block_size = block_size
+        self.realtime = realtime
+        self.samp_freq = hvc.audiofileIO.load_audio(audio_files[0])[1]
+
+    def __iter__(self):
+        start_time = time.perf_counter()
+        num_samples = 0
+        for audio_file in self.audio_files:
+            raw_audio, samp_freq = hvc.audiofileIO.load_audio(audio_file, mmap=False)
+            if samp_freq != self.samp_freq:
+                raise ValueError(
+                    "sampling frequency of {} is {}, expected {}".format(
+                        audio_file, samp_freq, self.samp_freq
+                    )
+                )
+            for block_start in range(0, raw_audio.shape[0], self.block_size):
+                block = raw_audio[block_start : block_start + self.block_size]
+                num_samples += block.shape[0]
+                if self.realtime:
+                    # wait until block would have been recorded
+                    recorded_at = start_time + num_samples / self.samp_freq
+                    time.sleep(max(recorded_at - time.perf_counter(), 0))
+                yield block
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model_meta_file")
+    parser.add_argument("audio_files", nargs="+")
+    parser.add_argument(
+        "--block-ms", type=float, default=4.0, help="duration of each block in ms"
+    )
+    parser.add_argument(
+        "--numtaps",
+        type=int,
+        default=512,
+        help="order of bandpass filter; smaller values reduce latency",
+    )
+    parser.add_argument(
+        "--lookahead",
+        type=int,
+        default=0,
+        help="number of following syllables to wait for before classifying "
+        "a syllable, for models with features of the following syllable",
+    )
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="feed blocks at the rate they would be recorded",
+    )
+    args = parser.parse_args()
+
+    print("loading model")
+    predictor = Predictor(args.model_meta_file)
+    source = FileAudioSource(args.audio_files, block_size=1, realtime=args.realtime)
+    samp_freq = source.samp_freq
+    source.block_size = max(int(round(samp_freq * args.block_ms / 1000)), 1)
+    classifier = StreamingClassifier(
+        predictor, samp_freq, lookahead=args.lookahead, numtaps=args.numtaps
+    )
+
+    # warm up, so first prediction doesn't include one-time costs
+    classifier.process(np.zeros((source.block_size,)))
+
+    start_time = time.perf_counter()
+    stream_start = classifier.segmenter.num_processed
+    buffering, compute, total = [], [], []
+    block_compute = []
+    for block in source:
+        tic = time.perf_counter()
+        events = classifier.process(block)
+        toc = time.perf_counter()
+        block_compute.append(toc - tic)
+        for event in events:
+            if event["event"] != "offset":
+                continue
+            # time from offset until block where offset was detected was recorded
+            block_end = classifier.segmenter.num_processed
+            buffering.append((block_end - event["offset_Hz"]) / samp_freq)
+            compute.append(toc - tic)
+            if args.realtime:
+                offset_time = start_time + (event["offset_Hz"] - stream_start) / (
+                    samp_freq
+                )
+                total.append(toc - offset_time)
+            else:
+                total.append(buffering[-1] + compute[-1])
+
+    print(
+        "labeled {} syllables in {:.1f} s of audio, block size {} samples "
+        "({:.1f} ms), filter delay {:.1f} ms".format(
+            len(total),
+            (classifier.segmenter.num_processed - stream_start) / samp_freq,
+            source.block_size,
+            source.block_size / samp_freq * 1e3,
+            classifier.segmenter.delay / samp_freq * 1e3,
+        )
+    )
+    print(
+        "mean time to process one block: {:.3f} ms".format(np.mean(block_compute) * 1e3)
+    )
+    for name, latencies in (
+        ("buffering", buffering),
+        ("compute", compute),
+        ("end-to-end", total),
+    ):
+        if len(latencies) == 0:
+            continue
+        latencies = np.asarray(latencies) * 1e3
+        print(
+            "{:>10} latency (ms): p50 {:.2f}, p95 {:.2f}, p99 {:.2f}, max {:.2f}".format(
+                name,
+                np.percentile(latencies, 50),
+                np.percentile(latencies, 95),
+                np.percentile(latencies, 99),
+                latencies.max(),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
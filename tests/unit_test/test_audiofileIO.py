@@ -271,3 +271,134 @@ class TestAudiofileIO:
             annotation_dict["offsets_Hz"],
         )
         assert syls[index].spect is np.nan
+
+    def test_make_syls_whole_file_spect(self, test_data_dir):
+        """test that spectrograms from whole_file_spect=True match those made
+        from each syllable, when audio is not filtered and onsets are aligned
+        with columns of the whole-file spectrogram"""
+        cbin = os.path.join(
+            test_data_dir,
+            os.path.normpath(
+                "cbins/gy6or6/032412/" "gy6or6_baseline_240312_0811.1165.cbin"
+            ),
+        )
+        raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+        spect_params = hvc.parse.ref_spect_params.refs_dict["koumura"]
+        spect_maker = hvc.audiofileIO.Spectrogram(**spect_params)
+        annot_dict = annotation.notmat_to_annot_dict(cbin + ".not.mat")
+        step = spect_maker.nperseg - spect_maker.noverlap
+        onsets_Hz = (annot_dict["onsets_Hz"] // step) * step
+        offsets_Hz = annot_dict["offsets_Hz"]
+        syls = hvc.audiofileIO.make_syls(
+            raw_audio,
+            samp_freq,
+            spect_maker,
+            annot_dict["labels"],
+            onsets_Hz,
+            offsets_Hz,
+        )
+        syls_whole = hvc.audiofileIO.make_syls(
+            raw_audio,
+            samp_freq,
+            spect_maker,
+            annot_dict["labels"],
+            onsets_Hz,
+            offsets_Hz,
+            whole_file_spect=True,
+        )
+        assert len(syls) == len(syls_whole)
+        for syl, syl_whole in zip(syls, syls_whole):
+            if syl.spect is np.nan:
+                # too short for a window; whole-file mode still gives one column
+                assert syl_whole.spect.shape[-1] == 1
+                continue
+            assert np.allclose(syl.spect, syl_whole.spect)
+            assert np.allclose(syl.freqBins, syl_whole.freqBins)
+            assert np.allclose(syl.timeBins, syl_whole.timeBins)
+
+        # with filtering and unaligned onsets, number of columns
+        # should differ by at most one
+        spect_params = hvc.parse.ref_spect_params.refs_dict["tachibana"]
+        spect_maker = hvc.audiofileIO.Spectrogram(**spect_params)
+        for syl_spect_width in (-1, 0.3):
+            syls = hvc.audiofileIO.make_syls(
+                raw_audio,
+                samp_freq,
+                spect_maker,
+                annot_dict["labels"],
+                annot_dict["onsets_Hz"],
+                annot_dict["offsets_Hz"],
+                syl_spect_width=syl_spect_width,
+            )
+            syls_whole = hvc.audiofileIO.make_syls(
+                raw_audio,
+                samp_freq,
+                spect_maker,
+                annot_dict["labels"],
+                annot_dict["onsets_Hz"],
+                annot_dict["offsets_Hz"],
+                syl_spect_width=syl_spect_width,
+                whole_file_spect=True,
+            )
+            for syl, syl_whole in zip(syls, syls_whole):
+                if syl.spect is np.nan:
+                    continue
+                assert syl.spect.shape[0] == syl_whole.spect.shape[0]
+                assert abs(syl.spect.shape[1] - syl_whole.spect.shape[1]) <= 1
+
+    def test_make_syls_precomputed_spect(self, test_data_dir):
+        """test that passing a precomputed whole-file spectrogram gives the
+        same syllables as computing it in make_syls"""
+        cbin = os.path.join(
+            test_data_dir,
+            os.path.normpath(
+                "cbins/gy6or6/032412/" "gy6or6_baseline_240312_0811.1165.cbin"
+            ),
+        )
+        raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+        spect_params = hvc.parse.ref_spect_params.refs_dict["tachibana"]
+        spect_maker = hvc.audiofileIO.Spectrogram(**spect_params)
+        annot_dict = annotation.notmat_to_annot_dict(cbin + ".not.mat")
+        for syl_spect_width in (-1, 0.3):
+            make_syls_kwargs = dict(
+                raw_audio=raw_audio,
+                samp_freq=samp_freq,
+                spect_maker=spect_maker,
+                labels=annot_dict["labels"],
+                onsets_Hz=annot_dict["onsets_Hz"],
+                offsets_Hz=annot_dict["offsets_Hz"],
+                syl_spect_width=syl_spect_width,
+                whole_file_spect=True,
+            )
+            syls = hvc.audiofileIO.make_syls(**make_syls_kwargs)
+            syls_precomputed = hvc.audiofileIO.make_syls(
+                **make_syls_kwargs,
+                precomputed_spect=spect_maker.make(raw_audio, samp_freq),
+            )
+            assert len(syls) == len(syls_precomputed)
+            for syl, syl_precomputed in zip(syls, syls_precomputed):
+                assert np.array_equal(syl.spect, syl_precomputed.spect)
+                assert np.array_equal(syl.freqBins, syl_precomputed.freqBins)
+                assert np.array_equal(syl.timeBins, syl_precomputed.timeBins)
+            if syl_spect_width > 0:
+                assert len(set([syl.spect.shape for syl in syls_precomputed])) == 1
+
+    def test_load_audio(self, test_data_dir):
+        cbin = glob(
+            os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032312/*.cbin"))
+        )[0]
+        cbin_audio, cbin_fs = evfuncs.load_cbin(cbin)
+        wav = os.path.join(test_data_dir, os.path.normpath("koumura/Bird0/Wave/0.wav"))
+        wav_fs, wav_audio = wavfile.read(wav)
+        for mmap in (True, False):
+            raw_audio, samp_freq = hvc.audiofileIO.load_audio(cbin, mmap=mmap)
+            assert samp_freq == cbin_fs
+            assert raw_audio.dtype == cbin_audio.dtype
+            assert np.array_equal(raw_audio, cbin_audio)
+            raw_audio, samp_freq = hvc.audiofileIO.load_audio(wav, mmap=mmap)
+            assert samp_freq == wav_fs
+            assert np.array_equal(raw_audio, wav_audio)
+        raw_audio, _ = hvc.audiofileIO.load_audio(cbin)
+        assert isinstance(raw_audio, np.memmap)
+        with pytest.raises(ValueError):
+            hvc.audiofileIO.load_audio(cbin.replace(".cbin", ".rec"))
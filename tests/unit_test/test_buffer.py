@@ -0,0 +1,46 @@
+"""
+test features.buffer module
+"""
+import os
+
+import numpy as np
+import pytest
+import yaml
+
+import hvc.audiofileIO
+from hvc.features.buffer import feature_column_widths, FeatureBuffer
+from hvc.parse.ref_spect_params import refs_dict
+
+
+class TestFeatureBuffer:
+    def test_append(self):
+        rng = np.random.default_rng(0)
+        chunks = [rng.random((num_rows, 3)) for num_rows in (2, 5, 1, 9)]
+        buffer = FeatureBuffer(3, initial_num_rows=2)
+        for chunk in chunks:
+            buffer.append(chunk)
+        assert buffer.num_rows == 17
+        assert np.array_equal(buffer.to_array(), np.concatenate(chunks))
+
+    def test_wrong_num_columns_raises(self):
+        buffer = FeatureBuffer(3)
+        with pytest.raises(ValueError):
+            buffer.append(np.zeros((2, 4)))
+
+
+def test_feature_column_widths(hvc_source_dir):
+    with open(
+        os.path.join(hvc_source_dir, os.path.normpath("parse/feature_groups.yml"))
+    ) as ftr_grp_yaml:
+        ftr_grps = yaml.load(ftr_grp_yaml, Loader=yaml.FullLoader)
+    samp_freq = 32000
+    for ref in ("tachibana", "koumura", "evsonganaly"):
+        spect_maker = hvc.audiofileIO.Spectrogram(**refs_dict[ref])
+        raw_audio = np.random.default_rng(0).normal(size=samp_freq // 10)
+        spect, freq_bins, _ = spect_maker.make(raw_audio, samp_freq)
+        widths = feature_column_widths(
+            ftr_grps["svm"] + ["flatwindow"], spect_maker, samp_freq
+        )
+        assert widths[0] == spect.shape[0] - 1  # mean spectrum
+        assert widths[-1] == 0  # neural net inputs are not in features array
+        assert np.all(widths[4:-1] == 1)
@@ -0,0 +1,121 @@
+"""tests for hvc.utils.cross_val module"""
+import os
+
+import numpy as np
+import pytest
+from sklearn.model_selection import StratifiedKFold
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC
+
+import hvc.utils
+from hvc.utils.cross_val import SongFolds, song_stratified_folds
+
+
+@pytest.fixture
+def svm_samples(test_data_dir):
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "svm.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    song_IDs = np.asarray(feature_file["songfile_IDs"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    return features[not_nan], labels[not_nan], song_IDs[not_nan]
+
+
+def test_song_stratified_folds(svm_samples):
+    _, labels, song_IDs = svm_samples
+    folds = song_stratified_folds(labels, song_IDs, n_splits=4, seed=42)
+    assert len(folds) == 4
+    all_test_inds = np.concatenate([test_inds for _, test_inds in folds])
+    # every sample is in exactly one test set
+    assert np.array_equal(np.sort(all_test_inds), np.arange(labels.shape[0]))
+    for train_inds, test_inds in folds:
+        assert np.array_equal(
+            np.sort(np.concatenate((train_inds, test_inds))),
+            np.arange(labels.shape[0]),
+        )
+        # no song is in both training and test set
+        assert not set(song_IDs[train_inds]) & set(song_IDs[test_inds])
+    # folds are stratified: most common label is most common in every fold
+    labelset, counts = np.unique(labels, return_counts=True)
+    most_common = labelset[np.argmax(counts)]
+    for _, test_inds in folds:
+        test_labels, test_counts = np.unique(labels[test_inds], return_counts=True)
+        assert test_labels[np.argmax(test_counts)] == most_common
+    # same seed, same folds
+    for (_, test_inds), (_, test_inds_again) in zip(
+        folds, song_stratified_folds(labels, song_IDs, n_splits=4, seed=42)
+    ):
+        assert np.array_equal(test_inds, test_inds_again)
+    with pytest.raises(ValueError):
+        song_stratified_folds(labels, song_IDs, n_splits=np.unique(song_IDs).size + 1)
+
+
+class TestSongFolds:
+    def test_folds_without_song_IDs(self, svm_samples):
+        features, labels, _ = svm_samples
+        song_folds = SongFolds(features, labels, n_splits=5)
+        expected = StratifiedKFold(n_splits=5).split(features, labels)
+        for (train_inds, test_inds), (expected_train, expected_test) in zip(
+            song_folds.folds, expected
+        ):
+            assert np.array_equal(train_inds, expected_train)
+            assert np.array_equal(test_inds, expected_test)
+
+    def test_fold(self, svm_samples):
+        features, labels, song_IDs = svm_samples
+        song_folds = SongFolds(features, labels, song_IDs, n_splits=4)
+        X_train, y_train, X_test, y_test = song_folds.fold(0)
+        train_inds, test_inds = song_folds.folds[0]
+        # scaled with training set of fold
+        assert np.allclose(X_train.mean(axis=0), 0)
+        assert not np.allclose(X_test.mean(axis=0), 0)
+        assert np.array_equal(y_train, labels[train_inds])
+        assert np.array_equal(y_test, labels[test_inds])
+        # scaled once and cached
+        assert song_folds.fold(0)[0] is X_train
+
+        sample_IDs = song_folds.subsample(200, seed=42)
+        X_train_sub, y_train_sub, X_test_sub, y_test_sub = song_folds.fold(
+            0, sample_IDs
+        )
+        train_mask = np.isin(train_inds, sample_IDs)
+        assert np.array_equal(X_train_sub, X_train[train_mask])
+        assert np.array_equal(y_train_sub, labels[train_inds[train_mask]])
+        assert X_test_sub.shape[0] == np.isin(test_inds, sample_IDs).sum()
+
+    def test_subsample(self, svm_samples):
+        features, labels, song_IDs = svm_samples
+        song_folds = SongFolds(features, labels, song_IDs, n_splits=4)
+        sample_IDs = song_folds.subsample(200, seed=42)
+        assert sample_IDs.shape == (200,)
+        # same number of samples from test set of each fold
+        for _, test_inds in song_folds.folds:
+            assert np.isin(test_inds, sample_IDs).sum() == 50
+        assert np.array_equal(sample_IDs, song_folds.subsample(200, seed=42))
+
+    def test_score_svm_rbf(self, svm_samples):
+        features, labels, song_IDs = svm_samples
+        song_folds = SongFolds(features, labels, song_IDs, n_splits=3)
+        candidates = [
+            {"C": C, "gamma": gamma} for C in (1.0, 10.0) for gamma in (1e-3, 1e-2)
+        ]
+        scores = song_folds.score_svm_rbf(candidates, n_jobs=2)
+        expected = song_folds.score(
+            [SVC(C=cand["C"], gamma=cand["gamma"]) for cand in candidates]
+        )
+        assert scores.shape == (4, 3)
+        assert np.array_equal(scores, expected)
+
+    def test_score_knn(self, svm_samples):
+        features, labels, song_IDs = svm_samples
+        song_folds = SongFolds(features, labels, song_IDs, n_splits=3)
+        sample_IDs = song_folds.subsample(300, seed=42)
+        scores = song_folds.score_knn(range(1, 6), sample_IDs=sample_IDs)
+        expected = song_folds.score(
+            [KNeighborsClassifier(k, weights="distance") for k in range(1, 6)],
+            sample_IDs=sample_IDs,
+        )
+        assert scores.shape == (5, 3)
+        assert np.allclose(scores, expected)
@@ -86,7 +86,7 @@ class TestExtract:
             ftr_files = glob("features_from*")
             ftr_dicts = []
             for ftr_file in ftr_files:
-                ftr_dicts.append(joblib.load(ftr_file))
+                ftr_dicts.append(hvc.utils.load_feature_file(ftr_file))
 
             if any(["features" in ftr_dict for ftr_dict in ftr_dicts]):
                 assert all(["features" in ftr_dict for ftr_dict in ftr_dicts])
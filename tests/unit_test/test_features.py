@@ -127,3 +127,101 @@ class TestFromFile:
                     "neither features_arr or neuralnet_inputs_dict "
                     "were returned by FeatureExtractor"
                 )
+
+
+class TestExtract:
+    def test_n_jobs(self, hvc_source_dir, test_data_dir):
+        """tests that extracting with several processes gives the same
+        result as extracting serially"""
+        with open(
+            os.path.join(hvc_source_dir, os.path.normpath("parse/feature_groups.yml"))
+        ) as ftr_grp_yaml:
+            ftr_grps = yaml.load(ftr_grp_yaml, Loader=yaml.FullLoader)
+        fe = hvc.features.extract.FeatureExtractor(
+            spect_params=refs_dict["evsonganaly"],
+            feature_list=ftr_grps["knn"],
+        )
+        data_dirs = [
+            os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))
+        ]
+        extract_kwargs = dict(
+            labels_to_use="iabcdefghjk",
+            data_dirs=data_dirs,
+            file_format="cbin",
+            save_features=False,
+        )
+        serial = fe.extract(n_jobs=1, **extract_kwargs)
+        parallel = fe.extract(n_jobs=2, **extract_kwargs)
+        assert serial["labels"] == parallel["labels"]
+        assert np.array_equal(serial["features"], parallel["features"], equal_nan=True)
+
+    def test_prefetch_depth(self, hvc_source_dir, test_data_dir):
+        """tests that prefetching audio files gives the same result
+        as loading each file when features are extracted from it"""
+        with open(
+            os.path.join(hvc_source_dir, os.path.normpath("parse/feature_groups.yml"))
+        ) as ftr_grp_yaml:
+            ftr_grps = yaml.load(ftr_grp_yaml, Loader=yaml.FullLoader)
+        fe = hvc.features.extract.FeatureExtractor(
+            spect_params=refs_dict["evsonganaly"],
+            feature_list=ftr_grps["knn"],
+        )
+        data_dirs = [
+            os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))
+        ]
+        extract_kwargs = dict(
+            labels_to_use="iabcdefghjk",
+            data_dirs=data_dirs,
+            file_format="cbin",
+            save_features=False,
+        )
+        no_prefetch = fe.extract(prefetch_depth=0, **extract_kwargs)
+        num_items = fe.io_stats["num_items"]
+        prefetch = fe.extract(prefetch_depth=3, **extract_kwargs)
+        assert no_prefetch["labels"] == prefetch["labels"]
+        assert np.array_equal(
+            no_prefetch["features"], prefetch["features"], equal_nan=True
+        )
+        assert fe.io_stats["depth"] == 3
+        assert fe.io_stats["num_items"] == num_items
+
+
+def test_single_syl_features_intermediates(test_data_dir):
+    """tests that each feature only uses the intermediate values
+    declared for it in feature_dicts, and that cached values
+    give the same result as computing the feature from scratch"""
+    from hvc.features.feature_dicts import (
+        single_syl_features_switch_case_dict,
+        single_syl_features_intermediates,
+    )
+
+    cbin = os.path.join(
+        test_data_dir,
+        os.path.normpath(
+            "cbins/gy6or6/032412/" "gy6or6_baseline_240312_0811.1165.cbin"
+        ),
+    )
+    raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+    annotation_dict = annotation.notmat_to_annot_dict(cbin + ".not.mat")
+    spect_maker = hvc.audiofileIO.Spectrogram(**refs_dict["tachibana"])
+    make_syl = lambda: hvc.audiofileIO.make_syls(
+        raw_audio,
+        samp_freq,
+        spect_maker,
+        annotation_dict["labels"][:1],
+        annotation_dict["onsets_Hz"][:1],
+        annotation_dict["offsets_Hz"][:1],
+    )[0]
+
+    assert set(single_syl_features_intermediates) == set(
+        single_syl_features_switch_case_dict
+    )
+    shared_syl = make_syl()
+    for feature, feature_func in single_syl_features_switch_case_dict.items():
+        syl = make_syl()
+        ftr = feature_func(syl)
+        assert set(syl._intermediates) <= set(
+            single_syl_features_intermediates[feature]
+        )
+        # computing from intermediates cached by other features gives same result
+        assert np.array_equal(ftr, feature_func(shared_syl))
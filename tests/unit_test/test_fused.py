@@ -0,0 +1,62 @@
+"""
+test features.fused module
+"""
+import os
+
+import evfuncs
+import numpy as np
+
+import hvc.audiofileIO
+from hvc.features.feature_dicts import single_syl_features_switch_case_dict
+from hvc.features.fused import fused_features, fused_features_list
+from hvc.parse.ref_spect_params import refs_dict
+from hvc.utils import annotation
+
+
+def test_fused_features(test_data_dir):
+    """test that features computed for all syllables at once are the same as
+    those computed from each syllable's columns of the whole-file spectrogram"""
+    cbin = os.path.join(
+        test_data_dir,
+        os.path.normpath(
+            "cbins/gy6or6/032412/" "gy6or6_baseline_240312_0811.1165.cbin"
+        ),
+    )
+    raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+    annot_dict = annotation.notmat_to_annot_dict(cbin + ".not.mat")
+    for ref in ("tachibana", "koumura"):
+        spect_maker = hvc.audiofileIO.Spectrogram(**refs_dict[ref])
+        file_spect = spect_maker.make(raw_audio, samp_freq)
+        syls = hvc.audiofileIO.make_syls(
+            raw_audio,
+            samp_freq,
+            spect_maker,
+            annot_dict["labels"],
+            annot_dict["onsets_Hz"],
+            annot_dict["offsets_Hz"],
+            whole_file_spect=True,
+            precomputed_spect=file_spect,
+        )
+        starts, stops = hvc.audiofileIO.segment_spect_columns(
+            annot_dict["onsets_Hz"],
+            annot_dict["offsets_Hz"],
+            file_spect[0].shape[-1],
+            spect_maker.nperseg,
+            spect_maker.noverlap,
+        )
+        fused = fused_features(
+            fused_features_list,
+            file_spect[0],
+            file_spect[1],
+            spect_maker.nperseg,
+            starts,
+            stops,
+        )
+        assert sorted(fused.keys()) == sorted(fused_features_list)
+        for feature, ftrs in fused.items():
+            assert ftrs.shape[0] == len(syls)
+            for syl, ftr in zip(syls, ftrs):
+                expected = single_syl_features_switch_case_dict[feature](syl)
+                # fused features are accumulated in float64, so allow for
+                # rounding error in means of float32 spectrograms
+                assert np.allclose(ftr, expected, atol=1e-4, equal_nan=True), feature
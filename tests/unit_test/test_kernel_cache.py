@@ -0,0 +1,80 @@
+"""tests for hvc.utils.kernel_cache module"""
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+import hvc.utils
+from hvc.utils.kernel_cache import RBFKernelCache
+
+
+@pytest.fixture
+def svm_samples(test_data_dir):
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "svm.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    features, labels = features[not_nan], labels[not_nan]
+    scaler = StandardScaler().fit(features[::2])
+    return (
+        scaler.transform(features[::2]),
+        labels[::2],
+        scaler.transform(features[1::2]),
+    )
+
+
+class TestRBFKernelCache:
+    def test_same_as_svc(self, svm_samples, tmp_path):
+        train, train_labels, test = svm_samples
+        kernel_cache = RBFKernelCache(train, test)
+        for C in (0.1, 1, 10):
+            clf, pred_labels = kernel_cache.fit_predict(
+                SVC(C=C, gamma=0.01, decision_function_shape="ovr"), train_labels
+            )
+            expected = SVC(C=C, gamma=0.01, decision_function_shape="ovr").fit(
+                train, train_labels
+            )
+            assert np.array_equal(pred_labels, expected.predict(test))
+            # model predicts from features, also after it is saved and loaded
+            assert clf.kernel == "rbf"
+            assert np.array_equal(clf.classes_, expected.classes_)
+            model_filename = str(tmp_path / "svm_C{}.model".format(C))
+            joblib.dump(clf, model_filename)
+            clf = joblib.load(model_filename)
+            assert np.array_equal(clf.predict(test), pred_labels)
+            assert np.allclose(
+                clf.decision_function(test), expected.decision_function(test)
+            )
+        # kernels computed once
+        assert list(kernel_cache._kernels.keys()) == [0.01]
+
+    def test_max_size(self, svm_samples):
+        train, train_labels, test = svm_samples
+        kernel_cache = RBFKernelCache(train, test)
+        # room for kernels for one gamma
+        kernel_cache.max_size = kernel_cache.kernel_size * 1.5
+        assert kernel_cache.fits()
+        kernel_cache.kernels(0.01)
+        kernel_cache.kernels(0.02)
+        assert list(kernel_cache._kernels.keys()) == [0.02]
+
+        kernel_cache.max_size = kernel_cache.kernel_size / 2
+        assert not kernel_cache.fits()
+        with pytest.raises(ValueError):
+            kernel_cache.kernels(0.03)
+
+    def test_predict_proba(self, svm_samples):
+        train, train_labels, test = svm_samples
+        kernel_cache = RBFKernelCache(train, test)
+        clf, _ = kernel_cache.fit_predict(
+            SVC(C=1, gamma=0.01, probability=True, random_state=0), train_labels
+        )
+        expected = SVC(C=1, gamma=0.01, probability=True, random_state=0).fit(
+            train, train_labels
+        )
+        assert np.allclose(clf.predict_proba(test), expected.predict_proba(test))
@@ -0,0 +1,67 @@
+"""tests for hvc.utils.knn_graph module"""
+import os
+
+import numpy as np
+import pytest
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+import hvc.utils
+from hvc.utils.knn_graph import KNeighborsGraph
+
+
+@pytest.fixture
+def knn_samples(test_data_dir):
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "knn.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    features = StandardScaler().fit_transform(features[not_nan])
+    return features, labels[not_nan]
+
+
+class TestKNeighborsGraph:
+    def test_same_as_kneighbors_classifier(self, knn_samples):
+        features, labels = knn_samples
+        train, test = features[::2], features[1::2]
+        train_labels, test_labels = labels[::2], labels[1::2]
+        # small chunk_size so distances are computed in more than one chunk
+        knn_graph = KNeighborsGraph(train, train_labels, test, 10, chunk_size=37)
+        k_range = range(1, 11)
+        pred_labels = knn_graph.predict_k_range(k_range)
+        scores = knn_graph.score(test_labels, k_range)
+        for k_ind, k in enumerate(k_range):
+            clf = KNeighborsClassifier(k, weights="distance").fit(train, train_labels)
+            assert np.array_equal(pred_labels[k_ind], clf.predict(test))
+            assert scores[k_ind] == clf.score(test, test_labels)
+
+    def test_zero_distance(self, knn_samples):
+        # test samples that are also in training set,
+        # with a different label, are only predicted from that sample
+        features, labels = knn_samples
+        train = np.concatenate((features[::2], features[1:10:2]))
+        train_labels = np.concatenate((labels[::2], labels[1:10:2][::-1]))
+        knn_graph = KNeighborsGraph(train, train_labels, features[1::2], 5)
+        assert np.all(knn_graph.distances[:5, 0] == 0)
+        for k in (1, 3, 5):
+            clf = KNeighborsClassifier(k, weights="distance").fit(train, train_labels)
+            assert np.array_equal(knn_graph.predict(k), clf.predict(features[1::2]))
+
+    def test_train_mask(self, knn_samples):
+        features, labels = knn_samples
+        train, test = features[::2], features[1::2]
+        train_labels = labels[::2]
+        train_mask = np.zeros((train.shape[0],), dtype=bool)
+        train_mask[::3] = True
+        knn_graph = KNeighborsGraph(train, train_labels, test, 7, train_mask=train_mask)
+        assert np.all(train_mask[knn_graph.indices])
+        clf = KNeighborsClassifier(7, weights="distance").fit(
+            train[train_mask], train_labels[train_mask]
+        )
+        assert np.array_equal(knn_graph.predict(7), clf.predict(test))
+        with pytest.raises(ValueError):
+            KNeighborsGraph(
+                train, train_labels, test, train_mask.sum() + 1, train_mask=train_mask
+            )
@@ -296,5 +296,47 @@ class TestParseSelect:
                 test_yaml["invalid_dict_with_feature_group_and_list"], index=0
             )
 
+    def test_validate_early_stopping(self):
+        early_stopping = hvc.parse.select._validate_early_stopping({"tol": 0.01})
+        assert early_stopping == {
+            "tol": 0.01,
+            "patience": 1,
+            "max_std": 0.02,
+            "max_replicates": None,
+        }
+        with pytest.raises(KeyError):
+            hvc.parse.select._validate_early_stopping({"tolerance": 0.01})
+        with pytest.raises(ValueError):
+            hvc.parse.select._validate_early_stopping({"patience": 0})
+        with pytest.raises(ValueError):
+            hvc.parse.select._validate_early_stopping({"max_std": -1})
+        with pytest.raises(TypeError):
+            hvc.parse.select._validate_early_stopping(0.01)
+
+    def test_validate_search(self):
+        search = hvc.parse.select._validate_search(
+            {"model_name": "svm", "feature_group": "svm", "C_range": [1, 10.0]}
+        )
+        assert search == {
+            "model_name": "svm",
+            "feature_group": "svm",
+            "C_range": [1, 10.0],
+            "predict_proba": False,
+        }
+        with pytest.raises(ValueError):
+            hvc.parse.select._validate_search(
+                {"model_name": "knn", "feature_group": "knn"}
+            )
+        with pytest.raises(KeyError):
+            hvc.parse.select._validate_search({"model_name": "svm"})
+        with pytest.raises(KeyError):
+            hvc.parse.select._validate_search(
+                {"model_name": "svm", "feature_group": "svm", "C": 1}
+            )
+        with pytest.raises(ValueError):
+            hvc.parse.select._validate_search(
+                {"model_name": "svm", "feature_group": "svm", "factor": 2.5}
+            )
+
 
 # class TestParsePredict()
@@ -2,9 +2,11 @@
 import os
 from glob import glob
 
-import joblib
+import numpy as np
+import pytest
 
 import hvc
+from hvc.predict import Predictor
 from config import rewrite_config
 
 
@@ -63,6 +65,93 @@ class TestPredict:
             assert key in predict
         # check there are cbin files in output_dir!
 
+    def test_predict_feature_group_subset(self, tmp_path, test_data_dir):
+        # tests that predict only extracts the features a model uses,
+        # for a model trained on one feature group from a file with several groups
+        feature_file_path = os.path.join(
+            test_data_dir, "feature_files", "multiple_feature_groups.features"
+        )
+        hvc.select(
+            feature_file_path=feature_file_path,
+            feature_group="knn",
+            train_samples_range=range(100, 101, 100),
+            num_replicates=1,
+            num_test_samples=400,
+            model_name="knn",
+            hyperparameters={"k": 4},
+            output_dir=str(tmp_path),
+        )
+        model_meta_file = glob(
+            os.path.join(str(tmp_path), "select_output*", "*", "*.meta")
+        )[0]
+        data_dirs = [
+            os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))
+        ]
+        predict = hvc.predict(
+            data_dirs=data_dirs,
+            file_format="cbin",
+            model_meta_file=model_meta_file,
+            output_dir=str(tmp_path),
+        )
+        feature_file = hvc.load_feature_file(feature_file_path)
+        knn_feature_list = [
+            feature
+            for feature, group_ID in zip(
+                feature_file["feature_list"], feature_file["feature_list_group_ID"]
+            )
+            if group_ID == feature_file["feature_group_ID_dict"]["knn"]
+        ]
+        assert predict["feature_list"] == knn_feature_list
+        assert predict["features"].shape[1] == len(knn_feature_list)
+        assert predict["pred_labels"].shape[0] == predict["features"].shape[0]
+
+    def test_predict_stream(self, tmp_path, test_data_dir):
+        # tests that streaming predict gives the same predictions as predicting
+        # from a feature file, without saving any feature files
+        data_dirs = [
+            os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))
+        ]
+        model_meta_file = os.path.join(test_data_dir, "model_files", "knn.meta")
+        predict_kwargs = {
+            "data_dirs": data_dirs,
+            "file_format": "cbin",
+            "model_meta_file": model_meta_file,
+            "predict_proba": True,
+        }
+        stream_dir = tmp_path / "stream"
+        stream_dir.mkdir()
+        stream_predict = hvc.predict(
+            **predict_kwargs, output_dir=str(stream_dir), stream=True
+        )
+        predict_dir = tmp_path / "predict"
+        predict_dir.mkdir()
+        predict = hvc.predict(**predict_kwargs, output_dir=str(predict_dir))
+
+        assert type(stream_predict) == dict
+        assert "features" not in stream_predict
+        assert np.array_equal(stream_predict["pred_labels"], predict["pred_labels"])
+        assert np.allclose(stream_predict["pred_probs"], predict["pred_probs"])
+        assert np.array_equal(stream_predict["onsets_Hz"], predict["onsets_Hz"])
+        assert stream_predict["songfile_IDs"] == list(predict["songfile_IDs"])
+        assert glob(str(stream_dir / "*" / "features_created*")) == []
+        predictions_file = glob(str(stream_dir / "*" / "predictions_created*"))
+        assert len(predictions_file) == 1
+        saved = hvc.load_feature_file(predictions_file[0])
+        assert np.array_equal(saved["pred_labels"], stream_predict["pred_labels"])
+
+    def test_predictor_predict_proba_keras(self, test_data_dir):
+        # keras models have no predict_proba, so asking for probabilities
+        # should fail up front instead of returning None for pred_probs
+        predictor = Predictor(os.path.join(test_data_dir, "model_files", "knn.meta"))
+        predictor.model_name = "flatwindow"
+        raw_audio = np.zeros((32000,))
+        with pytest.raises(ValueError):
+            predictor.predict_audio(
+                raw_audio=raw_audio, samp_freq=32000, predict_proba=True
+            )
+        with pytest.raises(ValueError):
+            next(predictor.stream(predict_proba=True))
+
     def test_predict_svm_data_dirs(self, tmp_output_dir, test_data_dir):
         # tests predict with svm model, using data dirs
         data_dirs = ["cbins/gy6or6/032312", "cbins/gy6or6/032412"]
@@ -155,7 +244,7 @@ class TestPredict:
             )
         else:
             predict_output = predict_output[0]
-        predict = joblib.load(predict_output)
+        predict = hvc.utils.load_feature_file(predict_output)
         self._generic_predict_asserts(predict)
 
     def test_predict_knn_yaml(self, tmp_output_dir, configs_path, test_data_dir):
@@ -0,0 +1,59 @@
+"""
+test prefetch module
+"""
+import time
+
+import pytest
+
+from hvc.utils.prefetch import Prefetcher
+
+
+def slow_square(x):
+    time.sleep(0.01)
+    return x**2
+
+
+class TestPrefetcher:
+    def test_order(self):
+        items = list(range(20))
+        for depth in (0, 1, 4):
+            prefetcher = Prefetcher(slow_square, items, depth=depth)
+            results = list(prefetcher)
+            assert [item for item, _ in results] == items
+            assert [result for _, result in results] == [x**2 for x in items]
+            io_stats = prefetcher.io_stats()
+            assert io_stats["num_items"] == len(items)
+            assert io_stats["depth"] == depth
+            assert io_stats["wait_time"] >= 0
+
+    def test_no_prefetch_counts_all_waits(self):
+        prefetcher = Prefetcher(slow_square, range(5), depth=0)
+        list(prefetcher)
+        assert prefetcher.num_waits == 5
+        assert prefetcher.wait_time >= 0.05
+
+    def test_prefetch_reduces_wait(self):
+        items = list(range(10))
+        prefetcher = Prefetcher(slow_square, items, depth=2)
+        for _ in prefetcher:
+            # simulate computing features, while next items are loaded
+            time.sleep(0.05)
+        assert prefetcher.wait_time < 0.05
+
+    def test_stop_early(self):
+        prefetcher = Prefetcher(slow_square, range(100), depth=4)
+        for item, result in prefetcher:
+            if item == 2:
+                break
+        assert prefetcher.num_items == 3
+
+    def test_exception(self):
+        def fail(x):
+            raise OSError("could not read {}".format(x))
+
+        with pytest.raises(OSError):
+            list(Prefetcher(fail, range(3), depth=2))
+
+    def test_bad_depth(self):
+        with pytest.raises(ValueError):
+            Prefetcher(slow_square, range(3), depth=-1)
@@ -0,0 +1,50 @@
+"""tests for hvc.utils.result_log module"""
+import pytest
+
+from hvc.utils.result_log import ResultLog
+
+SETTINGS = {"feature_file": "knn.features", "seed": 42, "models": [{"k": 4}]}
+
+
+def _result(num_samples_ind, replicate, model_ind):
+    return {
+        "num_samples_ind": num_samples_ind,
+        "replicate": replicate,
+        "model_ind": model_ind,
+        "score": 0.5,
+    }
+
+
+def test_result_log(tmp_path):
+    result_log = ResultLog(str(tmp_path))
+    assert result_log.settings is None
+    with pytest.raises(ValueError):
+        result_log.add(_result(0, 0, 0))
+    result_log.start(SETTINGS)
+    result_log.add(_result(0, 0, 0))
+    result_log.add(_result(0, 1, 0))
+    assert result_log.has(0, 1, 0)
+    assert not result_log.has(1, 0, 0)
+
+    reloaded = ResultLog(str(tmp_path))
+    assert reloaded.settings == SETTINGS
+    assert reloaded.results == result_log.results
+    # same settings, so results are kept
+    reloaded.start(SETTINGS)
+    assert reloaded.has(0, 0, 0)
+    with pytest.raises(ValueError):
+        ResultLog(str(tmp_path)).start(dict(SETTINGS, seed=43))
+
+
+def test_result_log_partial_line(tmp_path):
+    result_log = ResultLog(str(tmp_path))
+    result_log.start(SETTINGS)
+    result_log.add(_result(0, 0, 0))
+    # interrupted while writing a result
+    with open(result_log.log_path, "a") as fp:
+        fp.write('{"num_samples_ind": 0, "repl')
+
+    reloaded = ResultLog(str(tmp_path))
+    assert list(reloaded.results.keys()) == [(0, 0, 0)]
+    reloaded.add(_result(1, 0, 0))
+    assert set(ResultLog(str(tmp_path)).results.keys()) == {(0, 0, 0), (1, 0, 0)}
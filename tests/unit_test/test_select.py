@@ -1,11 +1,19 @@
 """module to test high-level select function in hvc.select"""
 import os
+import sys
 from glob import glob
 
+import joblib
+import numpy as np
+import pytest
+
 import hvc
 from hvc.select import determine_model_output_folder_name
 from config import rewrite_config
 
+# hvc.select is the function, so get the module it is defined in
+select_module = sys.modules["hvc.select"]
+
 
 class TestSelect:
     def test_select_knn_ftr_list_indices(self, tmp_output_dir, test_data_dir):
@@ -38,6 +46,361 @@ class TestSelect:
             output_dir=str(tmp_output_dir),
         )
 
+    def test_select_extractor_manifest(self, tmp_path, test_data_dir):
+        # test that select saves an extractor manifest next to each .meta file
+        # that predict can use to make a FeatureExtractor
+        feature_file_path = os.path.join(
+            test_data_dir, "feature_files", "multiple_feature_groups.features"
+        )
+        hvc.select(
+            feature_file_path=feature_file_path,
+            feature_group="knn",
+            train_samples_range=range(100, 201, 100),
+            num_replicates=1,
+            num_test_samples=400,
+            model_name="knn",
+            hyperparameters={"k": 4},
+            output_dir=str(tmp_path),
+        )
+        feature_extractor = hvc.load_feature_file(feature_file_path)[
+            "feature_extractor"
+        ]
+        meta_files = glob(os.path.join(str(tmp_path), "select_output*", "*", "*.meta"))
+        assert len(meta_files) == 2
+        for meta_file in meta_files:
+            model_meta = joblib.load(meta_file)
+            assert os.path.isfile(model_meta["extractor_manifest"])
+            from_manifest = hvc.features.FeatureExtractor.from_manifest(
+                model_meta["extractor_manifest"]
+            )
+            for attr in (
+                "spect_params",
+                "segment_params",
+                "feature_list",
+                "feature_list_group_ID",
+                "feature_group_ID_dict",
+                "whole_file_spect",
+            ):
+                assert getattr(from_manifest, attr) == getattr(feature_extractor, attr)
+
+    def test_select_n_jobs(self, tmp_path, test_data_dir):
+        # test that fitting models in parallel gives same results as serial
+        feature_file_path = os.path.join(test_data_dir, "feature_files", "knn.features")
+        summaries = []
+        for n_jobs in (1, 2):
+            output_dir = tmp_path / "n_jobs_{}".format(n_jobs)
+            output_dir.mkdir()
+            hvc.select(
+                feature_file_path=feature_file_path,
+                feature_group="knn",
+                models=[
+                    {
+                        "model_name": "knn",
+                        "hyperparameters": {"k": 4},
+                        "feature_group": "knn",
+                    },
+                    {
+                        "model_name": "knn",
+                        "hyperparameters": {"k": 8},
+                        "feature_group": "knn",
+                    },
+                ],
+                train_samples_range=range(100, 201, 100),
+                num_replicates=2,
+                num_test_samples=400,
+                output_dir=str(output_dir),
+                n_jobs=n_jobs,
+                seed=42,
+            )
+            summaries.append(
+                joblib.load(
+                    glob(
+                        os.path.join(
+                            str(output_dir), "select_output*", "summary_model_select*"
+                        )
+                    )[0]
+                )
+            )
+            # one .meta file for every model
+            meta_files = glob(
+                os.path.join(str(output_dir), "select_output*", "*", "*.meta")
+            )
+            assert len(meta_files) == 2 * 2 * 2
+        serial, parallel = summaries
+        assert serial["seed"] == parallel["seed"] == 42
+        for key in ("score_arr", "avg_acc_arr"):
+            assert np.array_equal(serial[key], parallel[key])
+        for key in ("pred_labels_arr", "train_IDs_arr"):
+            for serial_arr, parallel_arr in zip(
+                serial[key].ravel(), parallel[key].ravel()
+            ):
+                assert np.array_equal(serial_arr, parallel_arr)
+
+    def test_select_scale_once(self, tmp_path, test_data_dir, monkeypatch):
+        # test that models with the same training set and features share scaling
+        feature_file_path = os.path.join(test_data_dir, "feature_files", "knn.features")
+        num_scaled = []
+
+        class CountingScaledFeatures(select_module._ScaledFeatures):
+            def __init__(self, *args):
+                num_scaled.append(1)
+                super().__init__(*args)
+
+        monkeypatch.setattr(select_module, "_ScaledFeatures", CountingScaledFeatures)
+        hvc.select(
+            feature_file_path=feature_file_path,
+            feature_group="knn",
+            models=[
+                {
+                    "model_name": "knn",
+                    "hyperparameters": {"k": k},
+                    "feature_group": "knn",
+                }
+                for k in (2, 4, 8)
+            ]
+            + [
+                {
+                    "model_name": "knn",
+                    "hyperparameters": {"k": 3},
+                    "feature_list_indices": [0, 1, 2],
+                }
+            ],
+            train_samples_range=range(100, 201, 100),
+            num_replicates=2,
+            num_test_samples=400,
+            output_dir=str(tmp_path),
+        )
+        # once for each training set and set of features
+        assert len(num_scaled) == 2 * 2 * 2
+        # labels predicted from neighbors found once for largest k
+        # are the same as labels predicted by each saved model
+        feature_file = hvc.load_feature_file(feature_file_path)
+        meta_files = glob(os.path.join(str(tmp_path), "select_output*", "*", "*.meta"))
+        assert len(meta_files) == 2 * 2 * 4
+        for meta_file in meta_files:
+            model_meta = joblib.load(meta_file)
+            clf = joblib.load(model_meta["model_filename"])
+            feature_inds = np.in1d(
+                feature_file["features_arr_column_IDs"],
+                model_meta["feature_list_indices"],
+            )
+            features_test = model_meta["scaler"].transform(
+                feature_file["features"][
+                    model_meta["test_IDs"][:, np.newaxis], feature_inds
+                ]
+            )
+            assert np.array_equal(clf.predict(features_test), model_meta["pred_labels"])
+
+    def test_select_svm_kernel_cache(self, tmp_path, test_data_dir):
+        # test that models fit with cached kernels are the same as without
+        feature_file_path = os.path.join(test_data_dir, "feature_files", "svm.features")
+        summaries = []
+        for kernel_cache_size in (0, 1024):
+            output_dir = tmp_path / "kernel_cache_size_{}".format(kernel_cache_size)
+            output_dir.mkdir()
+            hvc.select(
+                feature_file_path=feature_file_path,
+                feature_group="svm",
+                models=[
+                    {
+                        "model_name": "svm",
+                        "hyperparameters": {"C": C, "gamma": 0.01},
+                        "feature_group": "svm",
+                    }
+                    for C in (0.1, 1, 10)
+                ],
+                train_samples_range=range(100, 201, 100),
+                num_replicates=1,
+                num_test_samples=400,
+                output_dir=str(output_dir),
+                seed=42,
+                kernel_cache_size=kernel_cache_size,
+            )
+            summaries.append(
+                joblib.load(
+                    glob(
+                        os.path.join(
+                            str(output_dir), "select_output*", "summary_model_select*"
+                        )
+                    )[0]
+                )
+            )
+        not_cached, cached = summaries
+        assert np.array_equal(not_cached["score_arr"], cached["score_arr"])
+        for not_cached_labels, cached_labels in zip(
+            not_cached["pred_labels_arr"].ravel(), cached["pred_labels_arr"].ravel()
+        ):
+            assert np.array_equal(not_cached_labels, cached_labels)
+
+    def test_select_early_stopping(self, tmp_path, test_data_dir):
+        # test that select stops fitting models once accuracy plateaus,
+        # and adds replicates where accuracy varies across replicates
+        hvc.select(
+            feature_file_path=os.path.join(
+                test_data_dir, "feature_files", "knn.features"
+            ),
+            feature_group="knn",
+            model_name="knn",
+            hyperparameters={"k": 4},
+            train_samples_range=range(50, 251, 50),
+            num_replicates=2,
+            num_test_samples=400,
+            output_dir=str(tmp_path),
+            seed=42,
+            # any increase is a plateau, and any variance adds a replicate
+            early_stopping={"tol": 1.0, "max_std": 0.0, "max_replicates": 3},
+        )
+        summary = joblib.load(
+            glob(os.path.join(str(tmp_path), "select_output*", "summary_model*"))[0]
+        )
+        assert summary["early_stopping"] == {
+            "tol": 1.0,
+            "patience": 1,
+            "max_std": 0.0,
+            "max_replicates": 3,
+        }
+        for key in ("score_arr", "avg_acc_arr"):
+            assert summary[key].shape == (5, 3, 1)
+            # stopped after second number of samples
+            assert not np.any(np.isnan(summary[key][:2, :2]))
+            assert np.all(np.isnan(summary[key][2:]))
+        # replicate added only where the first two differ
+        std_acc = np.std(summary["avg_acc_arr"][:2, :2, 0], axis=1)
+        assert np.array_equal(~np.isnan(summary["avg_acc_arr"][:2, 2, 0]), std_acc > 0)
+        num_fit = np.count_nonzero(~np.isnan(summary["score_arr"]))
+        meta_files = glob(os.path.join(str(tmp_path), "select_output*", "*", "*.meta"))
+        assert len(meta_files) == num_fit
+        # added replicates use the same training sets as train_test_split draws
+        sampler = hvc.utils.SongSampler(
+            hvc.load_feature_file(
+                os.path.join(test_data_dir, "feature_files", "knn.features")
+            )["songfile_IDs"],
+            hvc.load_feature_file(
+                os.path.join(test_data_dir, "feature_files", "knn.features")
+            )["labels"],
+            seed=summary["seed"],
+        )
+        for num_samples_ind in np.flatnonzero(
+            ~np.isnan(summary["avg_acc_arr"][:, 2, 0])
+        ):
+            num_train_samples = summary["train_samples_range"][num_samples_ind]
+            assert np.array_equal(
+                summary["train_IDs_arr"][num_samples_ind, 2],
+                sampler.train_test_split(400, [num_train_samples], 3)[2][0, 2],
+            )
+
+    def test_select_resume(self, tmp_path, test_data_dir, monkeypatch):
+        # test that select skips models already in the log of results when it is
+        # run again with the same resume_dir, and gives the same summary
+        select_kwargs = dict(
+            feature_file_path=os.path.join(
+                test_data_dir, "feature_files", "knn.features"
+            ),
+            feature_group="knn",
+            models=[
+                {
+                    "model_name": "knn",
+                    "feature_group": "knn",
+                    "hyperparameters": {"k": 2},
+                },
+                {
+                    "model_name": "knn",
+                    "feature_group": "knn",
+                    "hyperparameters": {"k": 4},
+                },
+            ],
+            train_samples_range=range(100, 301, 100),
+            num_replicates=2,
+            num_test_samples=400,
+            resume_dir=str(tmp_path / "resume"),
+        )
+        hvc.select(**select_kwargs)
+        summary_files = glob(str(tmp_path / "resume" / "summary_model*"))
+        assert len(summary_files) == 1
+        summary = joblib.load(summary_files[0])
+        os.remove(summary_files[0])
+
+        # interrupt after 5 of 12 fits, while 6th result was being written
+        log_path = str(tmp_path / "resume" / "select_results.jsonl")
+        with open(log_path) as fp:
+            lines = fp.readlines()
+        assert len(lines) == 1 + 12
+        with open(log_path, "w") as fp:
+            fp.writelines(lines[:6])
+            fp.write(lines[6][:20])
+
+        # partial summary from models in log
+        partial = joblib.load(hvc.finalize_select(str(tmp_path / "resume")))
+        assert np.count_nonzero(~np.isnan(partial["score_arr"])) == 5
+        assert partial["pred_labels_arr"][np.isnan(partial["score_arr"])][0] is None
+
+        fit_model_filenames = []
+        _fit_sklearn_models = select_module._fit_sklearn_models
+
+        def _fit_sklearn_models_spy(model_dicts, model_filenames, *args):
+            fit_model_filenames.extend(model_filenames)
+            return _fit_sklearn_models(model_dicts, model_filenames, *args)
+
+        monkeypatch.setattr(
+            select_module, "_fit_sklearn_models", _fit_sklearn_models_spy
+        )
+        # same seed is read from log, since it was not specified
+        hvc.select(**select_kwargs)
+        assert len(fit_model_filenames) == 7
+        resumed = joblib.load(
+            sorted(glob(str(tmp_path / "resume" / "summary_model*")))[-1]
+        )
+        assert resumed["seed"] == summary["seed"]
+        assert np.array_equal(resumed["test_IDs"], summary["test_IDs"])
+        for key in ("score_arr", "avg_acc_arr"):
+            assert np.array_equal(resumed[key], summary[key])
+        for ind in np.ndindex(summary["pred_labels_arr"].shape):
+            assert np.array_equal(
+                resumed["pred_labels_arr"][ind], summary["pred_labels_arr"][ind]
+            )
+        for ind in np.ndindex(summary["train_IDs_arr"].shape):
+            assert np.array_equal(
+                resumed["train_IDs_arr"][ind], summary["train_IDs_arr"][ind]
+            )
+
+        # can't resume with different settings
+        select_kwargs["num_replicates"] = 3
+        with pytest.raises(ValueError):
+            hvc.select(**select_kwargs)
+
+    def test_select_search(self, tmp_path, test_data_dir):
+        # test that select searches for hyperparameters of a model, then fits it
+        feature_file_path = os.path.join(test_data_dir, "feature_files", "svm.features")
+        hvc.select(
+            feature_file_path=feature_file_path,
+            search={
+                "model_name": "svm",
+                "feature_group": "svm",
+                "C_range": [1.0, 10.0],
+                "gamma_range": [0.001, 0.01],
+                "n_splits": 3,
+            },
+            train_samples_range=range(100, 201, 100),
+            num_replicates=1,
+            num_test_samples=400,
+            output_dir=str(tmp_path),
+            seed=42,
+        )
+        summary = joblib.load(
+            glob(os.path.join(str(tmp_path), "select_output*", "summary_model*"))[0]
+        )
+        best_params = summary["search"]["best_params"]
+        assert set(best_params.keys()) == {"C", "gamma"}
+        assert summary["model_dict"]["hyperparameters"] == best_params
+        assert summary["score_arr"].shape == (2, 1, 1)
+        # search only used samples from songs that are not in test set
+        feature_file = hvc.load_feature_file(feature_file_path)
+        assert summary["search"]["cv_results"]["n_resources"].max() <= (
+            len(feature_file["labels"]) - 400
+        )
+        meta_files = glob(os.path.join(str(tmp_path), "select_output*", "*", "*.meta"))
+        assert len(meta_files) == 2
+
     def test_select_svm_ftr_grp(self, tmp_output_dir, test_data_dir):
         # test select with features for model specified by feature list indices
         feature_file_path = os.path.join(test_data_dir, "feature_files", "svm.features")
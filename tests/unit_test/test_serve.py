@@ -0,0 +1,138 @@
+"""tests for hvc.serve module"""
+import base64
+import json
+import os
+import socket
+import threading
+import urllib.request
+from glob import glob
+
+import numpy as np
+import pytest
+
+import hvc.audiofileIO
+import hvc.serve
+import hvc.utils.annotation
+
+
+@pytest.fixture
+def model_server(test_data_dir):
+    return hvc.serve.ModelServer(
+        [os.path.join(str(test_data_dir), "model_files", "knn.meta")]
+    )
+
+
+@pytest.fixture
+def notmat_and_cbin(test_data_dir):
+    notmat = sorted(
+        glob(os.path.join(str(test_data_dir), "cbins", "gy6or6", "032412", "*.not.mat"))
+    )[0]
+    return notmat, notmat.replace(".not.mat", "")
+
+
+def _run_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestServe:
+    def test_handle(self, model_server, notmat_and_cbin):
+        notmat, cbin = notmat_and_cbin
+        annot = hvc.utils.annotation.notmat_to_annot_dict(notmat)
+        raw_audio, samp_freq = hvc.audiofileIO.load_audio(cbin, mmap=False)
+        response = model_server.handle(
+            {
+                "items": [
+                    {
+                        "filename": cbin,
+                        "onsets_Hz": annot["onsets_Hz"].tolist(),
+                        "offsets_Hz": annot["offsets_Hz"].tolist(),
+                    },
+                    {
+                        "samples_b64": base64.b64encode(
+                            raw_audio.astype(np.int16).tobytes()
+                        ).decode(),
+                        "samp_freq": samp_freq,
+                        "onsets_Hz": annot["onsets_Hz"].tolist(),
+                        "offsets_Hz": annot["offsets_Hz"].tolist(),
+                    },
+                ],
+                "predict_proba": True,
+            }
+        )
+        assert "error" not in response
+        from_file, from_samples = response["results"]
+        assert len(from_file["pred_labels"]) == annot["onsets_Hz"].shape[0]
+        # same audio, so same predictions whether sent as file or as samples
+        assert from_file["pred_labels"] == from_samples["pred_labels"]
+        assert len(from_file["pred_probs"]) == annot["onsets_Hz"].shape[0]
+
+        response = model_server.handle({"items": [{"samples": [0, 1, 2]}]})
+        assert "error" in response
+        metrics = model_server.metrics.to_dict()
+        assert metrics["num_requests"] == 2
+        assert metrics["num_items"] == 3
+        assert metrics["num_errors"] == 1
+        assert metrics["p50_latency"] > 0
+
+    def test_http(self, model_server, notmat_and_cbin):
+        _, cbin = notmat_and_cbin
+        server = hvc.serve.make_server(model_server, port=0)
+        _run_in_thread(server)
+        url = "http://{}:{}".format(*server.server_address[:2])
+        try:
+            request = urllib.request.Request(
+                url + "/predict",
+                data=json.dumps({"items": [{"filename": cbin}]}).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            with urllib.request.urlopen(request) as response:
+                predictions = json.loads(response.read())
+            assert len(predictions["results"]) == 1
+            assert len(predictions["results"][0]["pred_labels"]) > 0
+            with urllib.request.urlopen(url + "/metrics") as response:
+                metrics = json.loads(response.read())
+            assert metrics["num_requests"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_unix_socket(self, model_server, notmat_and_cbin, tmp_path):
+        _, cbin = notmat_and_cbin
+        socket_path = str(tmp_path / "hvc.sock")
+        server = hvc.serve.make_server(model_server, socket_path=socket_path)
+        _run_in_thread(server)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+                sock_file = sock.makefile("rwb")
+                for request in (
+                    {"items": [{"filename": cbin}]},
+                    {"command": "metrics"},
+                ):
+                    sock_file.write(json.dumps(request).encode() + b"\n")
+                    sock_file.flush()
+                predictions = json.loads(sock_file.readline())
+                metrics = json.loads(sock_file.readline())
+            assert len(predictions["results"][0]["pred_labels"]) > 0
+            assert metrics["num_requests"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_unix_socket_path_exists(self, model_server, tmp_path):
+        socket_path = str(tmp_path / "hvc.sock")
+        server = hvc.serve.make_server(model_server, socket_path=socket_path)
+        server.server_close()
+        # socket left behind by a stopped server is replaced
+        assert os.path.exists(socket_path)
+        server = hvc.serve.make_server(model_server, socket_path=socket_path)
+        server.server_close()
+
+        # any other file is not removed
+        not_socket = tmp_path / "hvc.txt"
+        not_socket.write_text("not a socket")
+        with pytest.raises(FileExistsError):
+            hvc.serve.make_server(model_server, socket_path=str(not_socket))
+        assert not_socket.read_text() == "not a socket"
@@ -0,0 +1,118 @@
+"""
+test utils.shards module
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+import yaml
+
+import hvc.features
+from hvc.parse.ref_spect_params import refs_dict
+from hvc.utils import annotation
+from hvc.utils.shards import MANIFEST_FILENAME, ShardStore
+
+
+def _annotation_list(test_data_dir):
+    cbin_dir = os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))
+    notmats = sorted(
+        [
+            os.path.join(cbin_dir, notmat)
+            for notmat in os.listdir(cbin_dir)
+            if notmat.endswith(".not.mat")
+        ]
+    )
+    return [annotation.notmat_to_annot_dict(notmat) for notmat in notmats]
+
+
+class TestShardStore:
+    def test_add_get(self, test_data_dir, tmp_path):
+        annotation_list = _annotation_list(test_data_dir)[:3]
+        settings = {"feature_list": ["duration"]}
+        store = ShardStore(str(tmp_path / "shards"), settings)
+        assert not any([store.has(annot) for annot in annotation_list])
+        extract_dicts = [
+            {"labels": annot["labels"], "features_arr": np.ones((1, 1)) * ind}
+            for ind, annot in enumerate(annotation_list)
+        ]
+        store.add(annotation_list[:2], extract_dicts[:2])
+        store.add(annotation_list[2:], extract_dicts[2:])
+        assert all([store.has(annot) for annot in annotation_list])
+
+        # a new store in same dir reads manifest
+        store = ShardStore(str(tmp_path / "shards"), settings)
+        assert all([store.has(annot) for annot in annotation_list])
+        for extract_dict, loaded in zip(
+            extract_dicts, store.extract_dicts(annotation_list)
+        ):
+            assert np.array_equal(extract_dict["features_arr"], loaded["features_arr"])
+
+        # changing annotation means file has to be extracted again
+        changed = dict(annotation_list[0])
+        changed["onsets_Hz"] = changed["onsets_Hz"] + 1
+        assert not store.has(changed)
+        with pytest.raises(KeyError):
+            store.get(changed)
+
+        # a missing shard counts as not extracted
+        os.remove(os.path.join(store.shard_dir, "shard_000001.joblib"))
+        assert store.has(annotation_list[0])
+        assert not store.has(annotation_list[2])
+
+    def test_different_settings(self, test_data_dir, tmp_path):
+        annotation_list = _annotation_list(test_data_dir)[:1]
+        store = ShardStore(str(tmp_path / "shards"), {"feature_list": ["duration"]})
+        store.add(annotation_list, [None])
+        with pytest.raises(ValueError):
+            ShardStore(str(tmp_path / "shards"), {"feature_list": ["amplitude"]})
+
+    def test_different_version(self, test_data_dir, tmp_path):
+        annotation_list = _annotation_list(test_data_dir)[:1]
+        settings = {"feature_list": ["duration"]}
+        store = ShardStore(str(tmp_path / "shards"), settings)
+        store.add(annotation_list, [None])
+        manifest_path = os.path.join(store.shard_dir, MANIFEST_FILENAME)
+        with open(manifest_path) as fp:
+            manifest = json.load(fp)
+        manifest["version"] = "0.0.0"
+        with open(manifest_path, "w") as fp:
+            json.dump(manifest, fp)
+        with pytest.raises(ValueError):
+            ShardStore(str(tmp_path / "shards"), settings)
+
+
+def test_extract_resume(hvc_source_dir, test_data_dir, tmp_path):
+    """tests that extraction resumed from shards gives the same result
+    as extracting from all files at once"""
+    with open(
+        os.path.join(hvc_source_dir, os.path.normpath("parse/feature_groups.yml"))
+    ) as ftr_grp_yaml:
+        ftr_grps = yaml.load(ftr_grp_yaml, Loader=yaml.FullLoader)
+    fe = hvc.features.extract.FeatureExtractor(
+        spect_params=refs_dict["evsonganaly"],
+        feature_list=ftr_grps["knn"],
+    )
+    data_dirs = [os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))]
+    extract_kwargs = dict(
+        labels_to_use="iabcdefghjk",
+        data_dirs=data_dirs,
+        file_format="cbin",
+        save_features=False,
+    )
+    expected = fe.extract(**extract_kwargs)
+    num_files = fe.io_stats["num_items"]
+
+    shard_dir = str(tmp_path / "shards")
+    fe.extract(shard_dir=shard_dir, shard_size=2, **extract_kwargs)
+    assert fe.io_stats["num_items"] == num_files
+    # simulate interruption by removing the last shard
+    shards = sorted(
+        [name for name in os.listdir(shard_dir) if name.endswith(".joblib")]
+    )
+    os.remove(os.path.join(shard_dir, shards[-1]))
+    resumed = fe.extract(shard_dir=shard_dir, shard_size=2, **extract_kwargs)
+    # only files from the removed shard are extracted again
+    assert 0 < fe.io_stats["num_items"] <= 2
+    assert expected["labels"] == resumed["labels"]
+    assert np.array_equal(expected["features"], resumed["features"], equal_nan=True)
@@ -0,0 +1,112 @@
+"""
+test utils.spect_cache module
+"""
+import os
+import time
+
+import evfuncs
+import numpy as np
+import yaml
+
+import hvc.audiofileIO
+import hvc.features
+from hvc.parse.ref_spect_params import refs_dict
+from hvc.utils import annotation
+from hvc.utils.spect_cache import SpectrogramCache
+
+
+def _cbins(test_data_dir):
+    cbin_dir = os.path.join(test_data_dir, os.path.normpath("cbins/gy6or6/032412"))
+    return sorted(
+        [
+            os.path.join(cbin_dir, cbin)
+            for cbin in os.listdir(cbin_dir)
+            if cbin.endswith(".cbin")
+        ]
+    )
+
+
+class TestSpectrogramCache:
+    def test_get_or_make(self, test_data_dir, tmp_path):
+        cbin = _cbins(test_data_dir)[0]
+        raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+        spect_params = refs_dict["tachibana"]
+        spect_maker = hvc.audiofileIO.Spectrogram(**spect_params)
+        cache = SpectrogramCache(str(tmp_path / "cache"))
+        assert cache.get(cbin, spect_params) is None
+        made = cache.get_or_make(cbin, spect_params, spect_maker, raw_audio, samp_freq)
+        cached = cache.get(cbin, spect_params)
+        assert type(cached[0]) is np.memmap
+        for made_arr, cached_arr in zip(made, cached):
+            assert np.array_equal(made_arr, cached_arr)
+        # order of keys in spect_params does not change key
+        reversed_params = dict(reversed(list(spect_params.items())))
+        assert cache.key(cbin, spect_params) == cache.key(cbin, reversed_params)
+        # but different params do
+        assert cache.get(cbin, refs_dict["koumura"]) is None
+
+    def test_evict(self, test_data_dir, tmp_path):
+        cbins = _cbins(test_data_dir)[:3]
+        spect_params = refs_dict["tachibana"]
+        spect_maker = hvc.audiofileIO.Spectrogram(**spect_params)
+        cache = SpectrogramCache(str(tmp_path / "cache"))
+        for cbin in cbins:
+            raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+            cache.get_or_make(cbin, spect_params, spect_maker, raw_audio, samp_freq)
+            time.sleep(0.01)
+        # use first file again so second file is least recently used
+        cache.get(cbins[0], spect_params)
+        # set max size so there's only room for two spectrograms
+        cache.max_size = cache.size() - 1
+        cache.evict()
+        assert cache.get(cbins[1], spect_params) is None
+        assert cache.get(cbins[0], spect_params) is not None
+        assert cache.get(cbins[2], spect_params) is not None
+
+    def test_get_read_only(self, test_data_dir, tmp_path, monkeypatch):
+        cbin = _cbins(test_data_dir)[0]
+        raw_audio, samp_freq = evfuncs.load_cbin(cbin)
+        spect_params = refs_dict["tachibana"]
+        spect_maker = hvc.audiofileIO.Spectrogram(**spect_params)
+        cache = SpectrogramCache(str(tmp_path / "cache"))
+        made = cache.get_or_make(cbin, spect_params, spect_maker, raw_audio, samp_freq)
+
+        def utime(path, *args, **kwargs):
+            # as for a cache directory shared read-only between users
+            raise PermissionError("read-only file system: {}".format(path))
+
+        monkeypatch.setattr(os, "utime", utime)
+        # entry can still be used, it just isn't marked as recently used
+        cached = cache.get(cbin, spect_params)
+        assert np.array_equal(made[0], cached[0])
+
+
+def test_feature_extractor_spect_cache(hvc_source_dir, test_data_dir, tmp_path):
+    with open(
+        os.path.join(hvc_source_dir, os.path.normpath("parse/feature_groups.yml"))
+    ) as ftr_grp_yaml:
+        ftr_grps = yaml.load(ftr_grp_yaml, Loader=yaml.FullLoader)
+    cbin = _cbins(test_data_dir)[0]
+    annotation_dict = annotation.notmat_to_annot_dict(cbin + ".not.mat")
+    fe = hvc.features.extract.FeatureExtractor(
+        spect_params=refs_dict["tachibana"],
+        feature_list=ftr_grps["svm"],
+        whole_file_spect=True,
+        spect_cache_dir=str(tmp_path / "cache"),
+    )
+    extract_dicts = [
+        fe._from_file(
+            cbin,
+            annotation_dict["labels"],
+            annotation_dict["onsets_Hz"],
+            annotation_dict["offsets_Hz"],
+            labels_to_use="iabcdefghjk",
+        )
+        for _ in range(2)  # second time, spectrogram is loaded from cache
+    ]
+    assert fe.spect_cache.size() > 0
+    assert np.array_equal(
+        extract_dicts[0]["features_arr"],
+        extract_dicts[1]["features_arr"],
+        equal_nan=True,
+    )
@@ -0,0 +1,126 @@
+"""tests for hvc.stream module"""
+import os
+from glob import glob
+
+import numpy as np
+import pytest
+
+import hvc.audiofileIO
+import hvc.stream
+from hvc.predict import Predictor
+
+
+@pytest.fixture
+def cbin(test_data_dir):
+    return sorted(
+        glob(os.path.join(str(test_data_dir), "cbins", "gy6or6", "032412", "*.cbin"))
+    )[0]
+
+
+def _stream(processor, raw_audio, block_size):
+    events = []
+    for block_start in range(0, raw_audio.shape[0], block_size):
+        events.extend(
+            processor.process(raw_audio[block_start : block_start + block_size])
+        )
+    events.extend(processor.flush())
+    return events
+
+
+class TestRingBuffer:
+    def test_ring_buffer(self):
+        ring_buffer = hvc.stream.RingBuffer(10)
+        stream = np.arange(37, dtype=np.float64)
+        for block_start in range(0, 30, 7):
+            ring_buffer.write(stream[block_start : block_start + 7])
+        assert ring_buffer.num_written == 35
+        assert np.array_equal(ring_buffer.read(25, 35), stream[25:35])
+        assert np.array_equal(ring_buffer.read(28, 31), stream[28:31])
+        with pytest.raises(ValueError):
+            ring_buffer.read(24, 30)
+        # positions before start of stream are not wrapped around
+        with pytest.raises(ValueError):
+            hvc.stream.RingBuffer(10).read(-2, 0)
+        # block longer than buffer
+        ring_buffer.write(np.arange(100, 125, dtype=np.float64))
+        assert np.array_equal(ring_buffer.read(50, 60), np.arange(115, 125))
+
+
+class TestStreamingSegmenter:
+    @pytest.mark.parametrize("block_size", [1000, 4096])
+    def test_same_as_segmenter(self, cbin, block_size):
+        raw_audio, samp_freq = hvc.audiofileIO.load_audio(cbin, mmap=False)
+        segment_dict = hvc.audiofileIO.Segmenter().segment(
+            raw_audio, method="evsonganaly", samp_freq=samp_freq
+        )
+        segmenter = hvc.stream.StreamingSegmenter(samp_freq)
+        events = _stream(segmenter, raw_audio, block_size)
+        offset_events = [event for event in events if event["event"] == "offset"]
+        assert np.array_equal(
+            [event["onset_Hz"] for event in offset_events], segment_dict["onsets_Hz"]
+        )
+        assert np.array_equal(
+            [event["offset_Hz"] for event in offset_events],
+            segment_dict["offsets_Hz"],
+        )
+        for event in offset_events:
+            # offset is detected after filter delay plus min_silent_dur
+            assert event["sample"] - event["offset_Hz"] == segmenter.delay + int(
+                np.floor(segmenter.min_silent_dur * samp_freq) + 1
+            )
+        # every segment starts with an onset event
+        onset_events = [event for event in events if event["event"] == "onset"]
+        assert set(segment_dict["onsets_Hz"]) <= set(
+            [event["onset_Hz"] for event in onset_events]
+        )
+
+
+class TestStreamingClassifier:
+    def test_same_as_predictor(self, cbin, test_data_dir):
+        predictor = Predictor(
+            os.path.join(str(test_data_dir), "model_files", "knn.meta")
+        )
+        raw_audio, samp_freq = hvc.audiofileIO.load_audio(cbin, mmap=False)
+        # knn model uses duration of following syllable, so wait for it
+        classifier = hvc.stream.StreamingClassifier(predictor, samp_freq, lookahead=1)
+        events = _stream(classifier, raw_audio, 512)
+        offset_events = [event for event in events if event["event"] == "offset"]
+        assert len(offset_events) > 0
+        file_predictions = predictor.predict_audio(
+            raw_audio=raw_audio,
+            samp_freq=samp_freq,
+            onsets_Hz=np.asarray([event["onset_Hz"] for event in offset_events]),
+            offsets_Hz=np.asarray([event["offset_Hz"] for event in offset_events]),
+        )
+        assert np.array_equal(
+            [event["label"] for event in offset_events],
+            file_predictions["pred_labels"],
+        )
+
+    def test_gap_longer_than_buffer(self, cbin, test_data_dir):
+        # silence between bouts that is longer than buffer_dur
+        predictor = Predictor(
+            os.path.join(str(test_data_dir), "model_files", "knn.meta")
+        )
+        raw_audio, samp_freq = hvc.audiofileIO.load_audio(cbin, mmap=False)
+        half = raw_audio.shape[0] // 2
+        gap_audio = np.concatenate(
+            (
+                raw_audio[:half],
+                np.zeros((3 * samp_freq,), dtype=raw_audio.dtype),
+                raw_audio[half:],
+            )
+        )
+        for max_gap in (None, 0.5):
+            classifier = hvc.stream.StreamingClassifier(
+                predictor, samp_freq, buffer_dur=2.0, max_gap=max_gap
+            )
+            events = _stream(classifier, gap_audio, 512)
+            offset_events = [event for event in events if event["event"] == "offset"]
+            assert len(offset_events) > 0
+            assert all("label" in event for event in offset_events)
+            gaps = [
+                event["onset_Hz"] - previous["offset_Hz"]
+                for previous, event in zip(offset_events[:-1], offset_events[1:])
+            ]
+            assert max(gaps) > 2 * samp_freq
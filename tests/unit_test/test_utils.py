@@ -4,6 +4,9 @@ test utils module
 import os
 from glob import glob
 
+import numpy as np
+import pytest
+
 import hvc.utils
 
 this_file_with_path = __file__
@@ -23,3 +26,248 @@ def test_fetch(tmp_output_dir):
     test_data_fetched = os.listdir(os.path.join(str(tmp_output_dir), "032612"))
     for file in test_data_032612:
         assert file in test_data_fetched
+
+
+def test_save_load_feature_file(test_data_dir, tmp_path):
+    for feature_file_name in ("knn", "multiple_feature_groups"):
+        feature_file_path = os.path.join(
+            str(test_data_dir),
+            "feature_files",
+            "{}.features".format(feature_file_name),
+        )
+        # feature files saved with joblib.dump can still be loaded
+        ftr_file = hvc.utils.load_feature_file(feature_file_path)
+        assert type(ftr_file) == dict
+
+        dirname = str(tmp_path / feature_file_name)
+        hvc.utils.save_feature_file(ftr_file, dirname)
+        assert os.path.isdir(dirname)
+        # FeatureExtractor and annotation_list are not pickled
+        assert glob(os.path.join(dirname, "*.joblib")) == []
+        loaded = hvc.utils.load_feature_file(dirname)
+        assert sorted(loaded.keys()) == sorted(ftr_file.keys())
+        assert isinstance(loaded["features"], np.memmap)
+        assert np.array_equal(loaded["features"], ftr_file["features"], equal_nan=True)
+        assert loaded["labels"] == list(ftr_file["labels"])
+        assert np.array_equal(loaded["songfile_IDs"], ftr_file["songfile_IDs"])
+        assert loaded["spect_params"] == ftr_file["spect_params"]
+        assert (
+            loaded["feature_extractor"].feature_list
+            == ftr_file["feature_extractor"].feature_list
+        )
+        for annot, loaded_annot in zip(
+            ftr_file["annotation_list"], loaded["annotation_list"]
+        ):
+            assert np.array_equal(annot["onsets_Hz"], loaded_annot["onsets_Hz"])
+            assert np.array_equal(annot["labels"], loaded_annot["labels"])
+            assert annot["filename"] == loaded_annot["filename"]
+
+        # add a value and save only that value
+        pred_labels = np.asarray(ftr_file["labels"])
+        loaded["pred_labels"] = pred_labels
+        hvc.utils.save_feature_file(loaded, dirname)
+        reloaded = hvc.utils.load_feature_file(dirname)
+        assert np.array_equal(reloaded["pred_labels"], pred_labels)
+        assert np.array_equal(
+            reloaded["features"], ftr_file["features"], equal_nan=True
+        )
+
+
+class TestSongSampler:
+    def test_sample(self, test_data_dir):
+        feature_file = hvc.utils.load_feature_file(
+            os.path.join(str(test_data_dir), "feature_files", "knn.features")
+        )
+        song_IDs = np.asarray(feature_file["songfile_IDs"])
+        labels = np.asarray(feature_file["labels"])
+        sampler = hvc.utils.SongSampler(song_IDs, labels, seed=42)
+        for song_ID in np.unique(song_IDs):
+            start, stop = sampler.song_ptr[
+                np.searchsorted(sampler.song_ID_list, song_ID) + np.array([0, 1])
+            ]
+            assert np.array_equal(
+                sampler.sample_inds[start:stop], np.flatnonzero(song_IDs == song_ID)
+            )
+
+        test_IDs, train_song_ID_list, train_IDs_arr = sampler.train_test_split(
+            200, range(100, 301, 100), 3
+        )
+        assert test_IDs.shape == (200,)
+        assert not set(song_IDs[test_IDs]) & set(train_song_ID_list)
+        for num_samples_ind, num_samples in enumerate(range(100, 301, 100)):
+            for train_IDs in train_IDs_arr[num_samples_ind]:
+                assert train_IDs.shape == (num_samples,)
+                assert np.unique(train_IDs).shape == (num_samples,)
+                assert set(song_IDs[train_IDs]) <= set(train_song_ID_list)
+                assert np.min(np.unique(labels[train_IDs], return_counts=True)[1]) > 1
+
+        # same seed draws same sets, and each set can be drawn by itself
+        same = hvc.utils.SongSampler(song_IDs, labels, seed=sampler.seed)
+        same_test_IDs, _, same_train_IDs_arr = same.train_test_split(
+            200, range(200, 301, 100), 3
+        )
+        assert np.array_equal(test_IDs, same_test_IDs)
+        for train_IDs, same_train_IDs in zip(
+            train_IDs_arr[1:].ravel(), same_train_IDs_arr.ravel()
+        ):
+            assert np.array_equal(train_IDs, same_train_IDs)
+
+    def test_no_singletons(self):
+        # songs 0-2 each have one 'c'; song 3 has the only 'd'
+        song_IDs = np.repeat(np.arange(4), 5)
+        labels = np.asarray(list("aabbc" "aabbc" "aabbc" "abbbd"))
+        sampler = hvc.utils.SongSampler(song_IDs, labels)
+        for seed in range(20):
+            sample_IDs, popped = sampler.sample(
+                8, seed=seed, return_popped_songlist=True
+            )
+            assert sample_IDs.shape == (8,)
+            assert np.unique(sample_IDs).shape == (8,)
+            counts = np.unique(labels[sample_IDs], return_counts=True)[1]
+            assert np.min(counts) > 1
+            # songs that samples were taken from are not returned as unused
+            assert not set(song_IDs[sample_IDs]) & set(popped)
+
+
+def test_find_best_k(test_data_dir):
+    from sklearn.model_selection import cross_val_score
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.preprocessing import scale
+
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "knn.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    features, labels = features[not_nan], labels[not_nan]
+    cv_scores, best_k = hvc.utils.find_best_k(features, labels, k_range=range(1, 8))
+    expected = [
+        cross_val_score(
+            KNeighborsClassifier(k, weights="distance"), scale(features), labels, cv=10
+        ).mean()
+        for k in range(1, 8)
+    ]
+    assert np.allclose(cv_scores, expected)
+    assert best_k == np.argmax(expected) + 1
+
+
+def test_successive_halving_svm_rbf(test_data_dir):
+    from sklearn.preprocessing import scale
+
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "svm.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    song_IDs = np.asarray(feature_file["songfile_IDs"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    features = scale(features[not_nan])
+    labels, song_IDs = labels[not_nan], song_IDs[not_nan]
+
+    C_range = [0.1, 1.0, 10.0]
+    gamma_range = [1e-4, 1e-3, 1e-2]
+    best_params, best_score, cv_results = hvc.utils.successive_halving_svm_rbf(
+        features,
+        labels,
+        song_IDs,
+        C_range=C_range,
+        gamma_range=gamma_range,
+        n_splits=3,
+        return_cv_results=True,
+    )
+    # first iteration scores all candidates on a subset, last uses all samples
+    assert np.sum(cv_results["iter"] == 0) == len(C_range) * len(gamma_range)
+    assert np.all(cv_results["n_resources"][cv_results["iter"] == 0] < len(labels))
+    last_iter = cv_results["iter"] == cv_results["iter"].max()
+    assert np.all(cv_results["n_resources"][last_iter] == len(labels))
+    assert np.sum(last_iter) < len(C_range) * len(gamma_range)
+    # best candidate is best of last iteration
+    best_ind = np.flatnonzero(last_iter)[
+        np.argmax(cv_results["mean_test_score"][last_iter])
+    ]
+    assert cv_results["params"][best_ind] == best_params
+    assert cv_results["mean_test_score"][best_ind] == best_score
+    assert best_params["C"] in C_range and best_params["gamma"] in gamma_range
+    for split_ind in range(3):
+        assert cv_results["split{}_test_score".format(split_ind)].shape == (
+            cv_results["iter"].shape
+        )
+
+
+def test_grid_search_svm_rbf(test_data_dir):
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "svm.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    song_IDs = np.asarray(feature_file["songfile_IDs"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    features, labels, song_IDs = features[not_nan], labels[not_nan], song_IDs[not_nan]
+
+    C_range = [1.0, 10.0]
+    gamma_range = [1e-4, 1e-3, 1e-2]
+    best_params, best_score, cv_results = hvc.utils.grid_search_svm_rbf(
+        features,
+        labels,
+        C_range=C_range,
+        gamma_range=gamma_range,
+        return_cv_results=True,
+        song_IDs=song_IDs,
+        n_splits=4,
+        standardize=True,
+        n_jobs=1,
+    )
+    assert cv_results["params"].shape == (6,)
+    assert cv_results["params"][np.argmin(cv_results["rank_test_score"])] == (
+        best_params
+    )
+    assert best_score == cv_results["mean_test_score"].max()
+    # same folds for every candidate, with no song in more than one test set
+    song_folds = hvc.utils.SongFolds(
+        features, labels, song_IDs, n_splits=4, standardize=True, seed=42
+    )
+    expected = song_folds.score_svm_rbf(list(cv_results["params"]))
+    for split_ind in range(4):
+        assert np.array_equal(
+            cv_results["split{}_test_score".format(split_ind)],
+            expected[:, split_ind],
+        )
+
+
+def test_grid_search_svm_rbf_without_song_IDs(test_data_dir):
+    from sklearn.model_selection import GridSearchCV, StratifiedShuffleSplit
+    from sklearn.preprocessing import scale
+    from sklearn.svm import SVC
+
+    feature_file = hvc.utils.load_feature_file(
+        os.path.join(str(test_data_dir), "feature_files", "svm.features")
+    )
+    features = np.asarray(feature_file["features"])
+    labels = np.asarray(feature_file["labels"])
+    not_nan = ~np.any(np.isnan(features), axis=1)
+    features, labels = scale(features[not_nan]), labels[not_nan]
+
+    C_range, gamma_range = [1.0, 10.0], [1e-3, 1e-2]
+    best_params, best_score, cv_results = hvc.utils.grid_search_svm_rbf(
+        features,
+        labels,
+        C_range=C_range,
+        gamma_range=gamma_range,
+        return_cv_results=True,
+        n_jobs=1,
+    )
+    # same as GridSearchCV with StratifiedShuffleSplit, as before SongFolds
+    grid = GridSearchCV(
+        SVC(),
+        param_grid=dict(gamma=gamma_range, C=C_range),
+        cv=StratifiedShuffleSplit(n_splits=5, test_size=0.2, random_state=42),
+    ).fit(features, labels)
+    assert best_params == grid.best_params_
+    assert best_score == grid.best_score_
+    assert set(cv_results.keys()) == set(grid.cv_results_.keys())
+    assert np.array_equal(
+        cv_results["mean_test_score"], grid.cv_results_["mean_test_score"]
+    )
+    with pytest.raises(ValueError):
+        hvc.utils.grid_search_svm_rbf(features, labels, standardize=True)
@@ -0,0 +1,87 @@
+"""tests for hvc.watch module"""
+import os
+import shutil
+from glob import glob
+
+import hvc.watch
+
+
+def _copy_song(cbin, dst_dir):
+    for src in (cbin, cbin.replace(".cbin", ".rec")):
+        shutil.copy(src, dst_dir)
+    return os.path.join(str(dst_dir), os.path.basename(cbin))
+
+
+class TestFolderWatcher:
+    def test_watch(self, test_data_dir, tmp_path):
+        cbins = sorted(
+            glob(
+                os.path.join(str(test_data_dir), "cbins", "gy6or6", "032412", "*.cbin")
+            )
+        )
+        model_meta_file = os.path.join(str(test_data_dir), "model_files", "knn.meta")
+        watch_dir = tmp_path / "watch"
+        watch_dir.mkdir()
+        first = _copy_song(cbins[0], watch_dir)
+        # .cbin without its .rec file is still being written, and is skipped
+        shutil.copy(cbins[1], str(watch_dir))
+
+        watcher = hvc.watch.FolderWatcher(
+            model_meta_file, [str(watch_dir)], settle_time=0.0
+        )
+        # files are only processed once they are unchanged between two polls
+        assert watcher.poll() == []
+        assert watcher.poll() == [first]
+        assert os.path.isfile(first + ".not.mat")
+        assert watcher.record[first]["num_segments"] > 0
+        assert watcher.poll() == []
+
+        second = _copy_song(cbins[1], watch_dir)
+        # a restarted watcher loads the record, and only processes the new file
+        watcher = hvc.watch.FolderWatcher(
+            model_meta_file, [str(watch_dir)], settle_time=0.0
+        )
+        assert watcher.is_processed(first)
+        watcher.poll()
+        assert watcher.poll() == [second]
+        assert os.path.isfile(second + ".not.mat")
+        assert sorted(watcher.record.keys()) == sorted([first, second])
+
+    def test_changed_file(self, test_data_dir, tmp_path):
+        cbins = sorted(
+            glob(
+                os.path.join(str(test_data_dir), "cbins", "gy6or6", "032412", "*.cbin")
+            )
+        )
+        model_meta_file = os.path.join(str(test_data_dir), "model_files", "knn.meta")
+        watch_dir = tmp_path / "watch"
+        watch_dir.mkdir()
+        song = _copy_song(cbins[0], watch_dir)
+        for output_dir in (None, str(tmp_path / "output")):
+            # with output_dir, .not.mat next to song is from a different record,
+            # i.e. not saved by this watcher, so it is left alone
+            watcher = hvc.watch.FolderWatcher(
+                model_meta_file,
+                [str(watch_dir)],
+                output_dir=output_dir,
+                settle_time=0.0,
+                record_file=str(tmp_path / "record_{}.json".format(bool(output_dir))),
+            )
+            watcher.poll()
+            assert watcher.poll() == [song]
+            notmat = watcher.record[song]["notmat"]
+            if output_dir is None:
+                assert notmat == song + ".not.mat"
+            else:
+                assert os.path.dirname(notmat) == output_dir
+
+            # file changes, so it is processed again and its .not.mat is replaced
+            for _ in range(2):
+                shutil.copy(cbins[1], song)
+                os.utime(song, ns=(0, watcher.record[song]["mtime_ns"] - 10**9))
+                watcher.poll()
+                assert watcher.poll() == [song]
+                assert "error" not in watcher.record[song]
+                assert watcher.record[song]["notmat"] == notmat
+                assert os.path.isfile(notmat)
+            assert os.path.isfile(song + ".not.mat")